@@ -4,3 +4,20 @@ from django.apps import AppConfig
 class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
+
+    def ready(self):
+        """
+        Connect the app's signal handlers and register its system checks.
+
+        Also installs the query dispatcher of `recipes.query_budget` on
+        every database connection, as it is opened.
+        """
+
+        from django.db import connections
+        from django.db.backends.signals import connection_created
+        from recipes import checks, signals  # noqa: F401
+        from recipes.query_budget import install_dispatcher
+
+        connection_created.connect(install_dispatcher)
+        for connection in connections.all(initialized_only=True):
+            install_dispatcher(connection)
@@ -0,0 +1,298 @@
+"""
+Per-URL latency benchmarks, run by the `benchmark` management command.
+
+`seed_dataset()` fills the database with a synthetic catalog (users through
+the `seed` command, recipes through `RecipeImporter`, so every derived
+index is populated). `run_benchmark()` then requests every named URL of
+the root URLconf through the test client, once as an anonymous visitor
+and once logged in, and records for each of them:
+
+- `p50_ms`, `p95_ms`, `p99_ms`: wall-clock latency percentiles,
+- `queries` and `sql_ms`: SQL statements and time per request,
+- `bytes`: the size of the response body, and `status`.
+
+Results are plain dictionaries that serialize to JSON, so a run can be
+stored as a baseline and later ones compared against it with `compare()`.
+
+`run_memory_benchmark()` compares the memory a page of list rows holds as
+model instances and as the slotted rows of `recipes.read_models`.
+"""
+
+import gc
+import math
+import random
+import statistics
+import time
+import tracemalloc
+from io import StringIO
+from django.core.management import call_command
+from django.test import Client, override_settings
+from django.urls import URLPattern, get_resolver, reverse
+from recipes.importer import RecipeImporter
+from recipes.models import Recipe, User
+from recipes.query_budget import QueryCounter
+from recipes.read_models import RecipeRow, UserRow
+from recipes.view_counts import view_counter
+
+# URLs that would change the state the other measurements depend on
+SKIPPED_URLS = {'log_out'}
+
+# Query strings that make pages do representative work
+QUERY_STRINGS = {
+    'search_recipes': 'q=chicken',
+    'cook_with_pantry': 'ingredients=egg%0Aflour%0Amilk%0Abutter',
+}
+
+# Metrics compared against a baseline; queries are exact, so any increase counts
+TIMED_METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'sql_ms')
+EXACT_METRICS = ('queries',)
+
+TAG_NAMES = ('Vegan', 'Vegetarian', 'Halal', 'Kosher', 'Gluten-free', 'Dairy-free', 'Quick', 'Dessert')
+_DISHES = ('Curry', 'Stew', 'Pie', 'Salad', 'Soup', 'Risotto', 'Tart', 'Pasta', 'Omelette', 'Pancakes')
+_MAIN_INGREDIENTS = ('Chicken', 'Lentil', 'Mushroom', 'Tomato', 'Beef', 'Salmon', 'Pumpkin', 'Spinach', 'Apple')
+_INGREDIENT_LINES = (
+    '2 large eggs', '200g flour', '300ml milk', '1 tbsp butter', '1 onion, chopped', '2 cloves garlic',
+    '400g chicken thighs', '1 tin chopped tomatoes', '150g rice', '1 tsp salt', '100g spinach',
+    '250g mushrooms', '1 lemon', '2 carrots', '50g parmesan', '1 tbsp olive oil',
+)
+_DIFFICULTIES = ('Easy', 'Medium', 'Hard')
+
+
+def seed_dataset(users, recipes, seed=0, batch_size=1000):
+    """
+    Fill the database with a deterministic synthetic dataset.
+
+    Args:
+        users (int): Target total number of users.
+        recipes (int): Number of recipes to add, spread over the users.
+        seed (int): Random seed; the same arguments give the same data.
+        batch_size (int): Number of rows inserted per batch.
+
+    Returns:
+        User: A seeded user to log in as.
+    """
+
+    call_command('seed', users=users, seed=seed, batch_size=batch_size, stdout=StringIO())
+    usernames = list(User.objects.order_by('id').values_list('username', flat=True))
+    rng = random.Random(seed)
+    importer = RecipeImporter(create_tags=True)
+    for start in range(0, recipes, batch_size):
+        rows = [_recipe_row(rng, usernames) for _ in range(min(batch_size, recipes - start))]
+        importer.import_batch(rows)
+    return User.objects.order_by('id').first()
+
+
+def _recipe_row(rng, usernames):
+    """Build one random import row."""
+
+    return {
+        'name': f"{rng.choice(_MAIN_INGREDIENTS)} {rng.choice(_DISHES)}",
+        'author': rng.choice(usernames),
+        'ingredients': '\n'.join(rng.sample(_INGREDIENT_LINES, rng.randint(3, 8))),
+        'instructions': ' '.join(['Mix everything together and cook until done.'] * rng.randint(1, 6)),
+        'difficulty_level': rng.choice(_DIFFICULTIES),
+        'preparation_time_mins': rng.randint(5, 180),
+        'tags': rng.sample(TAG_NAMES, rng.randint(0, 3)),
+    }
+
+
+def named_urls(arguments):
+    """
+    List the named URLs of the root URLconf that can be benchmarked.
+
+    Args:
+        arguments (dict): Value to use for each URL parameter name, e.g.
+            `{'recipe_id': 1}`.
+
+    Returns:
+        list[tuple[str, str]]: The name and path of each URL, including its
+        query string. URLs in `SKIPPED_URLS`, in included URLconfs (the
+        admin) or with parameters missing from `arguments` are left out.
+    """
+
+    urls = []
+    for pattern in get_resolver().url_patterns:
+        if not isinstance(pattern, URLPattern) or not pattern.name or pattern.name in SKIPPED_URLS:
+            continue
+        parameters = pattern.pattern.converters.keys()
+        if not parameters <= arguments.keys():
+            continue
+        path = reverse(pattern.name, kwargs={name: arguments[name] for name in parameters})
+        if pattern.name in QUERY_STRINGS:
+            path += '?' + QUERY_STRINGS[pattern.name]
+        urls.append((pattern.name, path))
+    return urls
+
+
+def percentile(values, percent):
+    """Return the nearest-rank percentile of a non-empty list of numbers."""
+
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def measure(client, path, requests, warmup=1):
+    """
+    Request one path repeatedly and summarize the measurements.
+
+    Args:
+        client (Client): The test client to send the requests with.
+        path (str): The path and query string to request.
+        requests (int): Number of measured requests.
+        warmup (int): Number of unmeasured requests sent first, so caches
+            are filled as in a long-running process.
+
+    Returns:
+        dict: The metrics described in the module docstring.
+    """
+
+    for _ in range(warmup):
+        _content(client.get(path))
+    latencies, queries, sql_time, size, status = [], 0, 0.0, 0, None
+    for _ in range(requests):
+        with QueryCounter() as counter:
+            started = time.perf_counter()
+            response = client.get(path)
+            size = len(_content(response))
+            latencies.append((time.perf_counter() - started) * 1000)
+        queries += counter.count
+        sql_time += counter.duration_ms
+        status = response.status_code
+    return {
+        'path': path,
+        'status': status,
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'mean_ms': round(statistics.fmean(latencies), 3),
+        'queries': round(queries / requests, 2),
+        'sql_ms': round(sql_time / requests, 3),
+        'bytes': size,
+    }
+
+
+def _content(response):
+    """Read the whole body of a (possibly streaming) response."""
+
+    if response.streaming:
+        return b''.join(response.streaming_content)
+    return response.content
+
+
+def run_benchmark(user, requests=50, warmup=1, urls=None):
+    """
+    Benchmark every named URL anonymously and logged in as `user`.
+
+    Args:
+        user (User): The user to log in as.
+        requests (int): Number of measured requests per URL and client.
+        warmup (int): Number of unmeasured requests sent first.
+        urls (list[tuple[str, str]], optional): Names and paths to request;
+            defaults to `named_urls()` for the seeded data.
+
+    Returns:
+        dict: Metrics keyed by `'<url name> (anonymous|authenticated)'`.
+    """
+
+    if urls is None:
+        recipe = Recipe.objects.order_by('id').values_list('id', flat=True).first()
+        urls = named_urls({'recipe_id': recipe, 'pk': user.pk} if recipe else {'pk': user.pk})
+    authenticated = Client()
+    authenticated.force_login(user)
+    results = {}
+    # Flush buffered recipe views by count only, so query counts are repeatable
+    view_counter.reset()
+    with override_settings(RECIPE_VIEW_FLUSH_INTERVAL=math.inf):
+        for mode, client in (('anonymous', Client()), ('authenticated', authenticated)):
+            for name, path in urls:
+                results[f'{name} ({mode})'] = measure(client, path, requests, warmup)
+    return results
+
+
+def compare(results, baseline, threshold, min_delta_ms=1.0):
+    """
+    Find the metrics that got worse than in a baseline run.
+
+    Timings regress when they grow by more than `threshold` percent and by
+    more than `min_delta_ms`, which keeps noise on very fast pages from
+    counting; query counts regress on any increase.
+
+    Args:
+        results (dict): Metrics of the current run, from `run_benchmark()`.
+        baseline (dict): Metrics of the baseline run.
+        threshold (float): Allowed relative increase of timings, in percent.
+        min_delta_ms (float): Allowed absolute increase of timings.
+
+    Returns:
+        list[tuple[str, str, float, float]]: The URL key, metric, baseline
+        value and current value of each regression.
+    """
+
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        for metric in TIMED_METRICS:
+            old, new = previous.get(metric), current[metric]
+            if old is not None and new - old > max(old * threshold / 100, min_delta_ms):
+                regressions.append((key, metric, old, new))
+        for metric in EXACT_METRICS:
+            old, new = previous.get(metric), current[metric]
+            if old is not None and new > old:
+                regressions.append((key, metric, old, new))
+    return regressions
+
+
+def _bytes_per_item(build):
+    """Return the memory held per item by the list `build()` returns, in bytes."""
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        items = build()
+        held = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    return held / len(items) if items else 0.0
+
+
+def row_memory(queryset, row_class):
+    """
+    Measure the memory held per row as model instances and as read-model rows.
+
+    Both are built from the same rows and measured with `tracemalloc` while
+    alive, so the figures include the column values each one keeps.
+
+    Args:
+        queryset (QuerySet): The rows to load, e.g. one list page.
+        row_class (type[Row]): The read model the page is shown with.
+
+    Returns:
+        dict: `model_bytes` and `row_bytes` held per row, and the
+        `saved_percent` of the former.
+    """
+
+    model_bytes = _bytes_per_item(lambda: list(queryset.all()))
+    row_bytes = _bytes_per_item(lambda: row_class.fetch(queryset.all()))
+    return {
+        'model_bytes': round(model_bytes),
+        'row_bytes': round(row_bytes),
+        'saved_percent': round(100 * (1 - row_bytes / model_bytes), 1) if model_bytes else 0.0,
+    }
+
+
+def run_memory_benchmark(rows=1000):
+    """
+    Compare the memory of the recipe and user list rows with model instances.
+
+    Returns:
+        dict: `row_memory()` results keyed by list.
+    """
+
+    return {
+        'recipes': row_memory(Recipe.objects.order_by(*Recipe.LIST_ORDERING)[:rows], RecipeRow),
+        'users': row_memory(User.objects.order_by(*User.DIRECTORY_ORDERING)[:rows], UserRow),
+    }
@@ -0,0 +1,44 @@
+"""
+System checks of the settings the app relies on.
+
+They are registered when the `recipes` app is ready (see `RecipesConfig`).
+"""
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Cache backends whose entries are not seen by other worker processes
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Require a default cache shared by every worker process.
+
+    Sessions (`recipes.sessions`) are read from the default cache, and
+    the recipe list's Last-Modified stamp (`recipes.conditional`) and the
+    version stamps of cached recipe bodies (`recipes.fragment_cache`) and
+    the login throttle's buckets (`recipes.throttle`) are kept there. With
+    a cache private to each process, a session logged out in one worker
+    stays valid in the others, workers that did not make a change keep
+    serving the old recipe list or recipe page, and each worker allows the
+    full login rate on its own. The check only runs when
+    `REQUIRE_SHARED_CACHE` is set, as a single development server may use
+    a local cache.
+    """
+
+    if not settings.REQUIRE_SHARED_CACHE:
+        return []
+    backend = settings.CACHES['default']['BACKEND']
+    if backend not in PROCESS_LOCAL_CACHES:
+        return []
+    return [Error(
+        f"The default cache ({backend}) is not shared between processes.",
+        hint="Configure a shared cache such as Redis or Memcached in CACHES, "
+             "or set REQUIRE_SHARED_CACHE = False for a single-process server.",
+        id='recipes.E001',
+    )]
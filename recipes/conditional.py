@@ -0,0 +1,159 @@
+"""
+Validators for conditional GET (ETag / Last-Modified) on recipe pages.
+
+The functions here are passed to Django's `condition` decorator, which
+answers `If-None-Match` / `If-Modified-Since` with a 304 before the view
+body runs.
+
+- A recipe page is validated by the recipe's `date_modified`, read with a
+  single-column primary key lookup. Signal handlers in `recipes.signals`
+  touch `date_modified` when the recipe's tags or author's username change.
+- The recipe list is validated by a list-wide "last changed" stamp kept in
+  the Django cache and moved forward whenever any recipe changes, so no
+  query is needed at all while it is cached. Every worker must see the
+  move, so the cache must be shared between processes; the
+  `recipes.E001` system check enforces this (see `recipes.checks`).
+
+Both ETags also encode whether the visitor is logged in (the navbar
+differs), and no validator is produced while flash messages are pending,
+so such pages are always rendered in full.
+
+`condition` calls the validators synchronously, even around async views,
+where they must not touch the database. Async views are therefore wrapped
+in `preload()` with one of the `aload_*` coroutines, which fetch the user,
+session and stamps asynchronously and memoize them on the request before
+`condition` runs.
+"""
+
+import hashlib
+from functools import wraps
+from datetime import datetime, timezone as dt_timezone
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils import timezone
+from recipes.models import Recipe
+
+LIST_STAMP_KEY = 'recipes:list:last_modified'
+
+
+def _visitor(request):
+    """Describe the parts of the visitor that change the rendered page."""
+
+    if len(get_messages(request)):
+        return None
+    return 'user' if request.user.is_authenticated else 'anon'
+
+
+def _date_modified_query(recipe_id):
+    return Recipe.objects.filter(pk=recipe_id).values_list('date_modified', flat=True)
+
+
+def _recipe_date_modified(request, recipe_id):
+    """Look up (once per request) when the recipe was last modified."""
+
+    if not hasattr(request, '_recipe_date_modified'):
+        request._recipe_date_modified = _date_modified_query(recipe_id).first()
+    return request._recipe_date_modified
+
+
+def recipe_last_modified(request, recipe_id):
+    """Return the Last-Modified time of a recipe page, or None if it does not exist."""
+
+    return _recipe_date_modified(request, recipe_id)
+
+
+def recipe_etag(request, recipe_id):
+    """Return the ETag of a recipe page, or None if it should not be validated."""
+
+    date_modified = _recipe_date_modified(request, recipe_id)
+    visitor = _visitor(request)
+    if date_modified is None or visitor is None:
+        return None
+    return f'"recipe-{recipe_id}-{date_modified.timestamp():.6f}-{visitor}"'
+
+
+def touch_recipe_list():
+    """Record that the recipe list changed now."""
+
+    cache.set(LIST_STAMP_KEY, timezone.now().timestamp(), timeout=None)
+
+
+def recipe_list_last_modified(request, *args, **kwargs):
+    """
+    Return when any recipe last changed.
+
+    The stamp is read from the cache. If it is missing it is recomputed
+    from the newest `date_modified`, which cannot see deletions that
+    happened while the stamp was missing; those are picked up by the
+    next change.
+    """
+
+    if not hasattr(request, '_recipe_list_stamp'):
+        stamp = cache.get(LIST_STAMP_KEY)
+        if stamp is None:
+            stamp = _store_list_stamp(Recipe.objects.aggregate(newest=Max('date_modified'))['newest'])
+        request._recipe_list_stamp = stamp
+    return datetime.fromtimestamp(request._recipe_list_stamp, tz=dt_timezone.utc)
+
+
+def _store_list_stamp(newest):
+    """Store a recomputed list stamp (unless another process just did) and return it."""
+
+    stamp = newest.timestamp() if newest is not None else 0.0
+    cache.add(LIST_STAMP_KEY, stamp, timeout=None)
+    return stamp
+
+
+def recipe_list_etag(request, *args, **kwargs):
+    """Return the ETag of a recipe list page (its query string included)."""
+
+    visitor = _visitor(request)
+    if visitor is None:
+        return None
+    stamp = recipe_list_last_modified(request).timestamp()
+    query = hashlib.sha1(request.GET.urlencode().encode()).hexdigest()[:16]
+    return f'"recipes-{stamp:.6f}-{query}-{visitor}"'
+
+
+async def aload_visitor(request):
+    """Load the user (and with it the session) of `request` asynchronously."""
+
+    request.user = await request.auser()
+
+
+async def aload_recipe(request, recipe_id):
+    """Load everything the recipe page validators need, asynchronously."""
+
+    await aload_visitor(request)
+    if not hasattr(request, '_recipe_date_modified'):
+        request._recipe_date_modified = await _date_modified_query(recipe_id).afirst()
+
+
+async def aload_recipe_list(request, *args, **kwargs):
+    """Load everything the recipe list validators need, asynchronously."""
+
+    await aload_visitor(request)
+    if not hasattr(request, '_recipe_list_stamp'):
+        stamp = cache.get(LIST_STAMP_KEY)
+        if stamp is None:
+            newest = (await Recipe.objects.aaggregate(newest=Max('date_modified')))['newest']
+            stamp = _store_list_stamp(newest)
+        request._recipe_list_stamp = stamp
+
+
+def preload(loader):
+    """
+    Decorator awaiting `loader(request, *args, **kwargs)` before an async view.
+
+    Apply it outside `condition` so that the validators find everything
+    they need already memoized on the request.
+    """
+
+    def decorator(view_function):
+        @wraps(view_function)
+        async def modified_view_function(request, *args, **kwargs):
+            await loader(request, *args, **kwargs)
+            return await view_function(request, *args, **kwargs)
+        return modified_view_function
+    return decorator
@@ -0,0 +1,88 @@
+"""
+Chunked bulk deletion of users and their recipes.
+
+Deleting a large queryset in one `delete()` call makes Django's deletion
+collector load every row and every cascaded row into memory, and holds
+the SQLite write lock for the whole operation. Here users are deleted in
+id-ordered chunks, each in its own short transaction, so memory use and
+lock hold times are bounded by the chunk size.
+
+The rows that cascade from a user's recipes (tag links, ingredient rows
+and feed entries) are deleted with plain `DELETE ... WHERE recipe_id IN (subquery)`
+statements and the recipes themselves with a raw delete, skipping the
+per-instance `post_delete` signals. The derived data those signals
+maintain is updated for the whole chunk instead.
+"""
+
+from django.db import transaction
+from recipes import conditional, fragment_cache, search
+from recipes.models import Recipe, RecipeIngredient, TimelineEntry, User
+from recipes.tag_index import tag_index
+from recipes.tag_trie import tag_trie
+
+
+def delete_recipes_of(user_ids):
+    """
+    Delete every recipe written by the given users, with its dependent rows.
+
+    Must be called inside a transaction.
+
+    Args:
+        user_ids (list[int]): The ids of the authors.
+
+    Returns:
+        int: The number of recipes deleted.
+    """
+
+    recipes = Recipe.objects.filter(author_id__in=user_ids)
+    recipe_ids = list(recipes.values_list('id', flat=True))
+    if not recipe_ids:
+        return 0
+    subquery = recipes.values('id')
+    Recipe.tags.through.objects.filter(recipe_id__in=subquery).delete()
+    RecipeIngredient.objects.filter(recipe_id__in=subquery).delete()
+    TimelineEntry.objects.filter(recipe_id__in=subquery).delete()
+    search.remove_recipes(recipe_ids)
+    # Nothing else references recipes, so no collector is needed
+    recipes._raw_delete(recipes.db)
+    transaction.on_commit(lambda: tag_index.remove_recipes(recipe_ids))
+    transaction.on_commit(tag_trie.invalidate)
+    transaction.on_commit(lambda: fragment_cache.invalidate_recipes(recipe_ids))
+    transaction.on_commit(conditional.touch_recipe_list)
+    return len(recipe_ids)
+
+
+def delete_users(queryset, chunk_size=500):
+    """
+    Delete the users of a queryset in id-ordered chunks.
+
+    Each chunk runs in its own transaction: the chunk's recipes are
+    deleted first (see `delete_recipes_of`), then the users, whose
+    remaining relations (groups, permissions, admin log entries, follows
+    and feeds) are cascaded by Django without loading them. The
+    `pre_delete` handler of `User` takes each user off the follower counts
+    of the authors they follow.
+
+    Args:
+        queryset (QuerySet[User]): The users to delete.
+        chunk_size (int): Number of users deleted per transaction.
+
+    Yields:
+        tuple[int, int]: The running totals of deleted users and recipes
+        after each chunk.
+    """
+
+    users_deleted = recipes_deleted = 0
+    last_id = 0
+    while True:
+        user_ids = list(
+            queryset.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+        )
+        if not user_ids:
+            return
+        with transaction.atomic():
+            recipes_deleted += delete_recipes_of(user_ids)
+            User.objects.filter(id__in=user_ids).delete()
+        users_deleted += len(user_ids)
+        last_id = user_ids[-1]
+        yield users_deleted, recipes_deleted
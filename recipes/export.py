@@ -0,0 +1,72 @@
+"""
+Streaming export of the whole recipe catalog as NDJSON.
+
+Recipes are read in id-ordered keyset batches, one query per batch that
+takes the author's username and the tag names from the recipes' summary
+columns (see `recipes.summaries`) instead of joining other tables. They
+are serialized one JSON object per line and yielded batch by batch, so
+memory stays flat however large the catalog is. Used by the `export_recipes` view and management
+command.
+"""
+
+import json
+import zlib
+from django.core.serializers.json import DjangoJSONEncoder
+from recipes.models import Recipe, decode_tag_names
+
+EXPORT_FIELDS = (
+    'id', 'name', 'author_name', 'ingredients', 'instructions',
+    'date_created', 'date_modified', 'difficulty_level', 'preparation_time_mins', 'tag_names',
+)
+
+
+def iter_recipe_records(batch_size=1000):
+    """
+    Yield every recipe as a plain dictionary, in id order.
+
+    Args:
+        batch_size (int): Number of recipes fetched per query.
+
+    Yields:
+        list[dict]: One list of records per batch.
+    """
+
+    last_id = 0
+    while True:
+        rows = list(
+            Recipe.objects.filter(id__gt=last_id).order_by('id').values_list(*EXPORT_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return
+        records = []
+        for row in rows:
+            record = dict(zip(EXPORT_FIELDS, row))
+            record['author'] = record.pop('author_name')
+            record['tags'] = decode_tag_names(record.pop('tag_names'))
+            records.append(record)
+        yield records
+        last_id = rows[-1][0]
+
+
+def iter_ndjson(batch_size=1000):
+    """
+    Yield the catalog as NDJSON, one encoded chunk per batch of recipes.
+
+    Yields:
+        bytes: Newline-terminated JSON lines.
+    """
+
+    for records in iter_recipe_records(batch_size):
+        lines = (json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) for record in records)
+        yield ('\n'.join(lines) + '\n').encode()
+
+
+def gzip_chunks(chunks):
+    """Compress a stream of byte chunks into a single gzip stream on the fly."""
+
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,387 @@
+"""
+Personalized recipe feed: new recipes by the authors and with the tags a
+user follows.
+
+The feed is materialized with fan-out on write. When a recipe is created,
+`publish()` inserts a `TimelineEntry` for every follower of its author,
+and when tags are added to recipes, `publish_tags()` does the same for the
+followers of those tags. Reading a page of a feed is then a single query
+over the `(user, date_created, recipe)` index, whatever the number of
+authors and tags followed. Following backfills the newest
+`FEED_BACKFILL` recipes of the author or tag; unfollowing removes the
+entries nothing else the user follows accounts for. Entries already
+delivered stay when a tag is later removed from a recipe.
+
+Authors with more than `FEED_FANOUT_LIMIT` followers are not fanned out:
+every recipe they post would insert that many rows in one transaction.
+Their recipes are instead read from the `(author, date_created, id)`
+index of the recipe table when a follower's feed is shown, in the same
+query as the timeline (a `UNION ALL` of both), and merged into the page.
+When such an author falls back to the limit, the feeds of their
+remaining followers are backfilled with their newest `FEED_BACKFILL`
+recipes, as on following, since those were pulled, never fanned out.
+
+The signal handlers in `recipes.signals` call `publish()` and
+`publish_tags()` inside the transaction creating the recipe or its tag
+links; the importer calls `publish()` for each batch. Before a user is
+deleted, in any way, the `pre_delete` handler calls `forget_users()` so
+that the follower counts of the authors they followed stay right.
+Anything writing `AuthorFollow` rows directly leaves the counts wrong
+until `repair_follower_counts()` (the `repair_recipe_summaries` command)
+recomputes them.
+"""
+
+from contextlib import nullcontext
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.http import Http404
+from recipes.helpers import CursorPage, decode_cursor, encode_cursor, filter_by_ids, get_cursor, get_page_size, keyset_filter
+from recipes.models import AuthorFollow, Recipe, TagFollow, TimelineEntry, User
+from recipes.read_models import RecipeRow
+
+
+def is_celebrity(author):
+    """Return whether the author's recipes are pulled into feeds instead of fanned out."""
+
+    return author.follower_count > settings.FEED_FANOUT_LIMIT
+
+
+def _write_entries(entries):
+    """Insert timeline entries given as `{(user_id, recipe_id): date_created}`."""
+
+    TimelineEntry.objects.bulk_create(
+        [TimelineEntry(user_id=user_id, recipe_id=recipe_id, date_created=date_created)
+         for (user_id, recipe_id), date_created in entries.items()],
+        batch_size=settings.FEED_FANOUT_BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    return len(entries)
+
+
+def _followers_of_tags(tag_ids):
+    """Return the ids of the followers of each tag, by tag id."""
+
+    followers = {}
+    follows = filter_by_ids(TagFollow.objects.all(), tag_ids, field='tag_id')
+    for tag_id, follower_id in follows.values_list('tag_id', 'follower_id'):
+        followers.setdefault(tag_id, []).append(follower_id)
+    return followers
+
+
+def publish(recipes, tag_ids=None):
+    """
+    Fan new recipes out to the feeds of the followers of their authors and tags.
+
+    Authors with more than `FEED_FANOUT_LIMIT` followers are skipped; their
+    recipes are pulled in when feeds are read. Must be called inside the
+    transaction creating the recipes.
+
+    Args:
+        recipes (list[Recipe]): The new recipes; only their `pk`,
+            `author_id` and `date_created` are read.
+        tag_ids (list[set[int]], optional): The tag ids of each recipe, in
+            the same order. Recipes created without tags need none.
+
+    Returns:
+        int: The number of timeline entries written.
+    """
+
+    if tag_ids is None:
+        tag_ids = [()] * len(recipes)
+    author_ids = {recipe.author_id for recipe in recipes}
+    author_followers = {}
+    follows = filter_by_ids(AuthorFollow.objects.all(), author_ids, field='author_id').filter(
+        author__follower_count__lte=settings.FEED_FANOUT_LIMIT
+    )
+    for author_id, follower_id in follows.values_list('author_id', 'follower_id'):
+        author_followers.setdefault(author_id, []).append(follower_id)
+    tag_followers = _followers_of_tags(set().union(*tag_ids))
+
+    entries = {}
+    for recipe, tags in zip(recipes, tag_ids):
+        followers = set(author_followers.get(recipe.author_id, ()))
+        for tag_id in tags:
+            followers.update(tag_followers.get(tag_id, ()))
+        followers.discard(recipe.author_id)
+        for follower_id in followers:
+            entries[follower_id, recipe.pk] = recipe.date_created
+    return _write_entries(entries)
+
+
+def publish_tags(tag_ids, recipe_ids):
+    """
+    Fan recipes out to the feeds of the followers of tags just added to them.
+
+    Args:
+        tag_ids (set[int]): The tags added.
+        recipe_ids (set[int]): The recipes they were added to.
+
+    Returns:
+        int: The number of timeline entries written.
+    """
+
+    tag_followers = _followers_of_tags(tag_ids)
+    followers = set().union(*tag_followers.values())
+    if not followers:
+        return 0
+    entries = {}
+    recipes = filter_by_ids(Recipe.objects.all(), recipe_ids).values_list('id', 'author_id', 'date_created')
+    for recipe_id, author_id, date_created in recipes:
+        for follower_id in followers - {author_id}:
+            entries[follower_id, recipe_id] = date_created
+    return _write_entries(entries)
+
+
+def _backfill(user, recipes):
+    """Copy the newest `FEED_BACKFILL` of `recipes` into the user's feed."""
+
+    newest = recipes.exclude(author=user).order_by(*Recipe.LIST_ORDERING)[:settings.FEED_BACKFILL]
+    _write_entries({(user.pk, recipe_id): date_created for recipe_id, date_created in newest.values_list('id', 'date_created')})
+
+
+def _refill_feeds(author_ids, skip_followers=()):
+    """
+    Backfill the feeds of the followers of authors who fell back to `FEED_FANOUT_LIMIT` followers.
+
+    Their recent recipes were pulled into feeds rather than fanned out, so
+    without this they would disappear from their followers' feeds.
+    """
+
+    for author_id in author_ids:
+        newest = list(
+            Recipe.objects.filter(author_id=author_id).order_by(*Recipe.LIST_ORDERING)
+            .values_list('id', 'date_created')[:settings.FEED_BACKFILL]
+        )
+        if not newest:
+            continue
+        followers = AuthorFollow.objects.filter(author_id=author_id).exclude(follower_id__in=skip_followers)
+        _write_entries({
+            (follower_id, recipe_id): date_created
+            for follower_id in followers.values_list('follower_id', flat=True)
+            for recipe_id, date_created in newest
+        })
+
+
+def follow_author(user, author):
+    """
+    Make `user` follow `author`, adding the author's newest recipes to their feed.
+
+    Returns:
+        bool: Whether the user was not already following the author.
+
+    Raises:
+        ValueError: If the user tries to follow themselves.
+    """
+
+    if user.pk == author.pk:
+        raise ValueError("Users cannot follow themselves.")
+    with transaction.atomic():
+        _, created = AuthorFollow.objects.get_or_create(follower=user, author=author)
+        if created:
+            User.objects.filter(pk=author.pk).update(follower_count=F('follower_count') + 1)
+            author.refresh_from_db(fields=['follower_count'])
+            if not is_celebrity(author):
+                _backfill(user, Recipe.objects.filter(author=author))
+    return created
+
+
+def unfollow_author(user, author):
+    """
+    Make `user` stop following `author`.
+
+    The author's recipes leave the user's feed, except those carrying a
+    tag the user follows.
+
+    Returns:
+        bool: Whether the user was following the author.
+    """
+
+    with transaction.atomic():
+        deleted, _ = AuthorFollow.objects.filter(follower=user, author=author).delete()
+        if deleted:
+            User.objects.filter(pk=author.pk).update(follower_count=F('follower_count') - 1)
+            author.refresh_from_db(fields=['follower_count'])
+            if author.follower_count == settings.FEED_FANOUT_LIMIT:
+                _refill_feeds([author.pk])
+            TimelineEntry.objects.filter(user=user, recipe__author=author).exclude(
+                recipe__tags__in=TagFollow.objects.filter(follower=user).values('tag_id')
+            ).delete()
+    return bool(deleted)
+
+
+def follow_tag(user, tag):
+    """
+    Make `user` follow `tag`, adding the newest recipes carrying it to their feed.
+
+    Returns:
+        bool: Whether the user was not already following the tag.
+    """
+
+    with transaction.atomic():
+        _, created = TagFollow.objects.get_or_create(follower=user, tag=tag)
+        if created:
+            _backfill(user, Recipe.objects.filter(tags=tag))
+    return created
+
+
+def unfollow_tag(user, tag):
+    """
+    Make `user` stop following `tag`.
+
+    Recipes carrying the tag leave the user's feed, except those by an
+    author the user follows or carrying another tag they follow.
+
+    Returns:
+        bool: Whether the user was following the tag.
+    """
+
+    with transaction.atomic():
+        deleted, _ = TagFollow.objects.filter(follower=user, tag=tag).delete()
+        if deleted:
+            TimelineEntry.objects.filter(user=user, recipe__tags=tag).exclude(
+                recipe__author__in=AuthorFollow.objects.filter(follower=user).values('author_id')
+            ).exclude(
+                recipe__tags__in=TagFollow.objects.filter(follower=user).values('tag_id')
+            ).delete()
+    return bool(deleted)
+
+
+def forget_users(user_ids):
+    """
+    Take users about to be deleted off the follower counts of the authors they follow.
+
+    One UPDATE is run per distinct number of lost followers, and authors
+    falling back to `FEED_FANOUT_LIMIT` followers have their remaining
+    followers' feeds refilled. The users' follows and feeds are then
+    cascaded with the users. Called by the
+    `pre_delete` handler of `User`, inside the transaction deleting them.
+
+    Args:
+        user_ids (list[int]): The ids of the users.
+    """
+
+    lost = AuthorFollow.objects.filter(follower_id__in=user_ids).exclude(author_id__in=user_ids)
+    by_count = {}
+    for author_id, count in lost.values('author_id').annotate(lost=Count('id')).values_list('author_id', 'lost'):
+        by_count.setdefault(count, []).append(author_id)
+    fell_under = []
+    for count, author_ids in by_count.items():
+        authors = filter_by_ids(User.objects.all(), author_ids)
+        authors.update(follower_count=F('follower_count') - count)
+        fell_under += authors.filter(
+            follower_count__lte=settings.FEED_FANOUT_LIMIT, follower_count__gt=settings.FEED_FANOUT_LIMIT - count
+        ).values_list('pk', flat=True)
+    _refill_feeds(fell_under, skip_followers=user_ids)
+
+
+def repair_follower_counts(batch_size=1000, fix=True):
+    """
+    Compare every user's follower count with their `AuthorFollow` rows and fix drift.
+
+    Users are read in id-ordered batches, with one grouped count of their
+    followers per batch; stale counts are written back with one
+    `bulk_update` per batch.
+
+    Args:
+        batch_size (int): Number of users checked per batch.
+        fix (bool): Write the correct counts back. When false, drift is
+            only reported.
+
+    Yields:
+        tuple[int, list[int]]: For every batch, the number of users
+        checked and the ids of those with a stale count.
+    """
+
+    last_id = 0
+    while True:
+        with transaction.atomic() if fix else nullcontext():
+            rows = list(
+                User.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'follower_count')[:batch_size]
+            )
+            if not rows:
+                return
+            follows = AuthorFollow.objects.filter(author_id__in=[user_id for user_id, _ in rows])
+            counts = dict(follows.values('author_id').annotate(followers=Count('id')).values_list('author_id', 'followers'))
+            stale = [
+                User(pk=user_id, follower_count=counts.get(user_id, 0))
+                for user_id, stored in rows if stored != counts.get(user_id, 0)
+            ]
+            if stale and fix:
+                User.objects.bulk_update(stale, ['follower_count'])
+        yield len(rows), [user.pk for user in stale]
+        last_id = rows[-1][0]
+
+
+def _cursor_for(row):
+    return encode_cursor([row.date_created, row.id])
+
+
+def feed_page(request, user, page_size=None):
+    """
+    Return one page of a user's feed, newest first, as `RecipeRow`s.
+
+    The page is read with one query: the user's timeline entries, plus
+    the recipes of the followed authors too popular to be fanned out. It
+    is selected by the `after` or `before` cursor in the request's query
+    string, as in `paginate_by_cursor()`.
+
+    Args:
+        request (HttpRequest): The current request.
+        user (User): The user whose feed is shown.
+        page_size (int, optional): Recipes per page. Defaults to the value
+            returned by `get_page_size()`.
+
+    Returns:
+        CursorPage: The requested page.
+
+    Raises:
+        Http404: If the supplied cursor is malformed.
+    """
+
+    page_size = get_page_size(request) if page_size is None else page_size
+    cursor, backwards = get_cursor(request)
+    lookup, prefix = ('gt', '') if backwards else ('lt', '-')
+
+    timeline = TimelineEntry.objects.filter(user=user)
+    newest = Recipe.objects.filter(author_id=OuterRef('author_id'))
+    if cursor:
+        fields = [TimelineEntry._meta.get_field('date_created'), Recipe._meta.get_field('id')]
+        try:
+            values = decode_cursor(cursor, fields)
+        except ValueError:
+            raise Http404("Invalid page cursor")
+        timeline = timeline.filter(keyset_filter(['date_created', 'recipe'], values, lookup))
+        newest = newest.filter(keyset_filter(['date_created', 'id'], values, lookup))
+
+    # A recipe can come from both sides; fetching twice the page keeps one
+    # row beyond the page even if every recipe is duplicated
+    limit = 2 * (page_size + 1)
+    timeline = timeline.values_list('recipe_id', 'recipe__name', 'recipe__author_name', 'date_created')
+    # For every followed author over the limit, only their first `limit`
+    # recipes beyond the cursor, read from the (author, date_created, id)
+    # index, then looked up by id
+    newest = newest.order_by(f'{prefix}date_created', f'{prefix}id').values('id')[:limit]
+    pulled = AuthorFollow.objects.filter(
+        follower=user,
+        author__follower_count__gt=settings.FEED_FANOUT_LIMIT,
+        author__recipes__id__in=Subquery(newest),
+    ).values_list('author__recipes__id', 'author__recipes__name', 'author__recipes__author_name', 'author__recipes__date_created')
+    # SQLite merges the timeline, in index order, with the few pulled rows
+    combined = timeline.union(pulled, all=True).order_by(f'{prefix}date_created', f'{prefix}recipe_id')[:limit]
+
+    rows, seen = [], set()
+    for values in combined:
+        if values[0] not in seen:
+            seen.add(values[0])
+            rows.append(RecipeRow(*values))
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if backwards:
+        rows.reverse()
+        next_cursor = _cursor_for(rows[-1]) if rows else None
+        previous_cursor = _cursor_for(rows[0]) if rows and has_more else None
+    else:
+        next_cursor = _cursor_for(rows[-1]) if rows and has_more else None
+        previous_cursor = _cursor_for(rows[0]) if rows and cursor else None
+    return CursorPage(rows, next_cursor, previous_cursor, page_size, request.GET)
@@ -1,5 +1,6 @@
 from django import forms
 from django.contrib.auth import authenticate
+from recipes.throttle import Throttled, login_throttle
 
 class LogInForm(forms.Form):
     """
@@ -18,6 +19,18 @@ class LogInForm(forms.Form):
     username = forms.CharField(label="Username")
     password = forms.CharField(label="Password", widget=forms.PasswordInput())
 
+    def __init__(self, *args, request=None, **kwargs):
+        """
+        Initialize the form with the request it was submitted with.
+
+        Args:
+            request (HttpRequest, optional): Used to throttle attempts per
+                client IP address.
+        """
+
+        super().__init__(*args, **kwargs)
+        self.request = request
+
     def get_user(self):
         """
         Attempt to authenticate the user with the provided credentials.
@@ -25,11 +38,25 @@ class LogInForm(forms.Form):
         This method should be called after form validation (`is_valid()`).
         It retrieves the cleaned username and password from the form data
         and uses Django’s built-in `authenticate()` function to verify them.
+
+        Attempts are throttled per IP address and per username (see
+        `recipes.throttle`). A throttled attempt is rejected before the
+        password is hashed: no user is returned and a non-field error with
+        the code `throttled` is added to the form.
         """
 
         user = None
         if self.is_valid():
             username = self.cleaned_data.get('username')
             password = self.cleaned_data.get('password')
+            try:
+                login_throttle.check(self.request, username)
+            except Throttled:
+                self.add_error(None, forms.ValidationError(
+                    "Too many log in attempts. Please try again later.", code='throttled'
+                ))
+                return None
             user = authenticate(username=username, password=password)
+            if user is not None:
+                login_throttle.succeeded(self.request, username)
         return user
\ No newline at end of file
@@ -2,6 +2,7 @@ from django import forms
 from django.contrib.auth import authenticate
 from django.core.validators import RegexValidator
 from recipes.models import User
+from recipes.throttle import Throttled, login_throttle
 
 class UserForm(forms.ModelForm):
     """
@@ -85,17 +86,20 @@ class PasswordForm(NewPasswordMixin):
 
     password = forms.CharField(label='Current password', widget=forms.PasswordInput())
 
-    def __init__(self, user=None, **kwargs):
+    def __init__(self, user=None, request=None, **kwargs):
         """
         Initialize the password form with the current user instance.
 
         Args:
             user (User, optional): The authenticated user who wants to change
                 their password.
+            request (HttpRequest, optional): Used to throttle attempts per
+                client IP address.
         """
         
         super().__init__(**kwargs)
         self.user = user
+        self.request = request
 
         # Force the desired field order
         self.order_fields(['password', 'new_password', 'password_confirmation'])
@@ -110,7 +114,9 @@ class PasswordForm(NewPasswordMixin):
           match and meet complexity requirements.
 
         If any validation step fails, an appropriate error message is added
-        to the form.
+        to the form. Checks of the current password are throttled like log
+        in attempts (see `recipes.throttle`); a throttled attempt adds an
+        error with the code `throttled` without hashing the password.
 
         Returns:
             dict: The cleaned form data.
@@ -122,10 +128,18 @@ class PasswordForm(NewPasswordMixin):
 
         super().clean()
         password = self.cleaned_data.get('password')
+        user = None
         if self.user is not None:
+            try:
+                login_throttle.check(self.request, self.user.username)
+            except Throttled:
+                self.add_error('password', forms.ValidationError(
+                    "Too many attempts. Please try again later.", code='throttled'
+                ))
+                return
             user = authenticate(username=self.user.username, password=password)
-        else:
-            user = None
+            if user is not None:
+                login_throttle.succeeded(self.request, self.user.username)
         if user is None:
             self.add_error('password', "Password is invalid")
 
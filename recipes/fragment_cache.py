@@ -0,0 +1,115 @@
+"""
+Cache of the rendered body of recipe detail pages.
+
+The body of `recipe.html` (everything specific to the recipe, rendered
+from `partials/recipe_body.html`) is stored in the default Django cache
+under a key that embeds a per-recipe version stamp. The signal handlers
+in `recipes.signals` bump the stamp once a change to the recipe, its tags
+or its author's record commits, which makes the old entry unreachable.
+Stamps expire with the bodies they version, and a stamp is dropped again
+when its recipe cannot be rendered, so requests for missing recipes do not
+leave keys behind. Like the bodies, the stamps must live in a cache shared
+by every worker process (see the `recipes.E001` check).
+
+Hits and misses are counted in the cache itself, so the totals cover
+every process sharing the cache backend; read them with `cache_stats()`.
+
+The cache is used through its synchronous API from async views too: the
+configured backends answer from memory without blocking on I/O, and the
+async API would only run the same calls in a thread.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.safestring import mark_safe
+from recipes.helpers import bump_cache_version, get_cache_version, increment_cache_counter
+
+HITS_KEY = 'recipes:recipe_body:hits'
+MISSES_KEY = 'recipes:recipe_body:misses'
+
+
+def _version_key(recipe_id):
+    return f'recipes:recipe:{recipe_id}:version'
+
+
+def _body_key(recipe_id, version):
+    return f'recipes:recipe:{recipe_id}:body:{version}'
+
+
+def get_recipe_body(recipe_id, render_body):
+    """
+    Return the rendered body of a recipe page, rendering it on a miss.
+
+    The version stamp is read before rendering, so a change committed while
+    the body is being rendered leaves the freshly rendered (and possibly
+    stale) body under the superseded version, where it is never read.
+
+    Args:
+        recipe_id (int): The id of the recipe.
+        render_body (Callable[[], str]): Renders the body from the database.
+            It may raise (e.g. `Http404`), in which case nothing is cached.
+
+    Returns:
+        SafeString: The rendered HTML.
+    """
+
+    key, body = _lookup(recipe_id)
+    if body is None:
+        try:
+            body = render_body()
+        except Exception:
+            _forget_version(recipe_id)
+            raise
+        body = _store(key, body)
+    return mark_safe(body)
+
+
+async def aget_recipe_body(recipe_id, render_body):
+    """Async version of `get_recipe_body()`; `render_body` is a coroutine function."""
+
+    key, body = _lookup(recipe_id)
+    if body is None:
+        try:
+            body = await render_body()
+        except Exception:
+            _forget_version(recipe_id)
+            raise
+        body = _store(key, body)
+    return mark_safe(body)
+
+
+def _lookup(recipe_id):
+    """Return the cache key of a recipe's current body and the cached body, if any."""
+
+    version = get_cache_version(_version_key(recipe_id), timeout=settings.RECIPE_BODY_CACHE_TIMEOUT)
+    key = _body_key(recipe_id, version)
+    body = cache.get(key)
+    increment_cache_counter(HITS_KEY if body is not None else MISSES_KEY)
+    return key, body
+
+
+def _forget_version(recipe_id):
+    """Drop the stamp of a recipe whose body could not be rendered (e.g. a missing recipe)."""
+
+    cache.delete(_version_key(recipe_id))
+
+
+def _store(key, body):
+    body = str(body)
+    cache.set(key, body, timeout=settings.RECIPE_BODY_CACHE_TIMEOUT)
+    return body
+
+
+def invalidate_recipes(recipe_ids):
+    """Make the cached bodies of the given recipes unreachable."""
+
+    for recipe_id in recipe_ids:
+        # A missing stamp needs no bump: a fresh one is created on next read
+        bump_cache_version(_version_key(recipe_id))
+
+
+def cache_stats():
+    """Return the shared hit and miss counters of the recipe body cache."""
+
+    counters = cache.get_many([HITS_KEY, MISSES_KEY])
+    return {'hits': counters.get(HITS_KEY, 0), 'misses': counters.get(MISSES_KEY, 0)}
@@ -1 +1,407 @@
-### Helper function and classes go here.
\ No newline at end of file
+### Helper function and classes go here.
+
+import base64
+import heapq
+import json
+import math
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.http import Http404
+
+
+class CursorPage:
+    """
+    A single page of results produced by keyset (cursor) pagination.
+
+    Unlike Django's `Paginator`, a cursor page never counts the full
+    result set. It only knows whether a neighbouring page exists and the
+    opaque cursor that points to it.
+
+    Attributes:
+        object_list (list): The objects on this page, in display order.
+        next_cursor (str | None): Cursor for the following page, if any.
+        previous_cursor (str | None): Cursor for the preceding page, if any.
+        page_size (int): The number of objects requested per page.
+    """
+
+    def __init__(self, object_list, next_cursor, previous_cursor, page_size, query_params):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.page_size = page_size
+        self._query_params = query_params
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def next_query(self):
+        """Return the query string (without `?`) linking to the next page."""
+
+        return self._query_for('after', self.next_cursor)
+
+    @property
+    def previous_query(self):
+        """Return the query string (without `?`) linking to the previous page."""
+
+        return self._query_for('before', self.previous_cursor)
+
+    def _query_for(self, direction, cursor):
+        if cursor is None:
+            return None
+        params = self._query_params.copy()
+        params.pop('after', None)
+        params.pop('before', None)
+        params[direction] = cursor
+        return params.urlencode()
+
+
+def _cursor_value(value):
+    """Serialize non-JSON values (datetimes etc.) without losing precision."""
+
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def encode_cursor(values):
+    """Encode a list of ordering values as an opaque, URL-safe cursor."""
+
+    raw = json.dumps(values, default=_cursor_value, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, fields):
+    """
+    Decode a cursor produced by `encode_cursor()`.
+
+    Args:
+        cursor (str): The opaque cursor taken from the query string.
+        fields (list[Field]): The model fields the cursor values belong to,
+            used to convert the JSON values back to Python types.
+
+    Returns:
+        list: The decoded ordering values.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise ValueError
+        return [field.to_python(value) for field, value in zip(fields, values)]
+    except Exception as error:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from error
+
+
+def keyset_filter(names, values, lookup):
+    """
+    Build a filter selecting rows strictly beyond `values` in keyset order.
+
+    The condition is the expanded form of the row comparison
+    `(a, b, c) > (x, y, z)`. The leading column is repeated as a plain range
+    (`a >= x`) so that SQLite can seek the composite index instead of
+    evaluating the OR over every row.
+
+    Args:
+        names (list[str]): The field names of the sort key, in order.
+        values (list): The sort key of the row to start after, e.g. from
+            `decode_cursor()`.
+        lookup (str): `gt` to select rows after `values` in ascending
+            order, `lt` in descending order.
+
+    Returns:
+        Q: The filter.
+    """
+
+    inclusive = f'{lookup}e'
+    condition = Q()
+    for i, name in enumerate(names):
+        term = Q(**{f'{name}__{lookup}': values[i]})
+        for previous_name, previous_value in zip(names[:i], values[:i]):
+            term &= Q(**{previous_name: previous_value})
+        condition |= term
+    return Q(**{f'{names[0]}__{inclusive}': values[0]}) & condition
+
+
+def get_cursor(request):
+    """
+    Read the page cursor from the `after` or `before` query parameter.
+
+    Empty values count as absent, so `?before=` shows the first page.
+
+    Returns:
+        tuple[str | None, bool]: The cursor (None for the first page), and
+        whether it is a `before` cursor, i.e. the page is read backwards.
+    """
+
+    after = request.GET.get('after') or None
+    before = request.GET.get('before') or None
+    if before is not None and after is None:
+        return before, True
+    return after, False
+
+
+def get_page_size(request, default=None):
+    """
+    Read the requested page size, bounded by `settings.MAX_PAGE_SIZE`.
+
+    Falls back to `default` (or `settings.DEFAULT_PAGE_SIZE`) when the
+    `page_size` query parameter is missing or not a positive integer.
+    """
+
+    if default is None:
+        default = settings.DEFAULT_PAGE_SIZE
+    try:
+        page_size = int(request.GET.get('page_size', default))
+    except ValueError:
+        page_size = default
+    if page_size < 1:
+        page_size = default
+    return min(page_size, settings.MAX_PAGE_SIZE)
+
+
+def paginate_by_cursor(request, queryset, ordering, page_size=None, row_class=None):
+    """
+    Return one page of `queryset` using keyset pagination.
+
+    The page is selected by the `after` or `before` cursor in the request's
+    query string. Only `page_size + 1` rows are ever fetched, so the cost of
+    a page does not depend on how deep into the result set it is, and no
+    `COUNT(*)` is issued.
+
+    Args:
+        request (HttpRequest): The current request.
+        queryset (QuerySet): The (unordered) rows to paginate.
+        ordering (list[str]): Field names forming a unique sort key, all
+            ascending or all descending (prefixed with `-`). The last field
+            should be the primary key so that the order is total.
+        page_size (int, optional): Rows per page. Defaults to the value
+            returned by `get_page_size()`.
+        row_class (type[Row], optional): A read model from
+            `recipes.read_models`; only its columns are fetched and the page
+            holds its rows instead of model instances. Its fields must
+            include the `ordering` fields.
+
+    Returns:
+        CursorPage: The requested page.
+
+    Raises:
+        Http404: If the supplied cursor is malformed.
+    """
+
+    query = _CursorQuery(request, queryset, ordering, page_size, row_class)
+    return query.page(list(query.queryset))
+
+
+async def apaginate_by_cursor(request, queryset, ordering, page_size=None, row_class=None):
+    """Async version of `paginate_by_cursor()`, for use in async views."""
+
+    query = _CursorQuery(request, queryset, ordering, page_size, row_class)
+    return query.page([row async for row in query.queryset])
+
+
+def select_page_ids(request, queryset, ordering, sort_keys, page_size=None):
+    """
+    Pick the ids of the rows `paginate_by_cursor()` would fetch, in memory.
+
+    For result sets already held in memory as ids (e.g. from the tag
+    index), this applies the page's cursor and size to the ids' sort keys,
+    so only the ids of the requested page need to be sent to the database
+    rather than the whole result set.
+
+    Args:
+        request (HttpRequest): The current request.
+        queryset (QuerySet): The rows that will be paginated.
+        ordering (list[str]): As for `paginate_by_cursor()`.
+        sort_keys (dict[int, tuple]): The values of the `ordering` fields of
+            every row in the result set, by primary key.
+        page_size (int, optional): As for `paginate_by_cursor()`.
+
+    Returns:
+        list[int]: At most `page_size + 1` primary keys.
+
+    Raises:
+        Http404: If the supplied cursor is malformed.
+    """
+
+    return _CursorQuery(request, queryset, ordering, page_size).select_ids(sort_keys)
+
+
+class _CursorQuery:
+    """The query for one keyset-paginated page, and how to turn its rows into a page."""
+
+    def __init__(self, request, queryset, ordering, page_size, row_class=None):
+        descending = ordering[0].startswith('-')
+        names = [name.lstrip('-') for name in ordering]
+        if any(name.startswith('-') != descending for name in ordering):
+            raise ValueError("Cursor pagination requires a single sort direction.")
+        self.request = request
+        self.row_class = row_class
+        self.fields = [queryset.model._meta.get_field(name) for name in names]
+        self.page_size = get_page_size(request) if page_size is None else page_size
+
+        self.cursor, self.backwards = get_cursor(request)
+
+        forward_lookup = 'lt' if descending else 'gt'
+        if self.backwards:
+            self.lookup = 'gt' if descending else 'lt'
+            order_by = [name if descending else f'-{name}' for name in names]
+        else:
+            self.lookup = forward_lookup
+            order_by = list(ordering)
+
+        self.bound = None
+        if self.cursor:
+            try:
+                self.bound = tuple(decode_cursor(self.cursor, self.fields))
+            except ValueError:
+                raise Http404("Invalid page cursor")
+            queryset = queryset.filter(keyset_filter(names, self.bound, self.lookup))
+        if row_class is not None:
+            queryset = row_class.project(queryset)
+        self.queryset = queryset.order_by(*order_by)[:self.page_size + 1]
+
+    def select_ids(self, sort_keys):
+        """Return the keys of `sort_keys` whose values this page's query would fetch."""
+
+        ascending = self.lookup == 'gt'
+        candidates = sort_keys.items()
+        if self.bound is not None:
+            candidates = [
+                (pk, key) for pk, key in candidates
+                if (key > self.bound if ascending else key < self.bound)
+            ]
+        select = heapq.nsmallest if ascending else heapq.nlargest
+        return [pk for pk, _ in select(self.page_size + 1, candidates, key=lambda item: item[1])]
+
+    def _cursor_for(self, row):
+        return encode_cursor([getattr(row, field.attname) for field in self.fields])
+
+    def page(self, rows):
+        """Build the page from the fetched rows."""
+
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if self.row_class is not None:
+            rows = self.row_class.build(rows)
+        if self.backwards:
+            rows.reverse()
+            next_cursor = self._cursor_for(rows[-1]) if rows else None
+            previous_cursor = self._cursor_for(rows[0]) if rows and has_more else None
+        else:
+            next_cursor = self._cursor_for(rows[-1]) if rows and has_more else None
+            previous_cursor = self._cursor_for(rows[0]) if rows and self.cursor else None
+        return CursorPage(rows, next_cursor, previous_cursor, self.page_size, self.request.GET)
+
+
+def filter_by_ids(queryset, ids, field='pk'):
+    """
+    Restrict `queryset` to rows whose primary key (or `field`) is in `ids`.
+
+    The ids are passed to SQLite as a single JSON array parameter expanded
+    with `json_each`, so arbitrarily large id sets stay within SQLite's
+    bound-parameter limit.
+    """
+
+    if not ids:
+        return queryset.none()
+    return queryset.filter(**{f'{field}__in': RawSQL('SELECT value FROM json_each(%s)', [json.dumps(sorted(ids))])})
+
+
+def get_cache_version(key, timeout=None):
+    """
+    Return the version stamp stored under `key` in the Django cache.
+
+    Missing stamps are created from the current time in milliseconds, so a
+    stamp that was evicted and recreated is unlikely to match a version a
+    process or cache entry already holds.
+
+    Args:
+        key (str): The cache key of the stamp.
+        timeout (int | None): Seconds a newly created stamp is kept, or
+            None to keep it until it is evicted.
+    """
+
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), timeout=timeout)
+        version = cache.get(key)
+    return version
+
+
+def bump_cache_version(key):
+    """
+    Advance the version stamp stored under `key`.
+
+    Returns:
+        int | None: The new version, or None if the stamp was missing (the
+        next `get_cache_version()` then creates a fresh one).
+    """
+
+    try:
+        return cache.incr(key)
+    except ValueError:
+        return None
+
+
+def increment_cache_counter(key):
+    """Add one to a counter shared by all processes through the Django cache."""
+
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def start_flush_timer(interval, flush):
+    """
+    Call `flush` once, `interval` seconds from now, in a daemon thread.
+
+    The in-memory write buffers use this so that what they hold is written
+    even if no further request comes in. The database connections the
+    thread opened are closed once `flush` returns.
+
+    Args:
+        interval (float): Seconds to wait.
+        flush (Callable[[], object]): The function to call; it should not
+            raise.
+
+    Returns:
+        threading.Timer | None: The started timer, or None if `interval`
+        is infinite (flushing disabled).
+    """
+
+    if not math.isfinite(interval):
+        return None
+
+    def run():
+        try:
+            flush()
+        finally:
+            connections.close_all()
+
+    timer = threading.Timer(interval, run)
+    timer.daemon = True
+    timer.start()
+    return timer
@@ -0,0 +1,227 @@
+"""
+Bulk import of recipes from CSV or JSON Lines files.
+
+Rows are read lazily from the file and inserted in batches: one
+`bulk_create` for the recipes and one for their `Recipe.tags` through
+rows. Authors and tags are resolved through in-memory maps that are
+filled once per batch with a single query, so the number of queries
+depends on the number of batches rather than rows.
+
+`bulk_create` sends no signals and skips `Recipe.save()`, so the summary
+columns (see `recipes.summaries`) are filled from the row itself, and
+after each batch the derived data the signal handlers in
+`recipes.signals` would normally maintain (search index, ingredient
+index, followers' feeds, tag index, tag autocompletion, list stamp) is
+updated explicitly.
+"""
+
+import csv
+import json
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import transaction
+from recipes import conditional, feed, ingredients, search
+from recipes.models import FoodTag, Recipe, User, encode_tag_names
+from recipes.tag_index import tag_index
+from recipes.tag_trie import tag_trie
+
+REQUIRED_FIELDS = ('name', 'author', 'ingredients', 'instructions', 'difficulty_level', 'preparation_time_mins')
+TEXT_FIELDS = ('name', 'author', 'ingredients', 'instructions', 'difficulty_level')
+
+
+def _limit(field, validator_class):
+    for validator in field.validators:
+        if isinstance(validator, validator_class):
+            return validator.limit_value
+    return None
+
+
+_PREPARATION_TIME = Recipe._meta.get_field('preparation_time_mins')
+MIN_PREPARATION_TIME = _limit(_PREPARATION_TIME, MinValueValidator)
+MAX_PREPARATION_TIME = _limit(_PREPARATION_TIME, MaxValueValidator)
+
+
+def _is_name_list(value):
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+def _tag_names(row):
+    """Return the tag names of a row, or an empty list if they are malformed."""
+
+    tags = row.get('tags') or []
+    return tags if _is_name_list(tags) else []
+
+
+def read_rows(path, file_format=None):
+    """
+    Lazily read import rows from a CSV or JSON Lines file.
+
+    CSV files need a header row; their `tags` column holds tag names
+    separated by `;`. In JSON Lines files `tags` is a list of names.
+
+    Args:
+        path (str): The file to read.
+        file_format (str, optional): `'csv'` or `'jsonl'`; guessed from the
+            file extension when omitted.
+
+    Yields:
+        dict: One row per recipe, in file order.
+
+    Raises:
+        ValueError: If the format is unknown, or a JSON line is malformed
+            or does not hold an object.
+    """
+
+    file_format = file_format or ('csv' if str(path).lower().endswith('.csv') else 'jsonl')
+    if file_format not in ('csv', 'jsonl'):
+        raise ValueError(f"Unknown import format '{file_format}'")
+    with open(path, newline='', encoding='utf-8') as file:
+        if file_format == 'csv':
+            for row in csv.DictReader(file):
+                tags = row.get('tags') or ''
+                row['tags'] = [tag.strip() for tag in tags.split(';') if tag.strip()]
+                yield row
+            return
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as error:
+                raise ValueError(f"Line {line_number}: {error.msg}") from error
+            if not isinstance(row, dict):
+                raise ValueError(f"Line {line_number}: expected a JSON object")
+            yield row
+
+
+class RecipeImporter:
+    """
+    Insert recipes in batches, resolving authors and tags through lookup maps.
+
+    Args:
+        create_tags (bool): Create tags that do not exist yet instead of
+            rejecting the rows using them.
+    """
+
+    def __init__(self, create_tags=False):
+        self.create_tags = create_tags
+        self._authors = {}
+        self._tags = None
+
+    def _resolve_authors(self, rows):
+        """Load the ids of the batch's authors that are not in the map yet."""
+
+        usernames = {row['author'] for row in rows if isinstance(row.get('author'), str)} - self._authors.keys()
+        if usernames:
+            found = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+            for username in usernames:
+                self._authors[username] = found.get(username)
+
+    def _resolve_tags(self, rows):
+        """Load the tag map, creating the batch's missing tags if allowed."""
+
+        if self._tags is None:
+            self._tags = dict(FoodTag.objects.values_list('tag_name', 'id'))
+        missing = {tag for row in rows for tag in _tag_names(row)} - self._tags.keys()
+        if missing and self.create_tags:
+            # Created through save() so the tag index learns about them
+            for tag_name in sorted(missing):
+                self._tags[tag_name] = FoodTag.objects.get_or_create(tag_name=tag_name)[0].pk
+
+    def validate(self, row):
+        """
+        Check one row against the recipe constraints.
+
+        Returns:
+            str or None: A description of the first problem, or None if the
+            row can be imported.
+        """
+
+        for field in REQUIRED_FIELDS:
+            if row.get(field) in (None, ''):
+                return f"Missing {field}"
+        for field in TEXT_FIELDS:
+            if not isinstance(row[field], str):
+                return f"{field} is not text"
+        tags = row.get('tags') or []
+        if not _is_name_list(tags):
+            return "tags is not a list of names"
+        for field in ('name', 'difficulty_level'):
+            max_length = Recipe._meta.get_field(field).max_length
+            if len(row[field]) > max_length:
+                return f"{field} is longer than {max_length} characters"
+        try:
+            preparation_time = int(row['preparation_time_mins'])
+        except (TypeError, ValueError):
+            return "preparation_time_mins is not a whole number"
+        if not MIN_PREPARATION_TIME <= preparation_time <= MAX_PREPARATION_TIME:
+            return f"preparation_time_mins must be between {MIN_PREPARATION_TIME} and {MAX_PREPARATION_TIME}"
+        if self._authors.get(row['author']) is None:
+            return f"Unknown author {row['author']}"
+        unknown = [tag for tag in tags if tag not in self._tags]
+        if unknown:
+            return f"Unknown tags {', '.join(unknown)}"
+        return None
+
+    def import_batch(self, rows):
+        """
+        Validate and insert one batch of rows in a single transaction.
+
+        Args:
+            rows (list[dict]): The rows of the batch.
+
+        Returns:
+            tuple[int, list[tuple[int, str]]]: The number of recipes
+            inserted, and the index within the batch and description of
+            every rejected row.
+        """
+
+        self._resolve_authors(rows)
+        self._resolve_tags(rows)
+        recipes, tag_ids, errors = [], [], []
+        for index, row in enumerate(rows):
+            error = self.validate(row)
+            if error:
+                errors.append((index, error))
+                continue
+            recipes.append(Recipe(
+                name=row['name'],
+                author_id=self._authors[row['author']],
+                ingredients=row['ingredients'],
+                instructions=row['instructions'],
+                difficulty_level=row['difficulty_level'],
+                preparation_time_mins=int(row['preparation_time_mins']),
+                author_name=row['author'],
+                tag_names=encode_tag_names(set(_tag_names(row))),
+            ))
+            tag_ids.append({self._tags[tag] for tag in _tag_names(row)})
+        if not recipes:
+            return 0, errors
+        with transaction.atomic():
+            Recipe.objects.bulk_create(recipes)
+            through = Recipe.tags.through
+            through.objects.bulk_create([
+                through(recipe_id=recipe.pk, foodtag_id=tag_id)
+                for recipe, tags in zip(recipes, tag_ids) for tag_id in tags
+            ])
+            self._update_derived_data(recipes, tag_ids)
+        return len(recipes), errors
+
+    def _update_derived_data(self, recipes, tag_ids):
+        """Do the work the (skipped) save signals would have done."""
+
+        recipe_ids = [recipe.pk for recipe in recipes]
+        search.index_recipes(recipe_ids)
+        ingredients.index_recipes(recipes)
+        feed.publish(recipes, tag_ids)
+        by_tag = {}
+        for recipe_id, tags in zip(recipe_ids, tag_ids):
+            for tag_id in tags:
+                by_tag.setdefault(tag_id, set()).add(recipe_id)
+
+        def update_tag_index():
+            for tag_id, ids in by_tag.items():
+                tag_index.add({tag_id}, ids)
+
+        transaction.on_commit(update_tag_index)
+        transaction.on_commit(tag_trie.invalidate)
+        transaction.on_commit(conditional.touch_recipe_list)
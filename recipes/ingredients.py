@@ -0,0 +1,230 @@
+"""
+Ingredient normalization and the "cook with what I have" query.
+
+`Recipe.ingredients` is free text. `split_ingredients()` splits it into
+single ingredients, and `normalize_ingredients()` reduces each one to a
+bare ingredient name ("2 large eggs, beaten" -> "egg"); the names are
+stored as `RecipeIngredient` rows by `index_recipes()`. The rows are
+refreshed whenever a recipe is saved (see `recipes.signals`) and can be
+backfilled with `python manage.py backfill_ingredients`. Pantry lists are
+split with the same parser, so both sides agree on what an ingredient is.
+"""
+
+import re
+from django.db import transaction
+from django.db.models import Count, F, FloatField, Max
+from django.db.models.functions import Cast
+from recipes.models import Recipe, RecipeIngredient
+
+_NAME_MAX_LENGTH = RecipeIngredient._meta.get_field('name').max_length
+
+_SEPARATORS = re.compile(r'[\n;]+')
+_PARENTHESES = re.compile(r'\([^)]*\)')
+_QUANTITY = re.compile(r'\d+(?:[./]\d+)?|[¼½¾⅓⅔⅛]')
+_WORD = re.compile(r"[^\W\d_]+(?:-[^\W\d_]+)*")
+
+_UNITS = {
+    'g', 'gram', 'grams', 'kg', 'kilogram', 'kilograms', 'mg', 'ml', 'millilitre', 'millilitres',
+    'milliliter', 'milliliters', 'l', 'litre', 'litres', 'liter', 'liters', 'cl', 'dl',
+    'oz', 'ounce', 'ounces', 'lb', 'lbs', 'pound', 'pounds', 'cup', 'cups',
+    'tbsp', 'tbs', 'tablespoon', 'tablespoons', 'tsp', 'teaspoon', 'teaspoons',
+    'pinch', 'pinches', 'dash', 'dashes', 'handful', 'handfuls', 'bunch', 'bunches',
+    'can', 'cans', 'tin', 'tins', 'jar', 'jars', 'packet', 'packets', 'pack', 'packs',
+    'slice', 'slices', 'piece', 'pieces', 'sprig', 'sprigs', 'knob', 'splash',
+}
+
+_DESCRIPTORS = {
+    'a', 'an', 'of', 'and', 'or', 'to', 'for', 'the', 'some', 'about', 'approx', 'taste',
+    'large', 'medium', 'small', 'big', 'extra', 'fresh', 'freshly', 'dried', 'frozen', 'raw',
+    'chopped', 'finely', 'roughly', 'diced', 'sliced', 'minced', 'grated', 'crushed', 'ground',
+    'peeled', 'beaten', 'melted', 'softened', 'cooked', 'uncooked', 'whole', 'halved',
+    'optional', 'ripe', 'boneless', 'skinless', 'organic', 'plain', 'lightly', 'thinly',
+}
+
+# Words that, besides descriptors and past participles, make up
+# preparation notes such as "to taste" or "cut into cubes"
+_NOTE_WORDS = {
+    'as', 'at', 'if', 'in', 'into', 'cut', 'needed', 'desired', 'serve', 'serving', 'garnish',
+    'plus', 'more', 'room', 'temperature', 'cubes', 'pieces', 'rings', 'strips', 'wedges',
+}
+
+# Words whose trailing "s" is not a plural
+_SINGULAR_EXCEPTIONS = {'asparagus', 'couscous', 'hummus', 'molasses', 'swiss', 'citrus', 'lemongrass'}
+
+
+def singularize(word):
+    """Return a naive singular form of an English ingredient word."""
+
+    if word in _SINGULAR_EXCEPTIONS or len(word) <= 3:
+        return word
+    if word.endswith('ies'):
+        return word[:-3] + 'y'
+    if word.endswith('oes') or word.endswith(('ches', 'shes', 'sses', 'xes')):
+        return word[:-2]
+    if word.endswith('s') and not word.endswith(('ss', 'us')):
+        return word[:-1]
+    return word
+
+
+def _is_note(segment):
+    """Tell whether a comma-separated segment is a preparation note."""
+
+    words = _WORD.findall(_QUANTITY.sub(' ', segment.lower()))
+    return all(
+        word in _DESCRIPTORS or word in _NOTE_WORDS or (len(word) > 4 and word.endswith('ed'))
+        for word in words
+    )
+
+
+def split_ingredients(text):
+    """
+    Split free text into single ingredients.
+
+    Lines and semicolons always separate ingredients. Commas separate them
+    too, unless what follows the comma is a preparation note made only of
+    descriptive words ("onion, finely chopped"); notes are dropped, as are
+    parenthesised asides.
+
+    Args:
+        text (str): Ingredients as typed, e.g. "eggs, flour, milk".
+
+    Returns:
+        list[str]: The non-blank ingredients, e.g. `['eggs', 'flour', 'milk']`.
+    """
+
+    items = []
+    for line in _SEPARATORS.split(text or ''):
+        for segment in _PARENTHESES.sub(' ', line).split(','):
+            if segment.strip() and not _is_note(segment):
+                items.append(segment.strip())
+    return items
+
+
+def normalize_ingredient(line):
+    """
+    Reduce one ingredient line to a normalized ingredient name.
+
+    Anything after the first comma is a preparation note ("tomatoes,
+    drained") and is dropped. Quantities, units, parenthesised notes and
+    common descriptive words are removed, the text is lower-cased and the
+    last word is singularized.
+
+    Args:
+        line (str): A single ingredient, e.g. "200g plain flour (sifted)".
+
+    Returns:
+        str | None: The normalized name (e.g. "flour"), or None if nothing
+        is left once quantities and descriptors are removed.
+    """
+
+    text = _PARENTHESES.sub(' ', line.lower()).split(',', 1)[0]
+    text = _QUANTITY.sub(' ', text)
+    words = [word for word in _WORD.findall(text) if word not in _UNITS and word not in _DESCRIPTORS]
+    if not words:
+        return None
+    words[-1] = singularize(words[-1])
+    return ' '.join(words)[:_NAME_MAX_LENGTH]
+
+
+def normalize_ingredients(text):
+    """
+    Split free-text ingredients into unique normalized ingredient names.
+
+    The text is split with `split_ingredients()`.
+
+    Returns:
+        list[str]: The names in order of first appearance.
+    """
+
+    names = []
+    for item in split_ingredients(text):
+        name = normalize_ingredient(item)
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def index_recipes(recipes):
+    """
+    Replace the `RecipeIngredient` rows of the given recipes.
+
+    Args:
+        recipes (Iterable[Recipe]): Recipes with their `ingredients` loaded.
+    """
+
+    recipes = list(recipes)
+    if not recipes:
+        return
+    rows = []
+    for recipe in recipes:
+        names = normalize_ingredients(recipe.ingredients)
+        rows.extend(
+            RecipeIngredient(recipe_id=recipe.pk, name=name, ingredient_count=len(names))
+            for name in names
+        )
+    with transaction.atomic():
+        RecipeIngredient.objects.filter(recipe_id__in=[recipe.pk for recipe in recipes]).delete()
+        RecipeIngredient.objects.bulk_create(rows)
+
+
+def backfill(batch_size=1000):
+    """
+    Rebuild the ingredient rows of every recipe in id-ordered batches.
+
+    Each batch runs in its own transaction and only loads the `id` and
+    `ingredients` columns.
+
+    Args:
+        batch_size (int): Number of recipes processed per batch.
+
+    Yields:
+        int: The running total of processed recipes after each batch.
+    """
+
+    processed = 0
+    last_id = 0
+    while True:
+        recipes = list(
+            Recipe.objects.filter(id__gt=last_id).order_by('id').only('id', 'ingredients')[:batch_size]
+        )
+        if not recipes:
+            break
+        index_recipes(recipes)
+        processed += len(recipes)
+        last_id = recipes[-1].pk
+        yield processed
+
+
+def rank_recipes_by_pantry(pantry, limit):
+    """
+    Rank recipes by how much of their ingredient list a pantry covers.
+
+    Only the rows of the pantry's ingredients are read, straight from the
+    `(name, recipe, ingredient_count)` index; recipes sharing no
+    ingredient with the pantry are never touched. The grouping by recipe
+    and the sort by coverage (a computed ratio no index can provide) run
+    in temporary B-trees over those rows alone.
+
+    Args:
+        pantry (Iterable[str]): Ingredients the user has, one per item, as
+            returned by `split_ingredients()`.
+        limit (int): Maximum number of recipes to return.
+
+    Returns:
+        list[dict]: One entry per recipe, best first, with the keys
+        `recipe_id`, `matched` (pantry ingredients used) and `total`
+        (ingredients in the recipe).
+    """
+
+    names = {name for name in (normalize_ingredient(item) for item in pantry) if name}
+    if not names:
+        return []
+    ranked = (
+        RecipeIngredient.objects
+        .filter(name__in=names)
+        .values('recipe_id')
+        .annotate(matched=Count('*'), total=Max('ingredient_count'))
+        .annotate(coverage=Cast(F('matched'), FloatField()) / F('total'))
+        .order_by('-coverage', '-matched', 'recipe_id')
+    )
+    return list(ranked.values('recipe_id', 'matched', 'total')[:limit])
@@ -0,0 +1,80 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from recipes.benchmark import named_urls, seed_dataset
+from recipes.models import Recipe
+from recipes.query_plans import audit, capture_statements, default_clients, shorten, variant_urls
+
+
+class Command(BaseCommand):
+    """
+    Management command to audit the query plans of every named URL.
+
+    Like `benchmark`, it seeds a synthetic dataset into a throwaway test
+    database and requests every named URL, anonymously and logged in, plus
+    their filtered variants and second pages (see
+    `recipes.query_plans.capture_statements()`). Each distinct SQL
+    statement is then explained with `EXPLAIN QUERY PLAN`; full table
+    scans, temporary B-trees and non-covering index searches are reported
+    together with the URLs running them and, where an index would help, a
+    proposed `models.Index`.
+
+    Attributes:
+        help (str): Short description displayed when running
+            `python manage.py help audit_query_plans`.
+    """
+
+    help = 'Explains the SQL run by every named URL and flags inefficient plans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help='Number of users in the dataset')
+        parser.add_argument('--recipes', type=int, default=1000, help='Number of recipes in the dataset')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed used to generate the dataset')
+        parser.add_argument('--all', action='store_true', help='Also list informational findings and clean statements')
+        parser.add_argument('--strict', action='store_true', help='Fail if any statement scans a table an index could serve')
+
+    def handle(self, *args, **options):
+        """Capture, explain and report the statements of every URL."""
+
+        if connection.vendor != 'sqlite':
+            raise CommandError('Query plans can only be audited on SQLite')
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            user = seed_dataset(options['users'], options['recipes'], options['seed'])
+            recipe = Recipe.objects.order_by('id').values_list('id', flat=True).first()
+            urls = named_urls({'recipe_id': recipe, 'pk': user.pk}) + variant_urls()
+            statements = capture_statements(default_clients(user), urls)
+            flagged = audit(statements)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        proposals = set()
+        for statement in (statements if options['all'] else flagged):
+            findings = [f for f in statement.findings if options['all'] or f[0] != 'full-read']
+            if not findings and not options['all']:
+                continue
+            self.report(statement, findings)
+            proposals.update(proposal for _, _, proposal in findings if proposal)
+
+        scans = sum(1 for statement in flagged for kind, _, _ in statement.findings if kind == 'scan')
+        self.stdout.write(f"{len(statements)} distinct statements, {len(flagged)} with findings, {scans} avoidable scans.")
+        if proposals:
+            self.stdout.write('Proposed indexes:')
+            for proposal in sorted(proposals):
+                self.stdout.write(f'  {proposal}')
+        if options['strict'] and scans:
+            raise CommandError(f'{scans} statements scan a table an index could serve')
+
+    def report(self, statement, findings):
+        """Print one statement with its plan and findings."""
+
+        style = self.style.WARNING if any(kind in ('scan', 'temp-btree') for kind, _, _ in findings) else str
+        self.stdout.write(style(shorten(statement.sql)))
+        self.stdout.write(f"  run {statement.count}x by {', '.join(sorted(statement.origins))}")
+        for line in statement.plan:
+            self.stdout.write(f'  | {line}')
+        for kind, table, proposal in findings:
+            self.stdout.write(f"  {kind}: {table}" + (f" -> {proposal}" if proposal else ''))
+        self.stdout.write('')
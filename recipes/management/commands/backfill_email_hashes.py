@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recipes.models import User
+from recipes.models.user import gravatar_hash
+
+
+class Command(BaseCommand):
+    """
+    Management command to fill in the stored Gravatar hash of every user.
+
+    Users are read in id-ordered batches (id and email only) and the rows
+    whose stored hash is missing or out of date are written back with one
+    `bulk_update` per batch.
+
+    Attributes:
+        help (str): Short description displayed when running
+            `python manage.py help backfill_email_hashes`.
+    """
+
+    help = 'Stores the Gravatar hash of every user whose hash is missing or stale'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of users processed per batch')
+
+    def handle(self, *args, **options):
+        """Backfill the hashes and report progress."""
+
+        processed = updated = 0
+        last_id = 0
+        while True:
+            users = list(
+                User.objects.filter(id__gt=last_id).order_by('id')
+                .only('id', 'email', 'email_hash')[:options['batch_size']]
+            )
+            if not users:
+                break
+            stale = []
+            for user in users:
+                email_hash = gravatar_hash(user.email)
+                if user.email_hash != email_hash:
+                    user.email_hash = email_hash
+                    stale.append(user)
+            with transaction.atomic():
+                User.objects.bulk_update(stale, ['email_hash'])
+            processed += len(users)
+            updated += len(stale)
+            last_id = users[-1].pk
+            self.stdout.write(f"Processed {processed} users", ending='\r')
+        self.stdout.write(f"Email hashes backfilled: {updated} of {processed} users updated.")
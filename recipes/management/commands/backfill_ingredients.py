@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from recipes import ingredients
+
+
+class Command(BaseCommand):
+    """
+    Management command to rebuild the normalized ingredient index.
+
+    Every recipe's free-text ingredients are re-parsed into
+    `RecipeIngredient` rows, in id-ordered batches that each commit on
+    their own.
+
+    Attributes:
+        help (str): Short description displayed when running
+            `python manage.py help backfill_ingredients`.
+    """
+
+    help = 'Rebuilds the normalized ingredient index of every recipe'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of recipes processed per batch')
+
+    def handle(self, *args, **options):
+        """Backfill the ingredient rows and report progress."""
+
+        processed = 0
+        for processed in ingredients.backfill(batch_size=options['batch_size']):
+            self.stdout.write(f"Processed {processed} recipes", ending='\r')
+        self.stdout.write(f"Ingredient index rebuilt for {processed} recipes.")
@@ -0,0 +1,127 @@
+import json
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (
+    override_settings, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment,
+)
+from recipes.benchmark import compare, run_benchmark, run_memory_benchmark, seed_dataset
+
+
+class Command(BaseCommand):
+    """
+    Management command to benchmark every named URL of the site.
+
+    A throwaway test database is created and seeded with a synthetic
+    dataset, so the benchmark never touches real data and every run starts
+    from the same state. Each URL is then requested through the test
+    client, anonymously and logged in, and the latency percentiles, query
+    count, SQL time and response size are written as JSON, along with the
+    memory a page of list rows holds as model instances and as read-model
+    rows (informational, not compared against the baseline).
+
+    With `--baseline`, the results are compared against an earlier run and
+    the command fails if any URL got slower than `--threshold` allows or
+    runs more queries; `--update-baseline` stores the run as the new
+    baseline instead.
+
+    Attributes:
+        help (str): Short description displayed when running
+            `python manage.py help benchmark`.
+    """
+
+    help = 'Benchmarks every named URL on a synthetic dataset'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000, help='Number of users in the dataset')
+        parser.add_argument('--recipes', type=int, default=5000, help='Number of recipes in the dataset')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed used to generate the dataset')
+        parser.add_argument('--requests', type=int, default=50, help='Measured requests per URL and client')
+        parser.add_argument('--warmup', type=int, default=2, help='Unmeasured requests sent to each URL first')
+        parser.add_argument('--output', default='benchmark.json', help='File the results are written to')
+        parser.add_argument('--baseline', help='Results of an earlier run to compare against')
+        parser.add_argument('--threshold', type=float, default=20.0, help='Allowed slowdown, in percent')
+        parser.add_argument('--min-delta-ms', type=float, default=1.0, help='Slowdowns below this are ignored')
+        parser.add_argument('--update-baseline', action='store_true', help='Store the results as the new baseline')
+
+    def handle(self, *args, **options):
+        """Seed the dataset, run the benchmark and compare it with the baseline."""
+
+        if options['requests'] < 1:
+            raise CommandError('--requests must be at least 1')
+        if options['update_baseline'] and not options['baseline']:
+            raise CommandError('--update-baseline needs --baseline')
+        baseline = None
+        if options['baseline'] and not options['update_baseline']:
+            baseline = self.read_results(options['baseline'])
+
+        results, memory = self.run(options)
+        self.write_results(options['output'], results, memory)
+        self.report(results)
+        self.report_memory(memory)
+        self.stdout.write(f"Results written to {options['output']}.")
+
+        if options['update_baseline']:
+            self.write_results(options['baseline'], results, memory)
+            self.stdout.write(f"Baseline {options['baseline']} updated.")
+        elif baseline is not None:
+            regressions = compare(results, baseline, options['threshold'], options['min_delta_ms'])
+            for key, metric, old, new in regressions:
+                self.stderr.write(f"{key}: {metric} {old} -> {new}")
+            if regressions:
+                raise CommandError(f"{len(regressions)} regressions against {options['baseline']}")
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}."))
+
+    def run(self, options):
+        """Benchmark the URLs and list row memory against a freshly seeded test database."""
+
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            for cache in caches.all():
+                cache.clear()
+            self.stdout.write(f"Seeding {options['users']} users and {options['recipes']} recipes...")
+            user = seed_dataset(options['users'], options['recipes'], options['seed'])
+            # Measure the pages as served, not the development budget checks
+            with override_settings(QUERY_BUDGET_RAISE=False):
+                results = run_benchmark(user, options['requests'], options['warmup'])
+            return results, run_memory_benchmark()
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+    def report(self, results):
+        """Print one line of metrics per URL."""
+
+        for key, metrics in results.items():
+            self.stdout.write(
+                f"{key:<40} {metrics['status']} p50 {metrics['p50_ms']:8.2f}ms  p95 {metrics['p95_ms']:8.2f}ms  "
+                f"p99 {metrics['p99_ms']:8.2f}ms  {metrics['queries']:5g} queries  "
+                f"{metrics['sql_ms']:7.2f}ms SQL  {metrics['bytes']} bytes"
+            )
+
+    def report_memory(self, memory):
+        """Print the memory held per list row."""
+
+        for name, metrics in memory.items():
+            self.stdout.write(
+                f"{name} list rows: {metrics['model_bytes']} bytes as model instances, "
+                f"{metrics['row_bytes']} bytes as read-model rows ({metrics['saved_percent']}% saved)"
+            )
+
+    def read_results(self, path):
+        """Load the results of an earlier run."""
+
+        try:
+            with open(path) as file:
+                return json.load(file)['results']
+        except FileNotFoundError as error:
+            raise CommandError(f"Baseline {path} not found; create it with --update-baseline") from error
+        except (ValueError, KeyError, TypeError) as error:
+            raise CommandError(f"Unreadable baseline {path}") from error
+
+    def write_results(self, path, results, memory):
+        """Write the results of this run as JSON."""
+
+        with open(path, 'w') as file:
+            json.dump({'results': results, 'memory': memory}, file, indent=2, sort_keys=True)
+            file.write('\n')
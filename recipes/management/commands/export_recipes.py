@@ -0,0 +1,41 @@
+import sys
+from django.core.management.base import BaseCommand
+from recipes.export import gzip_chunks, iter_ndjson
+
+
+class Command(BaseCommand):
+    """
+    Management command to export the whole recipe catalog as NDJSON.
+
+    Recipes are streamed in id-ordered batches to a file (or standard
+    output), optionally gzip-compressed, with flat memory use.
+
+    Attributes:
+        help (str): Short description displayed when running
+            `python manage.py help export_recipes`.
+    """
+
+    help = 'Exports every recipe with its author and tags as NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help='File to write to (defaults to standard output)')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output with gzip')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of recipes fetched per query')
+
+    def handle(self, *args, **options):
+        """Write the export and report the number of bytes written."""
+
+        chunks = iter_ndjson(batch_size=options['batch_size'])
+        if options['gzip']:
+            chunks = gzip_chunks(chunks)
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        written = 0
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if options['output']:
+                output.close()
+        if options['output']:
+            self.stdout.write(f"Exported {written} bytes to {options['output']}.")
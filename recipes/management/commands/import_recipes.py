@@ -0,0 +1,83 @@
+import os
+import time
+from itertools import islice
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipes.importer import RecipeImporter, read_rows
+from recipes.models import ImportCheckpoint
+
+
+class Command(BaseCommand):
+    """
+    Management command to bulk import recipes from a CSV or JSON Lines file.
+
+    The file is read lazily and inserted in batches, each in its own
+    transaction. The number of rows consumed so far is recorded in an
+    `ImportCheckpoint` row within the same transaction as the batch, so
+    the checkpoint and the recipes are committed together; if the import
+    fails, running the command again resumes after the last committed
+    batch. The checkpoint is removed once the whole file has been imported.
+
+    Attributes:
+        help (str): Short description displayed when running
+            `python manage.py help import_recipes`.
+    """
+
+    help = 'Imports recipes in bulk from a CSV or JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or JSON Lines file to import')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='File format (guessed from the extension by default)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of rows inserted per batch')
+        parser.add_argument('--checkpoint', help='Checkpoint name (defaults to the absolute path of the file)')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint and start from the first row')
+        parser.add_argument('--create-tags', action='store_true', help='Create unknown tags instead of rejecting their rows')
+
+    def handle(self, *args, **options):
+        """Import the file batch by batch and report throughput."""
+
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        checkpoint = options['checkpoint'] or os.path.abspath(options['path'])
+        start = 0 if options['restart'] else self.read_checkpoint(checkpoint)
+        if start:
+            self.stdout.write(f"Resuming after row {start}.")
+
+        importer = RecipeImporter(create_tags=options['create_tags'])
+        try:
+            rows = islice(read_rows(options['path'], options['format']), start, None)
+            consumed, imported, rejected = start, 0, 0
+            started = time.perf_counter()
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                with transaction.atomic():
+                    inserted, errors = importer.import_batch(batch)
+                    self.write_checkpoint(checkpoint, consumed + len(batch))
+                for index, error in errors:
+                    self.stderr.write(f"Row {consumed + index + 1}: {error}")
+                consumed += len(batch)
+                imported += inserted
+                rejected += len(errors)
+                rate = (consumed - start) / max(time.perf_counter() - started, 1e-9)
+                self.stdout.write(f"Processed {consumed} rows ({rate:.0f} rows/s)", ending='\r')
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error)) from error
+
+        ImportCheckpoint.objects.filter(name=checkpoint).delete()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"Imported {imported} recipes, rejected {rejected} rows "
+            f"in {elapsed:.1f}s ({(consumed - start) / max(elapsed, 1e-9):.0f} rows/s)."
+        )
+
+    def read_checkpoint(self, name):
+        """Return the number of rows already imported, according to the checkpoint."""
+
+        return ImportCheckpoint.objects.filter(name=name).values_list('rows', flat=True).first() or 0
+
+    def write_checkpoint(self, name, rows):
+        """Record that the first `rows` rows have been imported; call it in the batch's transaction."""
+
+        ImportCheckpoint.objects.update_or_create(name=name, defaults={'rows': rows})
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from recipes.throttle import throttle_stats
+
+
+class Command(BaseCommand):
+    """
+    Management command to report the password check throttling counters.
+
+    The counters live in the configured cache backend, so with a shared
+    backend they cover every worker process.
+
+    Attributes:
+        help (str): Short description displayed when running
+            `python manage.py help login_throttle_stats`.
+    """
+
+    help = 'Reports allowed and throttled password checks'
+
+    def handle(self, *args, **options):
+        """Print the allowed and throttled counters and the throttled ratio."""
+
+        stats = throttle_stats()
+        total = stats['allowed'] + stats['throttled']
+        ratio = stats['throttled'] / total if total else 0
+        self.stdout.write(f"allowed={stats['allowed']} throttled={stats['throttled']} throttled_ratio={ratio:.1%}")
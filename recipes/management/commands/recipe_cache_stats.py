@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from recipes import fragment_cache
+
+
+class Command(BaseCommand):
+    """
+    Management command to report the recipe page body cache counters.
+
+    The counters live in the configured cache backend, so with a shared
+    backend they cover every worker process.
+
+    Attributes:
+        help (str): Short description displayed when running
+            `python manage.py help recipe_cache_stats`.
+    """
+
+    help = 'Reports hits and misses of the recipe page body cache'
+
+    def handle(self, *args, **options):
+        """Print the hit and miss counters and the hit ratio."""
+
+        stats = fragment_cache.cache_stats()
+        total = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / total if total else 0
+        self.stdout.write(f"hits={stats['hits']} misses={stats['misses']} hit_ratio={ratio:.1%}")
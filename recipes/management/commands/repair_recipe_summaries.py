@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from recipes import feed, summaries
+
+
+class Command(BaseCommand):
+    """
+    Management command to find and fix stale recipe summary columns.
+
+    Every recipe's stored author name and tag names (see
+    `recipes.summaries`) are compared with the users and tag tables, and
+    every user's follower count (see `recipes.feed`) with their follows,
+    in id-ordered batches, and the stale rows are written back. With
+    `--check` nothing is written and the command fails if any row is
+    stale.
+
+    Attributes:
+        help (str): Short description displayed when running
+            `python manage.py help repair_recipe_summaries`.
+    """
+
+    help = 'Finds recipes whose stored author name or tag names, and users whose follower count, are out of date and fixes them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of recipes or users checked per batch')
+        parser.add_argument('--check', action='store_true', help='Only report stale rows, failing if there are any')
+
+    def _run(self, batches, noun):
+        """Consume a repair generator, showing progress; return the totals."""
+
+        checked = 0
+        stale = []
+        for count, stale_ids in batches:
+            checked += count
+            stale += stale_ids
+            self.stdout.write(f"Checked {checked} {noun}", ending='\r')
+        return checked, stale
+
+    def handle(self, *args, **options):
+        """Compare the summaries, fix them unless checking, and report."""
+
+        fix = not options['check']
+        checked, stale = self._run(summaries.repair(options['batch_size'], fix=fix), 'recipes')
+        users_checked, stale_users = self._run(feed.repair_follower_counts(options['batch_size'], fix=fix), 'users')
+        if options['check']:
+            errors = []
+            if stale:
+                shown = ', '.join(str(recipe_id) for recipe_id in stale[:20])
+                errors.append(f"{len(stale)} of {checked} recipes have stale summaries (ids {shown}{', ...' if len(stale) > 20 else ''}).")
+            if stale_users:
+                shown = ', '.join(str(user_id) for user_id in stale_users[:20])
+                errors.append(f"{len(stale_users)} of {users_checked} users have a stale follower count (ids {shown}{', ...' if len(stale_users) > 20 else ''}).")
+            if errors:
+                raise CommandError(' '.join(errors))
+            self.stdout.write(f"Recipe summaries up to date: {checked} recipes and {users_checked} users checked.")
+            return
+        self.stdout.write(f"Recipe summaries repaired: {len(stale)} of {checked} recipes updated.")
+        self.stdout.write(f"Follower counts repaired: {len(stale_users)} of {users_checked} users updated.")
@@ -2,17 +2,20 @@
 Management command to seed the database with demo data.
 
 This command creates a small set of named fixture users and then fills up
-to ``USER_COUNT`` total users using Faker-generated data. Existing records
-are left untouched—if a create fails (e.g., due to duplicates), the error
-is swallowed and generation continues.
+to the requested number of users (``USER_COUNT`` by default) with
+Faker-generated data. Existing records are left untouched. Users are
+inserted with ``bulk_create`` in batches, all sharing one password hash
+computed up front, so millions of users can be seeded in minutes.
 """
 
-
-
+import re
+import time
 from faker import Faker
-from random import randint, random
+from django.contrib.auth.hashers import make_password
 from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from recipes.models import User
+from recipes.models.user import gravatar_hash
 
 
 user_fixtures = [
@@ -27,17 +30,22 @@ class Command(BaseCommand):
     Build automation command to seed the database with data.
 
     This command inserts a small set of known users (``user_fixtures``) and then
-    repeatedly generates additional random users until ``USER_COUNT`` total users
-    exist in the database. Each generated user receives the same default password.
+    generates additional random users until the requested number of users
+    exist in the database. Each generated user receives the same default
+    password. Usernames and emails are made unique in memory before
+    insertion, so no insert can fail on a uniqueness constraint, and Faker
+    is seeded so that the same arguments always produce the same users.
 
     Attributes:
-        USER_COUNT (int): Target total number of users in the database.
+        USER_COUNT (int): Default target total number of users in the database.
+        BATCH_SIZE (int): Default number of users inserted per batch.
         DEFAULT_PASSWORD (str): Default password assigned to all created users.
         help (str): Short description shown in ``manage.py help``.
         faker (Faker): Locale-specific Faker instance used for random data.
     """
 
     USER_COUNT = 200
+    BATCH_SIZE = 5000
     DEFAULT_PASSWORD = 'Password123'
     help = 'Seeds the database with sample data'
 
@@ -46,107 +54,136 @@ class Command(BaseCommand):
         super().__init__(*args, **kwargs)
         self.faker = Faker('en_GB')
 
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=Command.USER_COUNT, help='Target total number of users')
+        parser.add_argument('--batch-size', type=int, default=Command.BATCH_SIZE, help='Number of users inserted per batch')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed used to generate the users')
+
     def handle(self, *args, **options):
         """
         Django entrypoint for the command.
 
-        Runs the full seeding workflow and stores ``self.users`` for any
-        post-processing or debugging (not required for operation).
+        Runs the full seeding workflow.
         """
-        self.create_users()
-        self.users = User.objects.all()
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        self.faker.seed_instance(options['seed'])
+        self.batch_size = options['batch_size']
+        self.create_users(options['users'])
 
-    def create_users(self):
+    def create_users(self, user_count):
         """
-        Create fixture users and then generate random users up to USER_COUNT.
+        Create fixture users and then generate random users up to ``user_count``.
 
-        The process is idempotent in spirit: attempts that fail (e.g., due to
-        uniqueness constraints on username/email) are ignored and generation continues.
+        The process is idempotent: users whose username or email already
+        exists are never generated, and nothing is added once the target
+        is reached.
         """
+        # Hashing is deliberately slow; every seeded user shares one hash
+        self.password = make_password(Command.DEFAULT_PASSWORD)
+        self.usernames = set(User.objects.values_list('username', flat=True))
+        self.emails = set(User.objects.values_list('email', flat=True))
         self.generate_user_fixtures()
-        self.generate_random_users()
+        self.generate_random_users(user_count)
 
     def generate_user_fixtures(self):
-        """Attempt to create each predefined fixture user."""
-        for data in user_fixtures:
-            self.try_create_user(data)
+        """Create each predefined fixture user that does not exist yet."""
+        users = [self.build_user(data) for data in user_fixtures if self.is_available(data)]
+        self.insert(users)
 
-    def generate_random_users(self):
+    def generate_random_users(self, user_count):
         """
-        Generate random users until the database contains USER_COUNT users.
+        Generate random users until the database contains ``user_count`` users.
 
-        Prints a simple progress indicator to stdout during generation.
+        Prints the progress and throughput to stdout after every batch.
         """
-        user_count = User.objects.count()
-        while  user_count < self.USER_COUNT:
-            print(f"Seeding user {user_count}/{self.USER_COUNT}", end='\r')
-            self.generate_user()
-            user_count = User.objects.count()
-        print("User seeding complete.      ")
+        remaining = user_count - len(self.usernames)
+        created = 0
+        started = time.perf_counter()
+        while created < remaining:
+            batch = [self.generate_user() for _ in range(min(self.batch_size, remaining - created))]
+            self.insert(batch)
+            created += len(batch)
+            rate = created / max(time.perf_counter() - started, 1e-9)
+            self.stdout.write(f"Seeding user {len(self.usernames)}/{user_count} ({rate:.0f} users/s)", ending='\r')
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"User seeding complete: {created} users in {elapsed:.1f}s ({created / max(elapsed, 1e-9):.0f} users/s).")
 
     def generate_user(self):
         """
-        Generate a single random user and attempt to insert it.
+        Generate a single random user with a unique username and email.
+
+        Uses Faker for first/last names, then derives a simple username/email,
+        adding a numeric suffix when the simple form is already taken.
 
-        Uses Faker for first/last names, then derives a simple username/email.
+        Returns:
+            User: The unsaved user.
         """
         first_name = self.faker.first_name()
         last_name = self.faker.last_name()
-        email = create_email(first_name, last_name)
         username = create_username(first_name, last_name)
-        self.try_create_user({'username': username, 'email': email, 'first_name': first_name, 'last_name': last_name})
-       
-    def try_create_user(self, data):
+        email = create_email(first_name, last_name)
+        suffix = len(self.usernames)
+        while username in self.usernames or email in self.emails:
+            suffix += 1
+            username = create_username(first_name, last_name, suffix)
+            email = create_email(first_name, last_name, suffix)
+        return self.build_user({'username': username, 'email': email, 'first_name': first_name, 'last_name': last_name})
+
+    def is_available(self, data):
+        """Return whether neither the username nor the email of ``data`` is taken."""
+        return data['username'] not in self.usernames and data['email'] not in self.emails
+
+    def build_user(self, data):
         """
-        Attempt to create a user and ignore any errors.
+        Build an unsaved user with the default password and reserve its username and email.
 
         Args:
             data (dict): Mapping with keys ``username``, ``email``,
                 ``first_name``, and ``last_name``.
-        """
-        try:
-            self.create_user(data)
-        except:
-            pass
 
-    def create_user(self, data):
+        Returns:
+            User: The unsaved user.
         """
-        Create a user with the default password.
+        self.usernames.add(data['username'])
+        self.emails.add(data['email'])
+        # bulk_create bypasses User.save(), which normally stores the hash
+        return User(password=self.password, email_hash=gravatar_hash(data['email']), **data)
 
-        Args:
-            data (dict): Mapping with keys ``username``, ``email``,
-                ``first_name``, and ``last_name``.
-        """
-        User.objects.create_user(
-            username=data['username'],
-            email=data['email'],
-            password=Command.DEFAULT_PASSWORD,
-            first_name=data['first_name'],
-            last_name=data['last_name'],
-        )
-
-def create_username(first_name, last_name):
+    def insert(self, users):
+        """Insert a batch of users in one transaction."""
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=self.batch_size)
+
+def create_username(first_name, last_name, suffix=''):
     """
     Construct a simple username from first and last names.
 
+    Characters that usernames do not allow (e.g. apostrophes and hyphens)
+    are dropped, and the name is shortened to fit the username field.
+
     Args:
         first_name (str): Given name.
         last_name (str): Family name.
+        suffix (int or str): Appended to make the username unique.
 
     Returns:
-        str: A username in the form ``@{firstname}{lastname}`` (lowercased).
+        str: A username in the form ``@{firstname}{lastname}{suffix}`` (lowercased).
     """
-    return '@' + first_name.lower() + last_name.lower()
+    suffix = str(suffix)
+    name = re.sub(r'\W', '', first_name + last_name).lower()
+    return '@' + name[:User._meta.get_field('username').max_length - 1 - len(suffix)] + suffix
 
-def create_email(first_name, last_name):
+def create_email(first_name, last_name, suffix=''):
     """
     Construct a simple example email address.
 
     Args:
         first_name (str): Given name.
         last_name (str): Family name.
+        suffix (int or str): Appended to make the address unique.
 
     Returns:
-        str: An email in the form ``{firstname}.{lastname}@example.org``.
+        str: An email in the form ``{firstname}.{lastname}{suffix}@example.org``.
     """
-    return first_name + '.' + last_name + '@example.org'
+    return first_name + '.' + last_name + str(suffix) + '@example.org'
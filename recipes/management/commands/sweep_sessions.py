@@ -0,0 +1,39 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from recipes.sessions import SessionStore
+
+
+class Command(BaseCommand):
+    """
+    Management command to delete expired sessions incrementally.
+
+    Unlike `clearsessions`' single DELETE over the whole table, expired
+    sessions are deleted in small batches, oldest first, each in its own
+    short transaction, optionally pausing between batches so that other
+    writers are never blocked for long. Expiry refreshes queued in web
+    workers cannot be flushed from here, so sessions that expired within
+    the last `SESSION_EXPIRY_FLUSH_INTERVAL` seconds are left for a later
+    sweep (see `recipes.sessions`).
+
+    Attributes:
+        help (str): Short description displayed when running
+            `python manage.py help sweep_sessions`.
+    """
+
+    help = 'Deletes expired sessions in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of sessions deleted per transaction')
+        parser.add_argument('--pause', type=float, default=0, help='Seconds to wait between batches')
+
+    def handle(self, *args, **options):
+        """Sweep the expired sessions and report progress."""
+
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        deleted = 0
+        for deleted in SessionStore.iter_clear_expired(batch_size=options['batch_size']):
+            self.stdout.write(f"Deleted {deleted} expired sessions", ending='\r')
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(f"Session sweep complete: {deleted} expired sessions deleted.")
@@ -1,4 +1,5 @@
 from django.core.management.base import BaseCommand, CommandError
+from recipes.deletion import delete_users
 from recipes.models import User
 
 class Command(BaseCommand):
@@ -9,26 +10,40 @@ class Command(BaseCommand):
     to complement the corresponding "seed" command, allowing developers to
     reset the database to a clean state without removing administrative users.
 
+    Users are deleted in id-ordered chunks, each in its own short
+    transaction, so that memory use stays constant and other writers are
+    only blocked for the duration of a chunk.
+
     Attributes:
         help (str): Short description displayed when running
             `python manage.py help unseed`.
     """
     
-    help = 'Seeds the database with sample data'
+    help = 'Removes the seeded (non-staff) users and their recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Number of users deleted per transaction')
 
     def handle(self, *args, **options):
         """
         Execute the unseeding process.
 
-        Deletes all `User` records where `is_staff` is False, preserving
-        administrative accounts. Prints a confirmation message upon completion.
+        Deletes all `User` records where `is_staff` is False, together with
+        their recipes, preserving administrative accounts. Prints progress
+        after each chunk and a summary upon completion.
 
         Args:
             *args: Positional arguments passed by Django (not used here).
-            **options: Keyword arguments passed by Django (not used here).
+            **options: Keyword arguments; `chunk_size` sets the number of
+                users deleted per transaction.
 
         Returns:
             None
         """
 
-        User.objects.filter(is_staff=False).delete()
\ No newline at end of file
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1')
+        users = recipes = 0
+        for users, recipes in delete_users(User.objects.filter(is_staff=False), options['chunk_size']):
+            self.stdout.write(f"Deleted {users} users and {recipes} recipes", ending='\r')
+        self.stdout.write(f"Unseeding complete: deleted {users} users and {recipes} recipes.")
@@ -0,0 +1,135 @@
+import logging
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from recipes import profiling
+from recipes.query_budget import QueryCounter, check_budget, logger, record_queries
+
+
+class QueryBudgetMiddleware:
+    """
+    Count and time the SQL executed for every request.
+
+    The totals are recorded against the resolved URL name (see
+    `recipes.query_budget.get_query_stats()`) and logged at debug level.
+    If `settings.QUERY_BUDGETS` declares a budget for the URL name, the
+    whole request (including session and user loading) is checked against
+    it. A budget is either a maximum query count or a
+    `(max_queries, max_time_ms)` tuple.
+
+    The middleware is async-capable, so that async views served over ASGI
+    are not forced through a thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with QueryCounter() as counter:
+            response = self.get_response(request)
+        return self.process_counted(request, response, counter)
+
+    async def __acall__(self, request):
+        with QueryCounter() as counter:
+            response = await self.get_response(request)
+        return self.process_counted(request, response, counter)
+
+    def process_counted(self, request, response, counter):
+        """Record and check the queries counted for a request."""
+
+        match = request.resolver_match
+        name = match.url_name if match is not None and match.url_name else request.path
+        record_queries(name, counter)
+        logger.debug("%s: %d queries in %.1fms", name, counter.count, counter.duration_ms)
+
+        budget = getattr(settings, 'QUERY_BUDGETS', {}).get(name)
+        if budget is not None:
+            if isinstance(budget, int):
+                budget = (budget, None)
+            check_budget(name, counter, *budget)
+        return response
+
+
+class ServerTimingMiddleware:
+    """
+    Report where the time of every request went.
+
+    Each request is profiled (see `recipes.profiling`) and its time split
+    into `view`, `db` and `template` phases, which are logged on the
+    `recipes.profiling` logger as one line, with the numbers also attached
+    to the record as `server_timing`.
+
+    The phases are also sent back in a `Server-Timing` header, but only to
+    staff users, or to everyone when `settings.DEBUG` or
+    `settings.SERVER_TIMING_PUBLIC` is on, since they tell visitors how
+    the server spends its time. Adding `?_profile=1` to a URL also records
+    every SQL statement; staff users then get one `Server-Timing` metric
+    per statement. Setting `settings.SERVER_TIMING` to False removes the
+    middleware entirely.
+
+    The middleware should come first in `settings.MIDDLEWARE`, so that the
+    time of the other middleware is included.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SERVER_TIMING', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with profiling.profile_request(profiling.PROFILE_PARAMETER in request.GET) as profile:
+            response = self.get_response(request)
+        staff = False
+        if self._needs_user(profile):
+            staff = getattr(getattr(request, 'user', None), 'is_staff', False)
+        return self.process_profiled(request, response, profile, staff)
+
+    async def __acall__(self, request):
+        with profiling.profile_request(profiling.PROFILE_PARAMETER in request.GET) as profile:
+            response = await self.get_response(request)
+        staff = False
+        if self._needs_user(profile) and hasattr(request, 'auser'):
+            staff = (await request.auser()).is_staff
+        return self.process_profiled(request, response, profile, staff)
+
+    def _public(self):
+        return settings.DEBUG or getattr(settings, 'SERVER_TIMING_PUBLIC', False)
+
+    def _needs_user(self, profile):
+        """Return whether the header depends on the user being staff."""
+
+        return not self._public() or profile.queries is not None
+
+    def process_profiled(self, request, response, profile, staff):
+        """Add the `Server-Timing` header if allowed and log the profile of a request."""
+
+        if staff or self._public():
+            response['Server-Timing'] = profile.header(detailed=staff and profile.queries is not None)
+        if profiling.logger.isEnabledFor(logging.INFO):
+            match = request.resolver_match
+            name = match.url_name if match is not None and match.url_name else request.path
+            phases = profile.phases()
+            profiling.logger.info(
+                "%s %s %d total=%.1fms view=%.1fms db=%.1fms template=%.1fms queries=%d",
+                request.method, name, response.status_code, phases['total'], phases['view'],
+                phases['db'], phases['template'], profile.query_count,
+                extra={'server_timing': {
+                    'method': request.method, 'url_name': name, 'status': response.status_code,
+                    'queries': profile.query_count, **{f'{phase}_ms': round(ms, 3) for phase, ms in phases.items()},
+                }},
+            )
+        return response
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 17:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_rename_food_tag_foodtag'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['date_created', 'id'], name='recipe_created_id_idx'),
+        ),
+    ]
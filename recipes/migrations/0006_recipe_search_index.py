@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_recipe_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "CREATE VIRTUAL TABLE recipes_recipe_fts USING fts5("
+                "name, ingredients, instructions, tags, "
+                "tokenize = 'porter unicode61 remove_diacritics 2', prefix = '2 3')",
+                "INSERT INTO recipes_recipe_fts (rowid, name, ingredients, instructions, tags) "
+                "SELECT r.id, r.name, r.ingredients, r.instructions, "
+                "COALESCE((SELECT group_concat(t.tag_name, ' ') "
+                "FROM recipes_recipe_tags rt JOIN recipes_foodtag t ON t.id = rt.foodtag_id "
+                "WHERE rt.recipe_id = r.id), '') "
+                "FROM recipes_recipe r",
+            ],
+            reverse_sql="DROP TABLE recipes_recipe_fts",
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-17 17:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('ingredient_count', models.PositiveIntegerField()),
+                ('recipe', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='ingredient_entries', to='recipes.recipe')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['name', 'recipe', 'ingredient_count'], name='ingredient_name_recipe_idx')],
+                'constraints': [models.UniqueConstraint(fields=('recipe', 'name'), name='unique_recipe_ingredient')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_user_directory_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['date_modified'], name='recipe_date_modified_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_date_modified_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='author_name',
+            field=models.CharField(blank=True, editable=False, max_length=30),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='tag_names',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        # Fills the copies of existing rows; `repair_recipe_summaries` checks them later
+        migrations.RunSQL(
+            sql="""
+                UPDATE recipes_recipe SET
+                    author_name = (SELECT username FROM recipes_user WHERE recipes_user.id = recipes_recipe.author_id),
+                    tag_names = COALESCE((
+                        SELECT group_concat(tag_name, char(31)) FROM (
+                            SELECT recipes_foodtag.tag_name FROM recipes_recipe_tags
+                            JOIN recipes_foodtag ON recipes_foodtag.id = recipes_recipe_tags.foodtag_id
+                            WHERE recipes_recipe_tags.recipe_id = recipes_recipe.id
+                            ORDER BY recipes_foodtag.tag_name
+                        )
+                    ), '')
+            """,
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
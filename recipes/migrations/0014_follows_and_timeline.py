@@ -0,0 +1,106 @@
+# Generated by Django 5.2.7 on 2026-10-17 18:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_recipe_view_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuthorFollow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TagFollow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_created', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name_plural': 'timeline entries',
+            },
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='follower_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', 'date_created', 'id'], name='recipe_author_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='authorfollow',
+            name='author',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='follower_links', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='authorfollow',
+            name='follower',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='author_follows', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='tagfollow',
+            name='follower',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='tag_follows', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='tagfollow',
+            name='tag',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='follower_links', to='recipes.foodtag'),
+        ),
+        migrations.AddField(
+            model_name='timelineentry',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='recipes.recipe'),
+        ),
+        migrations.AddField(
+            model_name='timelineentry',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='authorfollow',
+            index=models.Index(fields=['author', 'follower'], name='author_follow_author_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='authorfollow',
+            constraint=models.UniqueConstraint(fields=('follower', 'author'), name='unique_author_follow'),
+        ),
+        migrations.AddConstraint(
+            model_name='authorfollow',
+            constraint=models.CheckConstraint(condition=models.Q(('follower', models.F('author')), _negated=True), name='author_follow_not_self'),
+        ),
+        migrations.AddIndex(
+            model_name='tagfollow',
+            index=models.Index(fields=['tag', 'follower'], name='tag_follow_tag_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='tagfollow',
+            constraint=models.UniqueConstraint(fields=('follower', 'tag'), name='unique_tag_follow'),
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', 'date_created', 'recipe'], name='timeline_user_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_timeline_entry'),
+        ),
+    ]
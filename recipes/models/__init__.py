@@ -1,3 +1,6 @@
 from .user import *
 from .recipe import *
-from .foodtag import *
\ No newline at end of file
+from .foodtag import *
+from .ingredient import *
+from .follow import *
+from .import_checkpoint import *
@@ -0,0 +1,86 @@
+from django.db import models
+from .foodtag import FoodTag
+from .recipe import Recipe
+from .user import User
+
+
+class AuthorFollow(models.Model):
+    """
+    A user following the recipes of another user.
+
+    `User.follower_count` is kept in step with these rows by
+    `recipes.feed.follow_author()` and `unfollow_author()`.
+    """
+
+    follower = models.ForeignKey(User, on_delete=models.CASCADE, related_name='author_follows', db_index=False)
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name='follower_links', db_index=False)
+    date_created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        """Model options."""
+
+        constraints = [
+            models.UniqueConstraint(fields=['follower', 'author'], name='unique_author_follow'),
+            models.CheckConstraint(condition=~models.Q(follower=models.F('author')), name='author_follow_not_self'),
+        ]
+        indexes = [
+            # Finds the followers a new recipe is fanned out to
+            models.Index(fields=['author', 'follower'], name='author_follow_author_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.follower_id} follows {self.author_id}'
+
+
+class TagFollow(models.Model):
+    """A user following the recipes carrying a tag."""
+
+    follower = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tag_follows', db_index=False)
+    tag = models.ForeignKey(FoodTag, on_delete=models.CASCADE, related_name='follower_links', db_index=False)
+    date_created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        """Model options."""
+
+        constraints = [
+            models.UniqueConstraint(fields=['follower', 'tag'], name='unique_tag_follow'),
+        ]
+        indexes = [
+            models.Index(fields=['tag', 'follower'], name='tag_follow_tag_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.follower_id} follows tag {self.tag_id}'
+
+
+class TimelineEntry(models.Model):
+    """
+    A recipe in a user's materialized feed.
+
+    Rows are written by `recipes.feed` when a followed author publishes a
+    recipe or a followed tag is added to one. The recipe's `date_created`
+    is copied onto the row so that a page of the feed is read from the
+    `(user, date_created, recipe)` index alone, joining only the recipes
+    shown.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='timeline_entries', db_index=False)
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='timeline_entries')
+    date_created = models.DateTimeField()
+
+    # Sort key of the keyset-paginated feed
+    FEED_ORDERING = ['-date_created', '-recipe']
+
+    class Meta:
+        """Model options."""
+
+        verbose_name_plural = 'timeline entries'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'recipe'], name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'date_created', 'recipe'], name='timeline_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe_id} in the feed of {self.user_id}'
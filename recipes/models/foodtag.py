@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 
 class FoodTag(models.Model):
     tag_name = models.CharField(max_length=50, blank=True, unique=True)
@@ -14,6 +14,13 @@ class FoodTag(models.Model):
     # etc
     # I used ManyToMany relationship so we can make a checklist of tags in the form
     # E.g. when making form use CheckboxSelectMultiple widget so user can choose any tags
+    # With thousands of tags, suggest them from tags/autocomplete/ instead (see recipes.tag_trie)
+
+    def save(self, *args, **kwargs):
+        """Save the tag and, through the post_save handler, the tag names copied to its recipes."""
+
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return self.tag_name
\ No newline at end of file
@@ -0,0 +1,18 @@
+from django.db import models
+
+
+class ImportCheckpoint(models.Model):
+    """
+    How far a bulk import has got, for resuming it after a failure.
+
+    `python manage.py import_recipes` updates the row in the same
+    transaction as each batch of recipes, so the recorded number of rows
+    always matches what was committed.
+    """
+
+    name = models.CharField(max_length=255, unique=True)
+    rows = models.PositiveBigIntegerField(default=0)
+    date_modified = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name}: {self.rows} rows"
@@ -0,0 +1,30 @@
+from django.db import models
+from .recipe import Recipe
+
+class RecipeIngredient(models.Model):
+    """
+    One normalized ingredient of a recipe.
+
+    Rows are derived from `Recipe.ingredients` by `recipes.ingredients`
+    and form an inverted index from ingredient name to recipes. The
+    recipe's total number of ingredients is copied onto every row so that
+    pantry coverage can be ranked from the `(name, recipe, ingredient_count)`
+    index alone.
+    """
+
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name='ingredient_entries', db_index=False)
+    name = models.CharField(max_length=100)
+    ingredient_count = models.PositiveIntegerField()
+
+    class Meta:
+        """Model options."""
+
+        constraints = [
+            models.UniqueConstraint(fields=['recipe', 'name'], name='unique_recipe_ingredient'),
+        ]
+        indexes = [
+            models.Index(fields=['name', 'recipe', 'ingredient_count'], name='ingredient_name_recipe_idx'),
+        ]
+
+    def __str__(self):
+        return self.name
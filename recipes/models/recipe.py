@@ -1,8 +1,24 @@
-from django.db import models
+from django.db import models, transaction
 from django.core.validators import MinValueValidator, MaxValueValidator
 from .user import User
 from .foodtag import FoodTag
 
+# Separates the names stored in `Recipe.tag_names`; a control character no tag name contains
+TAG_NAME_SEPARATOR = '\x1f'
+
+
+def encode_tag_names(names):
+    """Encode tag names for `Recipe.tag_names`: sorted and joined by `TAG_NAME_SEPARATOR`."""
+
+    return TAG_NAME_SEPARATOR.join(sorted(names))
+
+
+def decode_tag_names(tag_names):
+    """Return the list of tag names encoded by `encode_tag_names()`."""
+
+    return tag_names.split(TAG_NAME_SEPARATOR) if tag_names else []
+
+
 class Recipe(models.Model):
 
     name = models.CharField(max_length=100, blank=False)
@@ -10,13 +26,54 @@ class Recipe(models.Model):
     ingredients = models.TextField(blank=False)
     instructions = models.TextField(blank=False)
     date_created = models.DateTimeField(auto_now_add=True)
+    date_modified = models.DateTimeField(auto_now=True)
     difficulty_level = models.CharField(max_length=50, blank=False)
     preparation_time_mins = models.IntegerField(help_text="Preparation time in minutes", blank=False, validators=[MinValueValidator(1), MaxValueValidator(1440)])
     tags = models.ManyToManyField(FoodTag, blank=True)
+    # Copies of the author's username and the tag names, so lists render
+    # from the recipe rows alone (see `recipes.summaries`)
+    author_name = models.CharField(max_length=30, blank=True, editable=False)
+    tag_names = models.TextField(blank=True, editable=False)
+    # Page views, written in batches by `recipes.view_counts`
+    view_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # Sort key used by the keyset-paginated recipe list (newest first)
+    LIST_ORDERING = ['-date_created', '-id']
+    # Sort key of the "most viewed" ranking
+    MOST_VIEWED_ORDERING = ['-view_count', '-id']
+
+    class Meta:
+        """Model options."""
+
+        indexes = [
+            models.Index(fields=['date_created', 'id'], name='recipe_created_id_idx'),
+            # Serves MAX(date_modified), the recipe list's Last-Modified stamp
+            models.Index(fields=['date_modified'], name='recipe_date_modified_idx'),
+            models.Index(fields=['view_count', 'id'], name='recipe_view_count_id_idx'),
+            # Newest recipes of an author, pulled into feeds (see `recipes.feed`)
+            models.Index(fields=['author', 'date_created', 'id'], name='recipe_author_created_idx'),
+        ]
 
 #Sample init 
 # user1 = User.objects.first()
 # recipe1 = Recipe(name = "Lasagna", author=user1, ingredients = "Ingredients", instructions = "Sample Instructions", difficulty_level = "Easy", preparation_time_mins = 30)
 
+    def save(self, *args, **kwargs):
+        """Save the recipe, keeping the stored author name in sync with the author."""
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'author' in update_fields:
+            self.author_name = self.author.username if self.author_id is not None else ''
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'author_name'}
+        # A new recipe is fanned out to followers' feeds by the post_save handler
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
+
+    def tag_name_list(self):
+        """Return the names of the recipe's tags, sorted, from the stored summary."""
+
+        return decode_tag_names(self.tag_names)
+
     def __str__(self):
-        return f"{self.name} by {self.author.username}"
\ No newline at end of file
+        return f"{self.name} by {self.author_name}"
\ No newline at end of file
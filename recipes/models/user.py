@@ -1,7 +1,24 @@
 from django.core.validators import RegexValidator
 from django.contrib.auth.models import AbstractUser
-from django.db import models
-from libgravatar import Gravatar
+from functools import lru_cache
+from django.db import models, transaction
+from django.db.models.functions import Lower
+from libgravatar import md5_hash, sanitize_email
+from urllib.parse import urlencode
+
+
+def gravatar_hash(email):
+    """Return the Gravatar hash of an email address (MD5 of the normalized address)."""
+
+    return md5_hash(sanitize_email(email or ''))
+
+
+@lru_cache(maxsize=4096)
+def gravatar_url(email_hash, size):
+    """Return the URL of a Gravatar image, falling back to the mystery person."""
+
+    return f"https://www.gravatar.com/avatar/{email_hash}?{urlencode({'size': size, 'default': 'mp'})}"
+
 
 class User(AbstractUser):
     """Model used for user authentication, and team member related information."""
@@ -17,12 +34,35 @@ class User(AbstractUser):
     first_name = models.CharField(max_length=50, blank=False)
     last_name = models.CharField(max_length=50, blank=False)
     email = models.EmailField(unique=True, blank=False)
+    email_hash = models.CharField(max_length=32, blank=True, editable=False)
+    # Number of `AuthorFollow` rows naming the user, maintained by `recipes.feed`
+    follower_count = models.PositiveIntegerField(default=0, editable=False)
 
+    # Sort key used by the keyset-paginated user directory
+    DIRECTORY_ORDERING = ['last_name', 'first_name', 'id']
 
     class Meta:
         """Model options."""
 
         ordering = ['last_name', 'first_name']
+        indexes = [
+            models.Index(fields=['last_name', 'first_name', 'id'], name='user_name_id_idx'),
+            # Case-insensitive prefix search in the user directory
+            models.Index(Lower('username'), name='user_username_lower_idx'),
+            models.Index(Lower('first_name'), name='user_first_name_lower_idx'),
+            models.Index(Lower('last_name'), name='user_last_name_lower_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Save the user, keeping the stored Gravatar hash in sync with the email."""
+
+        self.email_hash = gravatar_hash(self.email)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'email' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'email_hash'}
+        # The post_save handler renaming the user's recipes runs in the same transaction
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
 
     def full_name(self):
         """Return a string containing the user's full name."""
@@ -32,9 +72,8 @@ class User(AbstractUser):
     def gravatar(self, size=120):
         """Return a URL to the user's gravatar."""
 
-        gravatar_object = Gravatar(self.email)
-        gravatar_url = gravatar_object.get_image(size=size, default='mp')
-        return gravatar_url
+        # Rows saved before the hash was stored have an empty one until backfilled
+        return gravatar_url(self.email_hash or gravatar_hash(self.email), size)
 
     def mini_gravatar(self):
         """Return a URL to a miniature version of the user's gravatar."""
@@ -0,0 +1,181 @@
+"""
+Per-request profiling for the `Server-Timing` header.
+
+`ServerTimingMiddleware` opens a `RequestProfile` for every request and
+makes it the current profile. Both the profile and the query observers
+of `recipes.query_budget` are kept in context variables, which
+`sync_to_async` copies into its threads, so the SQL an async view runs in
+a worker thread is charged to its request. The profile splits the
+request's wall-clock time into three phases:
+
+- `db`: time spent executing SQL, observed with
+  `recipes.query_budget.observe_queries()`,
+- `template`: time spent rendering templates, measured by the
+  `ProfilingDjangoTemplates` backend, excluding SQL run from templates
+  (e.g. lazy querysets),
+- `view`: everything else, i.e. Python code in middleware and views.
+
+Outside a profiled request the template backend only does one context
+variable lookup per render.
+
+When `PROFILE_PARAMETER` is in the query string, every statement is also
+recorded; staff users get them in the `Server-Timing` header.
+"""
+
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.template.backends.django import DjangoTemplates, Template
+from recipes.query_budget import observe_queries
+
+# Query string flag that asks for a per-query breakdown (staff only)
+PROFILE_PARAMETER = '_profile'
+
+# Bound on the number of statements listed in the header
+MAX_LISTED_QUERIES = 50
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('recipes_request_profile', default=None)
+
+
+class RequestProfile:
+    """
+    Time spent in each phase of one request.
+
+    The profile is also an execute wrapper, observing the queries of the
+    request through `recipes.query_budget.observe_queries()`.
+
+    Args:
+        record_queries (bool): Keep the SQL and duration of every statement.
+
+    Attributes:
+        db (float): Seconds spent executing SQL.
+        template (float): Seconds spent rendering templates, SQL excluded.
+        total (float): Seconds spent in the whole request, once finished.
+        query_count (int): Number of statements executed.
+        queries (list[tuple[str, float]] or None): SQL and seconds of every
+            statement, if recorded.
+    """
+
+    def __init__(self, record_queries=False):
+        self.db = 0.0
+        self.template = 0.0
+        self.total = 0.0
+        self.query_count = 0
+        self.queries = [] if record_queries else None
+        self._started = time.perf_counter()
+        self._depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.db += elapsed
+            self.query_count += 1
+            if self.queries is not None:
+                self.queries.append((sql, elapsed))
+
+    def finish(self):
+        """Stop the clock of the whole request."""
+
+        self.total = time.perf_counter() - self._started
+
+    @property
+    def view(self):
+        """Seconds spent outside SQL and template rendering."""
+
+        return max(self.total - self.db - self.template, 0.0)
+
+    def phases(self):
+        """Return the duration of each phase, in milliseconds."""
+
+        return {
+            'total': self.total * 1000,
+            'view': self.view * 1000,
+            'db': self.db * 1000,
+            'template': self.template * 1000,
+        }
+
+    def header(self, detailed=False):
+        """
+        Build the value of the `Server-Timing` header.
+
+        Args:
+            detailed (bool): List every recorded statement as its own metric.
+
+        Returns:
+            str: The header value.
+        """
+
+        phases = self.phases()
+        metrics = [
+            f'total;dur={phases["total"]:.1f}',
+            f'view;dur={phases["view"]:.1f}',
+            f'db;dur={phases["db"]:.1f};desc="{self.query_count} queries"',
+            f'template;dur={phases["template"]:.1f}',
+        ]
+        if detailed and self.queries:
+            for index, (sql, elapsed) in enumerate(self.queries[:MAX_LISTED_QUERIES], start=1):
+                metrics.append(f'q{index};dur={elapsed * 1000:.2f};desc="{_header_text(sql)}"')
+        return ', '.join(metrics)
+
+
+def _header_text(sql, limit=120):
+    """Make SQL safe for a quoted header parameter, shortening it."""
+
+    text = ' '.join(sql.split()).replace('\\', '').replace('"', "'")
+    text = text.encode('ascii', 'replace').decode()
+    return text if len(text) <= limit else text[:limit - 3] + '...'
+
+
+@contextmanager
+def profile_request(record_queries=False):
+    """
+    Profile the code run inside the block as the current request.
+
+    Args:
+        record_queries (bool): Keep the SQL and duration of every statement.
+
+    Yields:
+        RequestProfile: The profile, finished when the block exits.
+    """
+
+    profile = RequestProfile(record_queries)
+    token = _current.set(profile)
+    try:
+        with observe_queries(profile):
+            yield profile
+    finally:
+        profile.finish()
+        _current.reset(token)
+
+
+class ProfilingTemplate(Template):
+    """A Django template that adds its render time to the current profile."""
+
+    def render(self, context=None, request=None):
+        profile = _current.get()
+        if profile is None or profile._depth:
+            return super().render(context, request)
+        profile._depth += 1
+        db_before = profile.db
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            profile.template += time.perf_counter() - started - (profile.db - db_before)
+            profile._depth -= 1
+
+
+class ProfilingDjangoTemplates(DjangoTemplates):
+    """The Django template backend, with render times reported to the profile."""
+
+    def from_string(self, template_code):
+        return ProfilingTemplate(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return ProfilingTemplate(super().get_template(template_name).template, self)
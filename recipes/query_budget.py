@@ -0,0 +1,166 @@
+"""
+Counting, timing and budgeting of the SQL executed per view.
+
+One execute wrapper, `observe_queries()`'s dispatcher, is installed on
+every database connection when it is opened (see `RecipesConfig`). It
+passes each statement to the observers active in the current context,
+kept in a context variable: `sync_to_async` runs its function in a copy
+of the caller's context, so queries an async view runs in a worker
+thread are charged to the request that made them, and concurrent
+requests never see each other's queries.
+
+`QueryCounter` is such an observer. It is used by `QueryBudgetMiddleware`
+(whole request, budgets from `settings.QUERY_BUDGETS`) and by the
+`query_budget` view decorator (view and template rendering only).
+Totals per URL name are kept in process memory and can be read with
+`get_query_stats()`.
+"""
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+_observers = ContextVar('recipes_query_observers', default=())
+
+
+def _dispatch(execute, sql, params, many, context):
+    """The execute wrapper installed on every connection."""
+
+    for observer in reversed(_observers.get()):
+        execute = partial(observer, execute)
+    return execute(sql, params, many, context)
+
+
+def install_dispatcher(connection, **kwargs):
+    """
+    Install the query dispatcher on a connection, once.
+
+    Connected to `connection_created`. The dispatcher goes first in the
+    wrapper list, since `connection.execute_wrapper()` removes the last
+    wrapper when its block exits.
+    """
+
+    if _dispatch not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _dispatch)
+
+
+@contextmanager
+def observe_queries(observer):
+    """
+    Pass the SQL executed inside the block, in any thread, to `observer`.
+
+    Args:
+        observer (callable): An execute wrapper, as accepted by
+            `connection.execute_wrapper()`.
+    """
+
+    token = _observers.set(_observers.get() + (observer,))
+    try:
+        yield observer
+    finally:
+        _observers.reset(token)
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised when a view runs more SQL than its declared budget allows."""
+
+
+class QueryCounter:
+    """
+    Context manager counting the number and duration of SQL statements.
+
+    Attributes:
+        count (int): Number of statements executed inside the block.
+        duration (float): Total time spent executing them, in seconds.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self._block = None
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            with self._lock:
+                self.duration += time.perf_counter() - start
+                self.count += 1
+
+    def __enter__(self):
+        self._block = observe_queries(self)
+        return self._block.__enter__()
+
+    def __exit__(self, *exc_info):
+        self._block.__exit__(*exc_info)
+        return False
+
+    @property
+    def duration_ms(self):
+        return self.duration * 1000
+
+
+def record_queries(name, counter):
+    """Add the queries counted for one request to the totals for `name`."""
+
+    with _stats_lock:
+        entry = _stats.setdefault(name, {'requests': 0, 'queries': 0, 'time_ms': 0.0, 'max_queries': 0})
+        entry['requests'] += 1
+        entry['queries'] += counter.count
+        entry['time_ms'] += counter.duration_ms
+        entry['max_queries'] = max(entry['max_queries'], counter.count)
+
+
+def get_query_stats():
+    """Return a copy of the per-URL-name query totals for this process."""
+
+    with _stats_lock:
+        return {name: dict(entry) for name, entry in _stats.items()}
+
+
+def reset_query_stats():
+    """Forget all recorded query totals."""
+
+    with _stats_lock:
+        _stats.clear()
+
+
+def check_budget(name, counter, max_queries=None, max_time_ms=None):
+    """
+    Compare the counted queries against a budget.
+
+    Overruns are logged as warnings, or raised as `QueryBudgetExceeded`
+    when `settings.QUERY_BUDGET_RAISE` is true.
+
+    Args:
+        name (str): The URL name (or view name) being checked.
+        counter (QueryCounter): The finished counter for the request.
+        max_queries (int, optional): Maximum number of statements allowed.
+        max_time_ms (float, optional): Maximum total SQL time allowed.
+
+    Raises:
+        QueryBudgetExceeded: If the budget is exceeded in strict mode.
+    """
+
+    problems = []
+    if max_queries is not None and counter.count > max_queries:
+        problems.append(f"{counter.count} queries (budget {max_queries})")
+    if max_time_ms is not None and counter.duration_ms > max_time_ms:
+        problems.append(f"{counter.duration_ms:.1f}ms of SQL (budget {max_time_ms}ms)")
+    if not problems:
+        return
+    message = f"View '{name}' exceeded its query budget: " + ", ".join(problems)
+    if getattr(settings, 'QUERY_BUDGET_RAISE', False):
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
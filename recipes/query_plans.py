@@ -0,0 +1,326 @@
+"""
+Query plan auditing for the SQL the site runs, used by `audit_query_plans`.
+
+`capture_statements()` requests URLs through the test client and records
+every distinct SQL statement with the parameters of its first execution.
+`audit()` then asks SQLite for the plan of each one with
+`EXPLAIN QUERY PLAN` and flags:
+
+- `scan`: a table is read in full although the statement filters,
+  orders or takes the minimum or maximum of it, so an index could narrow
+  the read,
+- `full-read`: a table is read in full and the statement has no filter
+  on it (e.g. `COUNT(*)`), reported for information only,
+- `temp-btree`: rows are sorted or grouped in a temporary B-tree instead
+  of being read in index order,
+- `not-covering`: a table is searched through an index but its rows must
+  still be fetched, because the index does not hold every column used.
+
+For `scan` and `temp-btree`, `propose_index()` suggests an index from the
+statement's equality filters followed by its range filter or sort order
+(or, for `MIN()`/`MAX()` over a whole table, on the aggregated column),
+written as a `models.Index` for the model owning the table. Nothing is
+proposed when rows are fetched by primary key or an existing index
+already starts with the same columns.
+"""
+
+import re
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils.http import urlencode
+from recipes.models import FoodTag, User
+from recipes.query_budget import QueryCounter
+
+# Statements that are not worth explaining
+_SKIPPED = re.compile(r'^\s*(INSERT|SAVEPOINT|RELEASE|ROLLBACK|BEGIN|COMMIT|PRAGMA|EXPLAIN)\b', re.IGNORECASE)
+
+_SCAN = re.compile(r'^SCAN (\w+)(?: AS \w+)?(.*)$')
+# MIN()/MAX() without a usable index: reported as a search, but reads every row
+_BARE_SEARCH = re.compile(r'^SEARCH (\w+)(?: AS \w+)?$')
+_SEARCH = re.compile(r'^SEARCH (\w+)(?: AS \w+)? USING (COVERING |INTEGER PRIMARY KEY|INDEX|AUTOMATIC)')
+_TEMP_BTREE = re.compile(r'^USE TEMP B-TREE FOR (ORDER BY|GROUP BY|DISTINCT|RIGHT PART OF ORDER BY|LAST TERM OF ORDER BY)')
+
+_WHERE = re.compile(r'\bWHERE\b(.*?)(?:\bGROUP BY\b|\bORDER BY\b|\bLIMIT\b|$)', re.IGNORECASE | re.DOTALL)
+_ORDER_BY = re.compile(r'\bORDER BY\b(.*?)(?:\bLIMIT\b|$)', re.IGNORECASE | re.DOTALL)
+_COMPARISON = r'"{table}"\."(\w+)"\s*({operator})'
+_EQUALITY = r'=|\bIN\b|\bIS\b'
+_RANGE = r'[<>]=?|\bLIKE\b|\bBETWEEN\b'
+# Columns inside function calls (e.g. aggregates) cannot be served by an index
+_ORDER_TERM = r'(?<![(\w])"{table}"\."(\w+)"\s*(ASC|DESC)?'
+_EXTREME = r'\b(?:MIN|MAX)\("{table}"\."(\w+)"\)'
+_NEGATION = re.compile(r'\bNOT \([^()]*\)', re.IGNORECASE)
+_LIMIT = re.compile(r'\bLIMIT\b', re.IGNORECASE)
+_PLACEHOLDERS = re.compile(r'%s(?:, %s){3,}')
+
+
+class Recorder(QueryCounter):
+    """
+    A `QueryCounter` that also keeps every distinct statement it sees.
+
+    Attributes:
+        statements (dict[str, Statement]): Statements keyed by their SQL.
+        label (str): Recorded as the origin of the statements executed
+            while it is set.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.statements = {}
+        self.label = None
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and not _SKIPPED.match(sql):
+            statement = self.statements.setdefault(sql, Statement(sql, params))
+            statement.count += 1
+            if self.label:
+                statement.origins.add(self.label)
+        return super().__call__(execute, sql, params, many, context)
+
+
+class Statement:
+    """
+    One distinct SQL statement and what its plan revealed.
+
+    Attributes:
+        sql (str): The statement, with parameter placeholders.
+        params (tuple): The parameters of its first execution.
+        count (int): Number of executions.
+        origins (set[str]): The URLs that executed it.
+        plan (list[str]): The `EXPLAIN QUERY PLAN` lines.
+        findings (list[tuple[str, str, str or None]]): The kind, table and
+            proposed index of each problem found in the plan.
+    """
+
+    def __init__(self, sql, params):
+        self.sql = sql
+        self.params = params
+        self.count = 0
+        self.origins = set()
+        self.plan = []
+        self.findings = []
+
+
+def capture_statements(clients, urls):
+    """
+    Request every URL with every client and record the SQL they run.
+
+    The caches are cleared before each URL, so that the statements run on
+    cache misses are seen too, and paginated pages are followed to their
+    second page, whose keyset filter makes for different statements. Every
+    configured cache is swapped for a private in-memory one meanwhile, so
+    that the caches of a running site are never cleared.
+
+    Args:
+        clients (dict[str, Client]): Clients keyed by a label such as
+            `'anonymous'`.
+        urls (list[tuple[str, str]]): Names and paths to request, as
+            returned by `recipes.benchmark.named_urls()`.
+
+    Returns:
+        list[Statement]: The distinct statements, in order of first use.
+    """
+
+    private_caches = {
+        alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'query-plans-{alias}'}
+        for alias in settings.CACHES
+    }
+    # Cold caches make pages run more queries than their budgets allow
+    with Recorder() as recorder, override_settings(CACHES=private_caches, QUERY_BUDGET_RAISE=False):
+        for mode, client in clients.items():
+            for name, path in urls:
+                recorder.label = f'{name} ({mode})'
+                for cache in caches.all():
+                    cache.clear()
+                response = client.get(path)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+                page = response.context.get('page') if response.context else None
+                if getattr(page, 'has_next', False):
+                    client.get(f"{path.split('?')[0]}?{page.next_query}")
+    return list(recorder.statements.values())
+
+
+def variant_urls():
+    """
+    Return the URLs of the pages' filtered variants, for the current data.
+
+    Returns:
+        list[tuple[str, str]]: Names and paths, as `named_urls()` does.
+    """
+
+    tags = list(FoodTag.objects.order_by('id').values_list('id', flat=True)[:2])
+    last_name = User.objects.order_by('id').values_list('last_name', flat=True).first() or 'a'
+    recipes_url = reverse('list_recipes')
+    urls = [('user_list', f"{reverse('user_list')}?{urlencode({'q': last_name[:2]})}")]
+    if tags:
+        urls.append(('list_recipes', f'{recipes_url}?tag={tags[0]}'))
+        urls.append(('list_recipes', f"{recipes_url}?{urlencode({'tag': tags, 'match': 'any'}, doseq=True)}"))
+    return urls
+
+
+def explain(statement):
+    """Return the `EXPLAIN QUERY PLAN` detail lines of a statement."""
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {statement.sql}', statement.params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def audit(statements):
+    """
+    Explain every statement and record the problems found in its plan.
+
+    Returns:
+        list[Statement]: The statements with at least one finding.
+    """
+
+    flagged = []
+    for statement in statements:
+        statement.plan = explain(statement)
+        statement.findings = list(dict.fromkeys(_findings(statement)))
+        if statement.findings:
+            flagged.append(statement)
+    return flagged
+
+
+def _findings(statement):
+    """Yield `(kind, table, proposed index)` for each problem in a plan."""
+
+    tables = _main_tables(statement.plan)
+    for line in statement.plan:
+        detail = line.strip()
+        if scan := _SCAN.match(detail) or _BARE_SEARCH.match(detail):
+            table = scan.group(1)
+            if 'COVERING INDEX' in scan.group(0):
+                continue
+            # Walking an index in order and stopping at the LIMIT, as keyset pagination does
+            if 'USING INDEX' in scan.group(0) and _LIMIT.search(statement.sql) and not _has_temp_btree(statement.plan):
+                continue
+            proposal = propose_index(statement.sql, table)
+            yield ('scan', table, proposal) if proposal else ('full-read', table, None)
+        elif search := _SEARCH.match(detail):
+            if search.group(2) == 'INDEX':
+                yield 'not-covering', search.group(1), None
+        elif _TEMP_BTREE.match(detail):
+            table = tables[0] if tables else None
+            yield 'temp-btree', table, propose_index(statement.sql, table, sort_only=True) if table else None
+
+
+def _has_temp_btree(plan):
+    return any(_TEMP_BTREE.match(line.strip()) for line in plan)
+
+
+def _main_tables(plan):
+    """Return the tables read by a plan, outermost loop first."""
+
+    tables = []
+    for line in plan:
+        match = _SCAN.match(line.strip()) or _SEARCH.match(line.strip()) or _BARE_SEARCH.match(line.strip())
+        if match:
+            tables.append(match.group(1))
+    return tables
+
+
+def propose_index(sql, table, sort_only=False):
+    """
+    Suggest an index serving the filters and sort order `sql` applies to `table`.
+
+    Equality filters come first, then either the sort columns or the first
+    range filter, which is the order in which SQLite can use them.
+
+    Args:
+        sql (str): The statement.
+        table (str): The table to index.
+        sort_only (bool): Only propose an index that serves the sort order.
+
+    Returns:
+        str or None: A `models.Index(...)` definition for the model of the
+        table, or None if the statement neither filters nor sorts it.
+    """
+
+    where = _WHERE.search(sql)
+    where = _NEGATION.sub('', where.group(1)) if where else ''
+    order_by = _ORDER_BY.search(sql)
+    order_by = order_by.group(1) if order_by else ''
+    equalities = _columns(_COMPARISON.format(table=table, operator=_EQUALITY), where)
+    ranges = _columns(_COMPARISON.format(table=table, operator=_RANGE), where)
+    ordering = [
+        ('-' if direction and direction.upper() == 'DESC' else '') + column
+        for column, direction in re.findall(_ORDER_TERM.format(table=table), order_by)
+    ]
+    if sort_only and not ordering:
+        return None
+    model = _model_for(table)
+    if model is not None and model._meta.pk.column in equalities:
+        # The rows are already fetched by primary key
+        return None
+    columns = list(equalities)
+    tail = [term for term in ordering if term.lstrip('-') not in columns] or ranges[:1]
+    columns += [term for term in tail if term.lstrip('-') not in columns]
+    if not columns and not where:
+        # MIN()/MAX() over a whole table is a single seek on an index
+        columns = _columns(_EXTREME.format(table=table), sql)[:1]
+    if not columns:
+        return None
+    return _index_definition(model, table, columns)
+
+
+def _columns(pattern, text):
+    """Return the distinct columns matched by `pattern`, in order."""
+
+    columns = []
+    for match in re.findall(pattern, text, re.IGNORECASE):
+        column = match[0] if isinstance(match, tuple) else match
+        if column not in columns:
+            columns.append(column)
+    return columns
+
+
+def _model_for(table):
+    """Return the model stored in `table`, or None."""
+
+    return next((model for model in apps.get_models(include_auto_created=True) if model._meta.db_table == table), None)
+
+
+def _index_definition(model, table, columns):
+    """
+    Write an index on `columns` of `table` as model code.
+
+    Returns:
+        str or None: The definition, or None if the model already has an
+        index starting with these columns.
+    """
+
+    if model is None:
+        return f"CREATE INDEX ON {table} ({', '.join(columns)})"
+    names = {f.column: f.name for f in model._meta.concrete_fields}
+    fields = [('-' if term.startswith('-') else '') + names.get(term.lstrip('-'), term.lstrip('-')) for term in columns]
+    bare = [name.lstrip('-') for name in fields]
+    existing = [[name.lstrip('-') for name in index.fields] for index in model._meta.indexes]
+    existing += [[f.name] for f in model._meta.concrete_fields if f.db_index or f.unique]
+    existing += [list(fields) for fields in model._meta.unique_together]
+    if any(index[:len(bare)] == bare for index in existing):
+        return None
+    index_name = f"{model._meta.model_name}_{'_'.join(bare)}_idx"
+    if len(index_name) > 30:
+        short = '_'.join(name.removesuffix('_id').split('_')[0] for name in bare)
+        index_name = f"{model._meta.model_name}_{short}_idx"[:30]
+    return f"{model.__name__}: models.Index(fields={fields!r}, name={index_name!r})"
+
+
+def shorten(sql):
+    """Collapse long lists of placeholders, e.g. from `IN (...)`, for display."""
+
+    return _PLACEHOLDERS.sub(lambda match: f"%s, ... ({match.group().count('%s')} values)", sql)
+
+
+def default_clients(user):
+    """Return an anonymous client and one logged in as `user`."""
+
+    authenticated = Client()
+    authenticated.force_login(user)
+    return {'anonymous': Client(), 'authenticated': authenticated}
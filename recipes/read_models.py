@@ -0,0 +1,106 @@
+"""
+Lightweight read models for the list pages.
+
+A list page shows a few columns of each row, but a model instance carries
+every column (a recipe's ingredients and instructions, a user's password
+hash), a `_state` object and a per-instance `__dict__`. The row classes
+here keep only the columns their template uses, in `__slots__`, and are
+built from a `values_list()` projection of exactly those columns.
+
+Columns listed in a row class's `deferred` are left out of the projection
+and loaded with one query the first time they are read, as with
+`QuerySet.defer()`, so code needing them still works, only slower.
+
+`paginate_by_cursor()` and `apaginate_by_cursor()` build rows directly when
+given a `row_class`; `fetch()` does the same for any queryset.
+"""
+
+from recipes.models import Recipe, User
+
+
+class Row:
+    """
+    Base class of the slotted read models.
+
+    Subclasses declare `__slots__ = fields + deferred`.
+
+    Attributes:
+        model (type[Model]): The model the rows are read from.
+        fields (tuple[str]): The columns fetched up front, in
+            `values_list()` order. Must include `id`.
+        deferred (tuple[str]): The columns loaded on first access.
+    """
+
+    __slots__ = ()
+    model = None
+    fields = ()
+    deferred = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.fields, values):
+            setattr(self, name, value)
+
+    @classmethod
+    def project(cls, queryset):
+        """Restrict `queryset` to the columns the rows are built from."""
+
+        return queryset.values_list(*cls.fields)
+
+    @classmethod
+    def build(cls, values):
+        """Build rows from tuples produced by a `project()`ed queryset."""
+
+        return [cls(*row) for row in values]
+
+    @classmethod
+    def fetch(cls, queryset):
+        """Return the rows of `queryset`, reading only the projected columns."""
+
+        return cls.build(cls.project(queryset))
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __getattr__(self, name):
+        # Only reached for slots that were never set, i.e. deferred columns
+        if name not in self.deferred:
+            raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+        value = self.model._default_manager.filter(pk=self.pk).values_list(name, flat=True).get()
+        setattr(self, name, value)
+        return value
+
+    def __eq__(self, other):
+        # Like model instances, rows are equal when they are the same record
+        if type(other) is type(self) or isinstance(other, self.model):
+            return other.pk == self.pk
+        return NotImplemented
+
+    def __hash__(self):
+        # Equal to model instances of the same record, so hashed like them
+        return hash(self.pk)
+
+    def __repr__(self):
+        return f'<{type(self).__name__}: {self.pk}>'
+
+
+class RecipeRow(Row):
+    """A recipe as shown in recipe lists: name, author, date and id."""
+
+    model = Recipe
+    fields = ('id', 'name', 'author_name', 'date_created')
+    deferred = ('ingredients', 'instructions')
+    __slots__ = fields + deferred
+
+
+class UserRow(Row):
+    """A user as shown in the user directory: names and username."""
+
+    model = User
+    fields = ('id', 'username', 'first_name', 'last_name')
+    __slots__ = fields
+
+    def full_name(self):
+        """Return a string containing the user's full name."""
+
+        return f'{self.first_name} {self.last_name}'
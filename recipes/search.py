@@ -0,0 +1,155 @@
+"""
+Full-text recipe search backed by an SQLite FTS5 virtual table.
+
+The `recipes_recipe_fts` table (created by migration) holds one row per
+recipe, keyed by the recipe id as `rowid`, with the recipe's name,
+ingredients, instructions and space-separated tag names. It is kept in
+sync by the signal handlers in `recipes.signals` and can be rebuilt in
+bulk with `python manage.py rebuild_search_index`.
+"""
+
+import re
+from django.db import connection
+from recipes.models import Recipe
+
+FTS_TABLE = 'recipes_recipe_fts'
+
+# Relative BM25 weights of the name, ingredients, instructions and tags columns
+COLUMN_WEIGHTS = (10.0, 3.0, 1.0, 5.0)
+
+# Maximum number of recipes read or written per statement
+BATCH_SIZE = 500
+
+_TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def _batches(ids, size=BATCH_SIZE):
+    ids = list(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def _tag_names_by_recipe(recipe_ids):
+    """Map each of the given recipe ids to a space-separated list of tag names."""
+
+    tag_names = {}
+    rows = (
+        Recipe.tags.through.objects
+        .filter(recipe_id__in=recipe_ids)
+        .values_list('recipe_id', 'foodtag__tag_name')
+        .order_by('recipe_id', 'foodtag__tag_name')
+    )
+    for recipe_id, tag_name in rows:
+        tag_names.setdefault(recipe_id, []).append(tag_name)
+    return {recipe_id: ' '.join(names) for recipe_id, names in tag_names.items()}
+
+
+def index_recipes(recipe_ids):
+    """
+    Insert or refresh the search index rows of the given recipes.
+
+    Recipes that no longer exist are removed from the index.
+
+    Args:
+        recipe_ids (Iterable[int]): Ids of the recipes to (re)index.
+    """
+
+    for batch in _batches(recipe_ids):
+        _index_batch(batch)
+
+
+def _index_batch(recipe_ids):
+    rows = Recipe.objects.filter(id__in=recipe_ids).values_list('id', 'name', 'ingredients', 'instructions')
+    tag_names = _tag_names_by_recipe(recipe_ids)
+    remove_recipes(recipe_ids)
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, ingredients, instructions, tags) VALUES (%s, %s, %s, %s, %s)',
+            [(pk, name, ingredients, instructions, tag_names.get(pk, '')) for pk, name, ingredients, instructions in rows]
+        )
+
+
+def remove_recipes(recipe_ids):
+    """Delete the search index rows of the given recipes."""
+
+    with connection.cursor() as cursor:
+        for batch in _batches(recipe_ids):
+            placeholders = ', '.join(['%s'] * len(batch))
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', batch)
+
+
+def rebuild_index(batch_size=1000):
+    """
+    Rebuild the whole search index from the recipe table.
+
+    Recipes are read and inserted in id-ordered batches so memory use does
+    not grow with the size of the catalog.
+
+    Args:
+        batch_size (int): Number of recipes indexed per batch.
+
+    Yields:
+        int: The running total of indexed recipes after each batch.
+    """
+
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    indexed = 0
+    last_id = 0
+    while True:
+        ids = list(
+            Recipe.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        index_recipes(ids)
+        indexed += len(ids)
+        last_id = ids[-1]
+        yield indexed
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+
+
+def build_match_query(text):
+    """
+    Turn free text typed by a user into a safe FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix term, and all terms must match, so
+    FTS5 operators and punctuation in the input are never interpreted.
+
+    Returns:
+        str | None: The MATCH expression, or None if `text` has no words.
+    """
+
+    tokens = _TOKEN_PATTERN.findall(text or '')
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_recipe_ids(text, limit, offset=0):
+    """
+    Return the ids of the recipes matching `text`, best match first.
+
+    Results are ranked with BM25 using `COLUMN_WEIGHTS`.
+
+    Args:
+        text (str): The user's search terms.
+        limit (int): Maximum number of ids to return.
+        offset (int): Number of ranked results to skip.
+
+    Returns:
+        list[int]: Matching recipe ids in rank order.
+    """
+
+    match = build_match_query(text)
+    if match is None:
+        return []
+    weights = ', '.join(str(weight) for weight in COLUMN_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'ORDER BY bm25({FTS_TABLE}, {weights}) LIMIT %s OFFSET %s',
+            [match, limit, offset]
+        )
+        return [row[0] for row in cursor.fetchall()]
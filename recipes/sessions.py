@@ -0,0 +1,210 @@
+"""
+Write-coalescing session engine (`SESSION_ENGINE = 'recipes.sessions'`).
+
+Sessions are read from the cache (`SESSION_CACHE_ALIAS`) and fall back to
+the `django_session` table, like Django's `cached_db` engine, but the
+table is written far less often:
+
+- Saving a session whose data is unchanged since it was loaded (e.g. with
+  `SESSION_SAVE_EVERY_REQUEST`, or a `modified` flag set without a real
+  change) only moves the expiry. The cache entry is refreshed and the new
+  expiry date is queued in process memory; queued expiry dates are written
+  to the table in one batched UPDATE at most `SESSION_EXPIRY_FLUSH_INTERVAL`
+  seconds after the first of them was queued (by a timer thread, so also
+  when traffic stops), once `SESSION_EXPIRY_FLUSH_BATCH` sessions are
+  queued, and when the process exits. A queued refresh that is lost (e.g.
+  when the process is killed) only makes the stored expiry a little
+  earlier than it would have been.
+- Changes to the data (logging in or out, pending messages) are written
+  through to the table and the cache immediately.
+
+`SessionStore.clear_expired()`, which `clearsessions` calls, deletes
+expired rows in small batches, each in its own transaction, walking the
+`expire_date` index; `sweep_sessions` does the same with progress output.
+Since a refreshed expiry date may still be queued in another process for
+up to `SESSION_EXPIRY_FLUSH_INTERVAL` seconds, only rows that expired more
+than that long ago are deleted; a session in use is never swept because
+its stored expiry date lags behind.
+
+As with `cached_db`, the cache must be shared by every worker process:
+with a per-process cache, a session logged out or flushed in one worker
+would stay valid in the others. The `recipes.E001` system check refuses
+to run with one when `REQUIRE_SHARED_CACHE` is set (see `recipes.checks`).
+"""
+
+import atexit
+import hashlib
+import logging
+import threading
+import time
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.contrib.sessions.models import Session
+from django.db import transaction
+from django.utils import timezone
+from recipes.helpers import start_flush_timer
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'recipes.sessions.'
+
+
+class ExpiryQueue:
+    """
+    Pending session expiry dates, flushed to the database in batches.
+
+    All public methods are thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._last_flush = time.monotonic()
+        self._timer = None
+
+    def defer(self, session_key, expire_date):
+        """
+        Queue a new expiry date, flushing the queue if it is due.
+
+        The first date queued after a flush starts a timer that flushes the
+        queue `SESSION_EXPIRY_FLUSH_INTERVAL` seconds later.
+        """
+
+        with self._lock:
+            if not self._pending and self._timer is None:
+                self._timer = start_flush_timer(settings.SESSION_EXPIRY_FLUSH_INTERVAL, self.flush_quietly)
+            self._pending[session_key] = expire_date
+            due = (
+                len(self._pending) >= settings.SESSION_EXPIRY_FLUSH_BATCH
+                or time.monotonic() - self._last_flush >= settings.SESSION_EXPIRY_FLUSH_INTERVAL
+            )
+        if due:
+            self.flush()
+
+    def discard(self, session_key):
+        """Drop the queued expiry date of a session that was written or deleted."""
+
+        with self._lock:
+            self._pending.pop(session_key, None)
+
+    def flush(self):
+        """
+        Write every queued expiry date to the database.
+
+        Returns:
+            int: The number of sessions whose expiry date was written.
+        """
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._last_flush = time.monotonic()
+            timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+        if pending:
+            sessions = [Session(session_key=key, expire_date=date) for key, date in pending.items()]
+            Session.objects.bulk_update(sessions, ['expire_date'], batch_size=settings.SESSION_EXPIRY_FLUSH_BATCH)
+        return len(pending)
+
+    def flush_quietly(self):
+        """Flush the queue, logging instead of raising errors."""
+
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Could not write queued session expiry dates")
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+
+expiry_queue = ExpiryQueue()
+atexit.register(expiry_queue.flush_quietly)
+
+
+class SessionStore(CachedDBStore):
+    """Cached, database-backed sessions whose expiry refreshes are coalesced."""
+
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        super().__init__(session_key)
+        self._loaded_digest = None
+
+    def _digest(self, data):
+        """Fingerprint session data, to tell whether saving would change it."""
+
+        return hashlib.sha1(self.serializer().dumps(data)).hexdigest()
+
+    def load(self):
+        data = super().load()
+        self._loaded_digest = self._digest(data)
+        return data
+
+    async def aload(self):
+        data = await super().aload()
+        self._loaded_digest = self._digest(data)
+        return data
+
+    def save(self, must_create=False):
+        """
+        Save the session, writing to the database only if its data changed.
+
+        Unchanged sessions only get a fresh cache entry and a queued expiry
+        date (see `ExpiryQueue`).
+        """
+
+        data = self._get_session(no_load=must_create)
+        digest = self._digest(data)
+        if must_create or self.session_key is None or digest != self._loaded_digest:
+            super().save(must_create)
+            expiry_queue.discard(self.session_key)
+            self._loaded_digest = digest
+            return
+        self._cache.set(self.cache_key, data, self.get_expiry_age())
+        expiry_queue.defer(self.session_key, self.get_expiry_date())
+
+    async def asave(self, must_create=False):
+        await sync_to_async(self.save)(must_create)
+
+    def delete(self, session_key=None):
+        super().delete(session_key)
+        expiry_queue.discard(session_key or self.session_key)
+
+    @classmethod
+    def iter_clear_expired(cls, batch_size=500):
+        """
+        Delete expired sessions in batches, each in its own transaction.
+
+        Sessions that expired less than `SESSION_EXPIRY_FLUSH_INTERVAL`
+        seconds ago are kept, since a refreshed expiry date may still be
+        queued for them in another process.
+
+        Args:
+            batch_size (int): Number of sessions deleted per transaction.
+
+        Yields:
+            int: The running total of deleted sessions after each batch.
+        """
+
+        deleted = 0
+        cutoff = timezone.now() - timedelta(seconds=settings.SESSION_EXPIRY_FLUSH_INTERVAL)
+        while True:
+            keys = list(
+                Session.objects.filter(expire_date__lt=cutoff)
+                .order_by('expire_date').values_list('session_key', flat=True)[:batch_size]
+            )
+            if not keys:
+                return
+            with transaction.atomic():
+                Session.objects.filter(session_key__in=keys).delete()
+            deleted += len(keys)
+            yield deleted
+
+    @classmethod
+    def clear_expired(cls):
+        for _ in cls.iter_clear_expired():
+            pass
@@ -0,0 +1,135 @@
+"""
+Signal handlers keeping derived recipe data in sync with the models.
+
+They are connected when the `recipes` app is ready (see `RecipesConfig`).
+Saves of raw rows, e.g. from `loaddata`, are ignored: fixtures are stored
+exactly as given, without querying or deriving other data from them.
+"""
+
+from django.core.signals import request_finished
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from recipes import conditional, feed, fragment_cache, ingredients, search, summaries
+from recipes.helpers import filter_by_ids
+from recipes.models import FoodTag, Recipe, User
+from recipes.tag_index import tag_index
+from recipes.tag_trie import tag_trie
+from recipes.view_counts import view_counter
+
+
+def _recipes_changed(recipe_ids, touch=True):
+    """
+    Record that the rendered form of the given recipes changed.
+
+    Unless `touch` is false (the recipe rows were just saved), their
+    `date_modified` is moved forward. Once the transaction commits, their
+    cached page bodies are invalidated and the recipe list stamp is moved.
+    """
+
+    recipe_ids = list(recipe_ids)
+    if touch and recipe_ids:
+        filter_by_ids(Recipe.objects.all(), recipe_ids).update(date_modified=timezone.now())
+    transaction.on_commit(lambda: fragment_cache.invalidate_recipes(recipe_ids))
+    transaction.on_commit(conditional.touch_recipe_list)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, update_fields=None, **kwargs):
+    if kwargs.get('raw'):
+        return
+    if created:
+        feed.publish([instance])
+    search.index_recipes([instance.pk])
+    if update_fields is None or 'ingredients' in update_fields:
+        ingredients.index_recipes([instance])
+    _recipes_changed([instance.pk], touch=False)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    search.remove_recipes([instance.pk])
+    recipe_id = instance.pk
+    transaction.on_commit(lambda: tag_index.remove_recipe(recipe_id))
+    transaction.on_commit(tag_trie.invalidate)
+    _recipes_changed([recipe_id], touch=False)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        # Remember what is being unlinked; pk_set is None on post_clear
+        related = instance.recipe_set if reverse else instance.tags
+        instance._cleared_pks = set(related.values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_cleared_pks', set())
+    if reverse:
+        tag_ids, recipe_ids = {instance.pk}, set(pk_set)
+    else:
+        tag_ids, recipe_ids = set(pk_set), {instance.pk}
+    summaries.refresh_tag_names(recipe_ids)
+    search.index_recipes(recipe_ids)
+    _recipes_changed(recipe_ids)
+    if action == 'post_add':
+        feed.publish_tags(tag_ids, recipe_ids)
+        transaction.on_commit(lambda: tag_index.add(tag_ids, recipe_ids))
+    else:
+        transaction.on_commit(lambda: tag_index.remove(tag_ids, recipe_ids))
+    # The autocomplete ranking counts the recipes per tag
+    transaction.on_commit(tag_trie.invalidate)
+
+
+@receiver(post_save, sender=FoodTag)
+def food_tag_saved(sender, instance, created, **kwargs):
+    if kwargs.get('raw'):
+        return
+    if not created:
+        recipe_ids = list(instance.recipe_set.values_list('pk', flat=True))
+        summaries.refresh_tag_names(recipe_ids)
+        search.index_recipes(recipe_ids)
+        _recipes_changed(recipe_ids)
+    tag_id, tag_name = instance.pk, instance.tag_name
+    transaction.on_commit(lambda: tag_index.set_tag(tag_id, tag_name))
+    transaction.on_commit(tag_trie.invalidate)
+
+
+@receiver(pre_delete, sender=FoodTag)
+def food_tag_deleting(sender, instance, **kwargs):
+    instance._tagged_recipe_ids = list(instance.recipe_set.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=FoodTag)
+def food_tag_deleted(sender, instance, **kwargs):
+    recipe_ids = getattr(instance, '_tagged_recipe_ids', [])
+    summaries.refresh_tag_names(recipe_ids)
+    search.index_recipes(recipe_ids)
+    _recipes_changed(recipe_ids)
+    tag_id = instance.pk
+    transaction.on_commit(lambda: tag_index.remove_tag(tag_id))
+    transaction.on_commit(tag_trie.invalidate)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Recipe pages show the author's username; ignore e.g. last_login updates
+    if kwargs.get('raw') or created or (update_fields is not None and 'username' not in update_fields):
+        return
+    recipe_ids = summaries.rename_author(instance)
+    if recipe_ids:
+        _recipes_changed(recipe_ids)
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, **kwargs):
+    # The user's follows are about to be cascaded; the authors lose a follower
+    feed.forget_users([instance.pk])
+
+
+@receiver(request_finished)
+def flush_recipe_views(sender, **kwargs):
+    # The response has been sent; nobody waits for the buffered view counts
+    view_counter.flush_if_due()
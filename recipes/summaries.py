@@ -0,0 +1,120 @@
+"""
+Denormalized summary columns of `Recipe`: `author_name` and `tag_names`.
+
+They hold copies of the author's username and of the recipe's tag names
+(sorted, encoded with `encode_tag_names()`), so that recipe lists, search
+results and exports render from the recipe rows alone, without joining
+the users or the tag tables.
+
+`Recipe.save()` copies the author's username. The signal handlers in
+`recipes.signals` call `refresh_tag_names()` when tags are added to or
+removed from recipes, renamed or deleted, and `rename_author()` when a
+user changes their username, inside the transaction making the change.
+Bulk writes that bypass those (the importer) fill the columns
+themselves. Anything else writing the source columns directly, e.g. a
+queryset `update()` of usernames, leaves the copies stale until
+`repair()` (the `repair_recipe_summaries` command) finds and fixes them.
+"""
+
+from contextlib import nullcontext
+from django.db import transaction
+from recipes.helpers import filter_by_ids
+from recipes.models import Recipe, encode_tag_names
+
+
+def encoded_tag_names(recipe_ids):
+    """
+    Read the tag names of the given recipes from the tag tables.
+
+    Args:
+        recipe_ids (Iterable[int]): The recipes to look up.
+
+    Returns:
+        dict[int, str]: The encoded tag names of every given recipe (empty
+        for recipes without tags).
+    """
+
+    names = {recipe_id: [] for recipe_id in recipe_ids}
+    rows = filter_by_ids(Recipe.tags.through.objects.all(), names, field='recipe_id')
+    for recipe_id, tag_name in rows.values_list('recipe_id', 'foodtag__tag_name'):
+        names[recipe_id].append(tag_name)
+    return {recipe_id: encode_tag_names(tags) for recipe_id, tags in names.items()}
+
+
+def refresh_tag_names(recipe_ids, batch_size=500):
+    """
+    Rewrite the stored tag names of the given recipes from the tag tables.
+
+    Only the recipes whose stored value differs are written.
+
+    Args:
+        recipe_ids (Iterable[int]): The recipes whose tags changed.
+        batch_size (int): Number of recipes written per query.
+
+    Returns:
+        int: The number of recipes updated.
+    """
+
+    expected = encoded_tag_names(recipe_ids)
+    stale = [
+        Recipe(pk=recipe_id, tag_names=expected[recipe_id])
+        for recipe_id, tag_names in filter_by_ids(Recipe.objects.all(), expected).values_list('id', 'tag_names')
+        if tag_names != expected[recipe_id]
+    ]
+    Recipe.objects.bulk_update(stale, ['tag_names'], batch_size=batch_size)
+    return len(stale)
+
+
+def rename_author(user):
+    """
+    Copy a user's username to the recipes they wrote.
+
+    Returns:
+        list[int]: The ids of the recipes whose stored author name changed.
+    """
+
+    recipes = Recipe.objects.filter(author=user).exclude(author_name=user.username)
+    recipe_ids = list(recipes.values_list('pk', flat=True))
+    if recipe_ids:
+        filter_by_ids(Recipe.objects.all(), recipe_ids).update(author_name=user.username)
+    return recipe_ids
+
+
+def repair(batch_size=1000, fix=True):
+    """
+    Compare every recipe's summary columns with their sources and fix drift.
+
+    Recipes are read in id-ordered batches, each with the author's username
+    (one query) and the tag names (one query); stale rows are written back
+    with one `bulk_update` per batch.
+
+    Args:
+        batch_size (int): Number of recipes checked per batch.
+        fix (bool): Write the correct values back. When false, drift is
+            only reported.
+
+    Yields:
+        tuple[int, list[int]]: For every batch, the number of recipes
+        checked and the ids of the stale ones.
+    """
+
+    last_id = 0
+    while True:
+        # Read and write in one transaction, so no concurrent change falls in between
+        with transaction.atomic() if fix else nullcontext():
+            rows = list(
+                Recipe.objects.filter(id__gt=last_id).order_by('id')
+                .values_list('id', 'author_name', 'tag_names', 'author__username')[:batch_size]
+            )
+            if not rows:
+                return
+            tag_names = encoded_tag_names([row[0] for row in rows])
+            stale = [
+                Recipe(pk=recipe_id, author_name=username, tag_names=tag_names[recipe_id])
+                for recipe_id, stored_author, stored_tags, username in rows
+                if (stored_author, stored_tags) != (username, tag_names[recipe_id])
+            ]
+            if stale and fix:
+                Recipe.objects.bulk_update(stale, ['author_name', 'tag_names'])
+        yield len(rows), [recipe.pk for recipe in stale]
+        last_id = rows[-1][0]
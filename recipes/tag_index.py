@@ -0,0 +1,218 @@
+"""
+In-process posting-list index of recipe tags.
+
+`tag_index` maps every `FoodTag` id to the set of ids of the recipes
+carrying it, plus the tag names, so that tag filters (AND/OR) and facet
+counts can be answered without joining the `Recipe.tags` through table.
+It also holds the list sort key (`Recipe.LIST_ORDERING`) of every tagged
+recipe, so that a page of filtered recipes can be picked in memory and
+only its ids sent to the database.
+
+The index is loaded lazily from the database and then updated
+incrementally by the signal handlers in `recipes.signals` once the
+writing transaction commits. Every update also bumps a version stamp in
+the Django cache; a process whose copy is older than the stamp (because
+another process changed the tags) reloads it on next use.
+
+Deleted recipes are the exception: they are only dropped from this
+process's copy, without a bump, so that deleting recipes does not make
+every process reload the whole index. Other processes keep the stale ids
+until their next reload, which is harmless for the recipes shown, since a
+page's ids are always looked up again in the database (see
+`recipes.helpers.filter_by_ids`); only their facet counts may include
+the deleted recipes meanwhile.
+"""
+
+import threading
+from django.db.models import OuterRef, Subquery
+from recipes.helpers import bump_cache_version, filter_by_ids, get_cache_version
+from recipes.models import FoodTag, Recipe
+
+VERSION_KEY = 'recipes:tag_index:version'
+
+
+class TagIndex:
+    """
+    Posting lists of recipe ids per tag, held in process memory.
+
+    All public methods are thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = None
+        self._names = None
+        self._dates = None
+        self._version = None
+
+    def reset(self):
+        """Drop the loaded index so that it is reloaded on next use."""
+
+        with self._lock:
+            self._postings = None
+            self._names = None
+            self._dates = None
+            self._version = None
+
+    def _ensure_loaded(self):
+        """Load the index if it is missing or stale. Must hold the lock."""
+
+        version = get_cache_version(VERSION_KEY)
+        if self._postings is not None and version == self._version:
+            return
+        names = dict(FoodTag.objects.values_list('id', 'tag_name'))
+        postings = {tag_id: set() for tag_id in names}
+        dates = {}
+        # The date is looked up by primary key for every row, rather than
+        # joined, so the index still loads with a single read of the links
+        date_created = Subquery(Recipe.objects.filter(pk=OuterRef('recipe_id')).values('date_created'))
+        rows = Recipe.tags.through.objects.values_list('foodtag_id', 'recipe_id', date_created)
+        for tag_id, recipe_id, date in rows.iterator(chunk_size=10000):
+            postings.setdefault(tag_id, set()).add(recipe_id)
+            dates[recipe_id] = date
+        self._names = names
+        self._postings = postings
+        self._dates = dates
+        self._version = version
+
+    def _bump_version(self):
+        """Publish a local change to other processes. Must hold the lock."""
+
+        version = bump_cache_version(VERSION_KEY)
+        if version is not None and self._version is not None and version == self._version + 1:
+            self._version = version
+        else:
+            # Another process changed the index too; reload on next use
+            self._postings = None
+
+    def tag_names(self):
+        """Return a mapping of tag id to tag name."""
+
+        with self._lock:
+            self._ensure_loaded()
+            return dict(self._names)
+
+    def recipe_ids(self, tag_ids, match_all=True):
+        """
+        Return the ids of the recipes carrying the given tags.
+
+        Args:
+            tag_ids (Iterable[int]): The selected tag ids.
+            match_all (bool): If true, recipes must carry every tag (AND);
+                otherwise any of them (OR).
+
+        Returns:
+            set[int]: The matching recipe ids.
+        """
+
+        with self._lock:
+            self._ensure_loaded()
+            postings = [self._postings.get(tag_id, set()) for tag_id in tag_ids]
+            if not postings:
+                return set()
+            if match_all:
+                postings.sort(key=len)
+                return set.intersection(*postings)
+            return set.union(*postings)
+
+    def sort_keys(self, recipe_ids):
+        """
+        Return the `Recipe.LIST_ORDERING` values of the given recipes.
+
+        Recipes tagged since the index was loaded have their creation date
+        read in one query, then kept. `date_created` never changes, so the
+        keys stay valid.
+
+        Args:
+            recipe_ids (Iterable[int]): Ids of existing recipes, e.g. from
+                `recipe_ids()`.
+
+        Returns:
+            dict[int, tuple]: `(date_created, id)` by recipe id.
+        """
+
+        with self._lock:
+            self._ensure_loaded()
+            dates = self._dates
+            missing = [recipe_id for recipe_id in recipe_ids if recipe_id not in dates]
+            if missing:
+                dates.update(filter_by_ids(Recipe.objects.all(), missing).values_list('id', 'date_created'))
+            return {recipe_id: (dates[recipe_id], recipe_id) for recipe_id in recipe_ids if recipe_id in dates}
+
+    def facet_counts(self, recipe_ids=None):
+        """
+        Count the recipes carrying each tag.
+
+        Args:
+            recipe_ids (set[int], optional): Restrict the counts to these
+                recipes (the current result set). Counts cover all recipes
+                when omitted.
+
+        Returns:
+            dict[int, int]: Number of matching recipes per tag id.
+        """
+
+        with self._lock:
+            self._ensure_loaded()
+            if recipe_ids is None:
+                return {tag_id: len(ids) for tag_id, ids in self._postings.items()}
+            return {tag_id: len(ids & recipe_ids) for tag_id, ids in self._postings.items()}
+
+    def add(self, tag_ids, recipe_ids):
+        """Record that every recipe in `recipe_ids` now carries every tag in `tag_ids`."""
+
+        with self._lock:
+            if self._postings is not None:
+                for tag_id in tag_ids:
+                    self._postings.setdefault(tag_id, set()).update(recipe_ids)
+            self._bump_version()
+
+    def remove(self, tag_ids, recipe_ids):
+        """Record that the recipes in `recipe_ids` no longer carry the tags in `tag_ids`."""
+
+        with self._lock:
+            if self._postings is not None:
+                for tag_id in tag_ids:
+                    self._postings.get(tag_id, set()).difference_update(recipe_ids)
+            self._bump_version()
+
+    def remove_recipe(self, recipe_id):
+        """Remove a deleted recipe from every posting list."""
+
+        self.remove_recipes({recipe_id})
+
+    def remove_recipes(self, recipe_ids):
+        """
+        Remove several deleted recipes from every posting list.
+
+        The change is not published to other processes (see the module
+        docstring).
+        """
+
+        with self._lock:
+            if self._postings is not None:
+                for ids in self._postings.values():
+                    ids.difference_update(recipe_ids)
+                for recipe_id in recipe_ids:
+                    self._dates.pop(recipe_id, None)
+
+    def set_tag(self, tag_id, tag_name):
+        """Record a new or renamed tag."""
+
+        with self._lock:
+            if self._postings is not None:
+                self._names[tag_id] = tag_name
+                self._postings.setdefault(tag_id, set())
+            self._bump_version()
+
+    def remove_tag(self, tag_id):
+        """Remove a deleted tag and its posting list."""
+
+        with self._lock:
+            if self._postings is not None:
+                self._names.pop(tag_id, None)
+                self._postings.pop(tag_id, None)
+            self._bump_version()
+
+
+tag_index = TagIndex()
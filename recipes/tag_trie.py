@@ -0,0 +1,120 @@
+"""
+In-process prefix trie over tag names, serving tag autocompletion.
+
+`tag_trie` indexes every `FoodTag` under the case-folded start of each
+word of its name, so `veg` finds "Vegan" and `free` finds "Gluten-free".
+Every node keeps its best `MAX_SUGGESTIONS` tags, ranked by the number of
+recipes carrying them and then by name, so a lookup only walks the
+prefix and never touches the database.
+
+The trie is built lazily from one query and rebuilt in full when a
+version stamp in the Django cache changes. The signal handlers in
+`recipes.signals` (and the importer) call `invalidate()` once a
+transaction adding, renaming or deleting tags, or changing which recipes
+carry them, commits, so every process rebuilds on its next lookup.
+"""
+
+import threading
+from django.db.models import Count
+from recipes.helpers import bump_cache_version, get_cache_version
+from recipes.models import FoodTag
+
+VERSION_KEY = 'recipes:tag_trie:version'
+
+# Most suggestions a lookup can return; also the number kept per node
+MAX_SUGGESTIONS = 20
+
+
+class _Node:
+    """A trie node: its children by character and its best tags."""
+
+    __slots__ = ('children', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.top = []
+
+
+def _word_starts(name):
+    """Return the suffixes of `name` starting at each of its words."""
+
+    return [name[i:] for i, char in enumerate(name) if char.isalnum() and (i == 0 or not name[i - 1].isalnum())]
+
+
+class TagTrie:
+    """
+    Prefix trie of tag names ranked by usage, held in process memory.
+
+    All public methods are thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._root = None
+        self._version = None
+
+    def reset(self):
+        """Drop the built trie so that it is rebuilt on next use."""
+
+        with self._lock:
+            self._root = None
+            self._version = None
+
+    def invalidate(self):
+        """Make every process rebuild the trie on its next lookup."""
+
+        with self._lock:
+            bump_cache_version(VERSION_KEY)
+            self._root = None
+
+    def _ensure_built(self):
+        """Build the trie if it is missing or stale. Must hold the lock."""
+
+        version = get_cache_version(VERSION_KEY)
+        if self._root is not None and version == self._version:
+            return
+        tags = FoodTag.objects.annotate(usage=Count('recipe')).values_list('id', 'tag_name', 'usage')
+        root = _Node()
+        # Inserting the best tags first leaves every node's `top` ranked
+        for tag_id, tag_name, usage in sorted(tags, key=lambda tag: (-tag[2], tag[1].casefold(), tag[0])):
+            entry = {'id': tag_id, 'name': tag_name, 'count': usage}
+            self._insert(root, entry)
+            for word in _word_starts(tag_name.casefold()):
+                node = root
+                for char in word:
+                    node = node.children.setdefault(char, _Node())
+                    self._insert(node, entry)
+        self._root = root
+        self._version = version
+
+    @staticmethod
+    def _insert(node, entry):
+        # A name with repeated words reaches some nodes twice in a row
+        if len(node.top) < MAX_SUGGESTIONS and (not node.top or node.top[-1] is not entry):
+            node.top.append(entry)
+
+    def suggest(self, prefix, limit=10):
+        """
+        Return the most used tags with a word starting with `prefix`.
+
+        Args:
+            prefix (str): What the user typed; case is ignored. An empty
+                prefix matches every tag.
+            limit (int): Number of suggestions, at most `MAX_SUGGESTIONS`.
+
+        Returns:
+            list[dict]: The `id`, `name` and usage `count` of each tag,
+            most used first.
+        """
+
+        with self._lock:
+            self._ensure_built()
+            node = self._root
+            for char in prefix.strip().casefold():
+                node = node.children.get(char)
+                if node is None:
+                    return []
+            return [dict(entry) for entry in node.top[:min(limit, MAX_SUGGESTIONS)]]
+
+
+tag_trie = TagTrie()
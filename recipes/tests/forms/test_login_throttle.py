@@ -0,0 +1,142 @@
+"""Tests of the password check throttling."""
+from io import StringIO
+from unittest import mock
+from django.contrib.auth import hashers
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from recipes.forms import LogInForm, PasswordForm
+from recipes.models import User
+from recipes.throttle import Throttled, TokenBucket, login_throttle, throttle_stats
+
+
+class TokenBucketTestCase(TestCase):
+    """Unit tests of the token bucket."""
+
+    def setUp(self):
+        cache.clear()
+        self.bucket = TokenBucket('test', capacity=3, period=30)
+
+    def test_bucket_allows_a_burst_up_to_capacity(self):
+        for _ in range(3):
+            self.bucket.consume('a', now=100)
+        with self.assertRaises(Throttled):
+            self.bucket.consume('a', now=100)
+        self.bucket.consume('b', now=100)
+
+    def test_bucket_refills_over_time(self):
+        for _ in range(3):
+            self.bucket.consume('a', now=100)
+        with self.assertRaises(Throttled) as context:
+            self.bucket.consume('a', now=105)
+        self.assertAlmostEqual(context.exception.retry_after, 5)
+        self.bucket.consume('a', now=110)
+
+    def test_empty_bucket_is_rejected_without_cache_access(self):
+        for _ in range(3):
+            self.bucket.consume('a', now=100)
+        with self.assertRaises(Throttled):
+            self.bucket.consume('a', now=100)
+        with mock.patch('recipes.throttle.cache') as cache_mock:
+            with self.assertRaises(Throttled):
+                self.bucket.consume('a', now=101)
+        cache_mock.get.assert_not_called()
+
+    def test_refund_returns_a_token(self):
+        for _ in range(3):
+            self.bucket.consume('a', now=100)
+        self.bucket.refund('a', now=100)
+        self.bucket.consume('a', now=100)
+
+
+@override_settings(LOGIN_THROTTLE_RATES={'ip': (5, 60), 'username': (3, 60)})
+class LoginThrottleTestCase(TestCase):
+    """Tests of throttled log in and password forms."""
+
+    fixtures = ['recipes/tests/fixtures/default_user.json']
+
+    def setUp(self):
+        cache.clear()
+        login_throttle.reset()
+        self.addCleanup(login_throttle.reset)
+        self.addCleanup(cache.clear)
+        self.user = User.objects.get(username='@johndoe')
+        self.request = RequestFactory().post('/log_in/', REMOTE_ADDR='10.0.0.1')
+
+    def _log_in(self, password='WrongPassword123', username='@johndoe', ip='10.0.0.1'):
+        request = RequestFactory().post('/log_in/', REMOTE_ADDR=ip)
+        form = LogInForm({'username': username, 'password': password}, request=request)
+        return form, form.get_user()
+
+    def test_failed_attempts_are_throttled_per_username(self):
+        for _ in range(3):
+            form, user = self._log_in()
+            self.assertIsNone(user)
+            self.assertFalse(form.has_error('__all__', code='throttled'))
+        form, user = self._log_in(password='Password123', ip='10.0.0.2')
+        self.assertIsNone(user)
+        self.assertTrue(form.has_error('__all__', code='throttled'))
+
+    def test_failed_attempts_are_throttled_per_ip(self):
+        for i in range(5):
+            self._log_in(username=f'@someone{i}')
+        form, user = self._log_in(username='@johndoe', password='Password123')
+        self.assertIsNone(user)
+        self.assertTrue(form.has_error('__all__', code='throttled'))
+
+    def test_throttled_ip_does_not_drain_username_bucket(self):
+        for i in range(5):
+            self._log_in(username=f'@someone{i}', ip='10.0.0.9')
+        for _ in range(5):
+            form, user = self._log_in(ip='10.0.0.9')
+            self.assertTrue(form.has_error('__all__', code='throttled'))
+        form, user = self._log_in(password='Password123')
+        self.assertEqual(user, self.user)
+
+    def test_throttled_attempts_do_not_hash_passwords(self):
+        for _ in range(3):
+            self._log_in()
+        with mock.patch.object(hashers, 'check_password', wraps=hashers.check_password) as check:
+            with mock.patch('django.contrib.auth.base_user.check_password', check):
+                self._log_in(password='Password123')
+        check.assert_not_called()
+
+    def test_successful_attempts_are_not_counted_per_username(self):
+        for i in range(5):
+            form, user = self._log_in(password='Password123', ip=f'10.0.1.{i}')
+            self.assertEqual(user, self.user)
+
+    def test_successful_attempts_are_counted_per_ip(self):
+        for _ in range(5):
+            form, user = self._log_in(password='Password123')
+            self.assertEqual(user, self.user)
+        form, user = self._log_in(password='Password123')
+        self.assertIsNone(user)
+        self.assertTrue(form.has_error('__all__', code='throttled'))
+
+    def test_log_in_view_answers_throttled_attempts_with_429(self):
+        form_input = {'username': '@johndoe', 'password': 'WrongPassword123'}
+        for _ in range(3):
+            self.client.post(reverse('log_in'), form_input)
+        response = self.client.post(reverse('log_in'), {'username': '@johndoe', 'password': 'Password123'})
+        self.assertEqual(response.status_code, 429)
+        self.assertContains(response, 'Too many log in attempts', status_code=429)
+
+    def test_password_form_is_throttled(self):
+        form_input = {'password': 'WrongPassword123', 'new_password': 'NewPassword123', 'password_confirmation': 'NewPassword123'}
+        for _ in range(3):
+            form = PasswordForm(user=self.user, request=self.request, data=form_input)
+            self.assertFalse(form.is_valid())
+        form_input['password'] = 'Password123'
+        form = PasswordForm(user=self.user, request=self.request, data=form_input)
+        self.assertFalse(form.is_valid())
+        self.assertTrue(form.has_error('password', code='throttled'))
+
+    def test_throttle_counters(self):
+        for _ in range(4):
+            self._log_in()
+        self.assertEqual(throttle_stats(), {'allowed': 3, 'throttled': 1})
+        stdout = StringIO()
+        call_command('login_throttle_stats', stdout=stdout)
+        self.assertIn('allowed=3 throttled=1', stdout.getvalue())
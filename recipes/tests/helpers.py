@@ -1,3 +1,9 @@
+import asyncio
+import time
+from contextlib import contextmanager
+from io import BytesIO
+from django.core import signals
+from django.db import close_old_connections
 from django.urls import reverse
 from with_asserts.mixin import AssertHTMLMixin
 
@@ -34,4 +40,236 @@ class MenuTesterMixin(AssertHTMLMixin):
         """Check that no menu is present."""
         
         for url in self.menu_urls:
-            self.assertNotHTML(response, f'a[href="{url}"]')
\ No newline at end of file
+            self.assertNotHTML(response, f'a[href="{url}"]')
+
+
+@contextmanager
+def kept_connections():
+    """
+    Keep database connections open across the requests of a harness, as
+    the test client does, so that the test's transaction survives.
+    """
+
+    signals.request_started.disconnect(close_old_connections)
+    signals.request_finished.disconnect(close_old_connections)
+    try:
+        yield
+    finally:
+        signals.request_started.connect(close_old_connections)
+        signals.request_finished.connect(close_old_connections)
+
+
+class AsgiHarness:
+    """
+    Run requests through the ASGI entry point (`recipify.asgi`) with many
+    concurrent simulated clients, in a single process and thread.
+
+    The harness tracks how many requests the application is handling at
+    the same time; `peak_in_flight` above one shows that requests were
+    interleaved rather than served one after another. `stalled` is the
+    number of clients currently refusing to read their response body.
+
+    Args:
+        timeout (float): Seconds a single request may take.
+        write_delay (float): Seconds a simulated client takes to receive
+            each chunk of a response body, as a client on a slow network.
+    """
+
+    def __init__(self, timeout=10, write_delay=0):
+        from recipify.asgi import application
+        self.application = application
+        self.timeout = timeout
+        self.write_delay = write_delay
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.stalled = 0
+
+    async def _counted_application(self, scope, receive, send):
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await self.application(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+
+    async def get(self, path, query_string='', headers=(), stall_until=None):
+        """
+        Send one GET request and return `(status, headers, body)`.
+
+        Args:
+            path (str): The request path.
+            query_string (str): The query string, without the `?`.
+            headers (Iterable[tuple[str, str]]): Extra request headers.
+            stall_until (asyncio.Event, optional): If given, the client does
+                not read the response body until the event is set.
+        """
+
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'raw_path': path.encode(),
+            'root_path': '',
+            'query_string': query_string.encode(),
+            'headers': [(b'host', b'testserver')] + [(name.lower().encode(), value.encode()) for name, value in headers],
+            'client': ('127.0.0.1', 50000),
+            'server': ('testserver', 80),
+        }
+        request_sent = False
+        messages = []
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            # The client never disconnects; Django stops listening once it has responded
+            await asyncio.Event().wait()
+
+        async def send(message):
+            messages.append(message)
+            if message['type'] != 'http.response.body':
+                return
+            if stall_until is not None and not stall_until.is_set():
+                self.stalled += 1
+                try:
+                    await stall_until.wait()
+                finally:
+                    self.stalled -= 1
+            if self.write_delay:
+                await asyncio.sleep(self.write_delay)
+
+        # Called directly rather than through asgiref's ApplicationCommunicator,
+        # which runs the application in a fresh context and so on another
+        # database connection than the test's
+        await asyncio.wait_for(self._counted_application(scope, receive, send), self.timeout)
+        start = messages[0]
+        body = b''.join(message.get('body', b'') for message in messages[1:])
+        response_headers = {name.decode().lower(): value.decode() for name, value in start['headers']}
+        return start['status'], response_headers, body
+
+    async def run_clients(self, paths, clients, requests_per_client=1, think_time=0):
+        """
+        Simulate `clients` users, each requesting the given paths in turn.
+
+        Database connections are kept open between requests, as the test
+        client does, so that the test's transaction survives.
+
+        Returns:
+            tuple[list, float]: The `(status, headers, body)` of every
+            response, and the elapsed wall-clock time in seconds.
+        """
+
+        async def client(number):
+            responses = []
+            for i in range(requests_per_client):
+                path = paths[(number + i) % len(paths)]
+                responses.append(await self.get(path))
+                if think_time:
+                    await asyncio.sleep(think_time)
+            return responses
+
+        with kept_connections():
+            started = time.perf_counter()
+            results = await asyncio.gather(*(client(number) for number in range(clients)))
+            elapsed = time.perf_counter() - started
+        return [response for responses in results for response in responses], elapsed
+
+
+class WsgiHarness:
+    """
+    Run requests through the WSGI entry point (`recipify.wsgi`) the way a
+    synchronous worker process does: one request at a time, each response
+    written out to its client before the next request is taken.
+
+    It accepts the same simulated clients as `AsgiHarness`, so the two
+    entry points can be compared on the same workload.
+
+    Args:
+        write_delay (float): Seconds a simulated client takes to receive
+            each chunk of a response body; the worker is blocked meanwhile.
+    """
+
+    def __init__(self, write_delay=0):
+        from recipify.wsgi import application
+        self.application = application
+        self.write_delay = write_delay
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+    def get(self, path, query_string='', headers=()):
+        """
+        Send one GET request and return `(status, headers, body)`.
+
+        Args:
+            path (str): The request path.
+            query_string (str): The query string, without the `?`.
+            headers (Iterable[tuple[str, str]]): Extra request headers.
+        """
+
+        environ = {
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'SCRIPT_NAME': '',
+            'QUERY_STRING': query_string,
+            'SERVER_NAME': 'testserver',
+            'SERVER_PORT': '80',
+            'SERVER_PROTOCOL': 'HTTP/1.1',
+            'REMOTE_ADDR': '127.0.0.1',
+            'HTTP_HOST': 'testserver',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': BytesIO(),
+            'wsgi.errors': BytesIO(),
+            'wsgi.multithread': False,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in headers:
+            environ['HTTP_' + name.upper().replace('-', '_')] = value
+        start = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            start['status'] = int(status.split(' ', 1)[0])
+            start['headers'] = {name.lower(): value for name, value in response_headers}
+
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            response = self.application(environ, start_response)
+            chunks = []
+            try:
+                for chunk in response:
+                    chunks.append(chunk)
+                    if self.write_delay:
+                        time.sleep(self.write_delay)
+            finally:
+                response.close()
+        finally:
+            self.in_flight -= 1
+        return start['status'], start['headers'], b''.join(chunks)
+
+    def run_clients(self, paths, clients, requests_per_client=1):
+        """
+        Serve the requests of `clients` simulated users, in turn.
+
+        The users request the same paths in the same order as with
+        `AsgiHarness.run_clients()`; a synchronous worker takes their
+        requests one after another.
+
+        Returns:
+            tuple[list, float]: The `(status, headers, body)` of every
+            response, and the elapsed wall-clock time in seconds.
+        """
+
+        responses = []
+        with kept_connections():
+            started = time.perf_counter()
+            for i in range(requests_per_client):
+                for number in range(clients):
+                    responses.append(self.get(paths[(number + i) % len(paths)]))
+            elapsed = time.perf_counter() - started
+        return responses, elapsed
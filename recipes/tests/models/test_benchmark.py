@@ -0,0 +1,65 @@
+"""Tests of the URL benchmark helpers"""
+from django.test import TestCase
+from django.urls import reverse
+from recipes.benchmark import compare, named_urls, percentile, run_benchmark, seed_dataset
+from recipes.models import FoodTag, Recipe, User
+from recipes.view_counts import view_counter
+
+
+class BenchmarkTestCase(TestCase):
+
+    def setUp(self):
+        view_counter.reset()
+        self.addCleanup(view_counter.reset)
+
+    def test_percentile_uses_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([3.0], 95), 3.0)
+
+    def test_seed_dataset_is_deterministic(self):
+        user = seed_dataset(users=10, recipes=30, seed=3, batch_size=7)
+        self.assertEqual(User.objects.count(), 10)
+        self.assertEqual(Recipe.objects.count(), 30)
+        self.assertTrue(FoodTag.objects.exists())
+        self.assertIsInstance(user, User)
+        first = list(Recipe.objects.order_by('id').values_list('name', 'author__username', 'ingredients'))
+        Recipe.objects.all().delete()
+        seed_dataset(users=10, recipes=30, seed=3, batch_size=7)
+        self.assertEqual(list(Recipe.objects.order_by('id').values_list('name', 'author__username', 'ingredients')), first)
+
+    def test_named_urls_skip_urls_without_arguments(self):
+        names = dict(named_urls({'pk': 5}))
+        self.assertEqual(names['user_profile'], reverse('user_profile', kwargs={'pk': 5}))
+        self.assertNotIn('get_recipe', names)
+        self.assertNotIn('log_out', names)
+        self.assertTrue(names['search_recipes'].startswith(reverse('search_recipes') + '?q='))
+
+    def test_run_benchmark_measures_both_clients(self):
+        user = seed_dataset(users=5, recipes=10)
+        results = run_benchmark(user, requests=2, warmup=0)
+        anonymous = results['list_recipes (anonymous)']
+        self.assertEqual(anonymous['status'], 200)
+        self.assertGreater(anonymous['bytes'], 0)
+        self.assertGreaterEqual(anonymous['p99_ms'], anonymous['p50_ms'])
+        self.assertEqual(results['dashboard (anonymous)']['status'], 302)
+        self.assertEqual(results['dashboard (authenticated)']['status'], 200)
+        self.assertGreater(results['get_recipe (authenticated)']['queries'], 0)
+
+    def test_compare_flags_slowdowns_over_threshold(self):
+        baseline = {'home (anonymous)': {'p50_ms': 10.0, 'p95_ms': 20.0, 'p99_ms': 30.0, 'sql_ms': 1.0, 'queries': 2}}
+        current = {'home (anonymous)': {'p50_ms': 11.0, 'p95_ms': 30.0, 'p99_ms': 30.5, 'sql_ms': 1.1, 'queries': 3}}
+        regressions = compare(current, baseline, threshold=20)
+        self.assertEqual(
+            regressions,
+            [('home (anonymous)', 'p95_ms', 20.0, 30.0), ('home (anonymous)', 'queries', 2, 3)],
+        )
+
+    def test_compare_ignores_small_absolute_changes_and_new_urls(self):
+        baseline = {'home (anonymous)': {'p50_ms': 0.5, 'p95_ms': 0.5, 'p99_ms': 0.5, 'sql_ms': 0.1, 'queries': 2}}
+        current = {
+            'home (anonymous)': {'p50_ms': 1.0, 'p95_ms': 1.2, 'p99_ms': 1.4, 'sql_ms': 0.3, 'queries': 2},
+            'dashboard (authenticated)': {'p50_ms': 50.0, 'p95_ms': 50.0, 'p99_ms': 50.0, 'sql_ms': 5.0, 'queries': 9},
+        }
+        self.assertEqual(compare(current, baseline, threshold=20, min_delta_ms=1.0), [])
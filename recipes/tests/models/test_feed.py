@@ -0,0 +1,184 @@
+"""Tests of the materialized recipe feeds"""
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from recipes import feed
+from recipes.deletion import delete_users
+from recipes.models import AuthorFollow, FoodTag, Recipe, TimelineEntry, User
+from recipes.query_plans import Statement, audit
+from recipes.read_models import RecipeRow
+from recipes.tag_index import tag_index
+
+
+class FeedTestCase(TestCase):
+
+    fixtures = [
+        'recipes/tests/fixtures/default_user.json',
+        'recipes/tests/fixtures/other_users.json',
+        'recipes/tests/fixtures/valid_foodtag.json',
+    ]
+
+    def setUp(self):
+        cache.clear()
+        tag_index.reset()
+        self.reader = User.objects.get(pk=1)
+        self.author = User.objects.get(pk=2)
+        self.other = User.objects.get(pk=3)
+        self.tag = FoodTag.objects.get(pk=1)
+        self.factory = RequestFactory()
+
+    def _recipe(self, author, name, tags=()):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(
+                name=name, author=author, ingredients="Eggs", instructions="Cook",
+                difficulty_level="Easy", preparation_time_mins=10
+            )
+            recipe.tags.add(*tags)
+        return recipe
+
+    def _feed(self, user=None, **params):
+        return feed.feed_page(self.factory.get('/dashboard/', params), user or self.reader)
+
+    def _names(self, user=None, **params):
+        return [row.name for row in self._feed(user, **params)]
+
+    def test_new_recipes_are_fanned_out_to_author_followers(self):
+        feed.follow_author(self.reader, self.author)
+        self._recipe(self.author, "Omelette")
+        self._recipe(self.other, "Porridge")
+        self.assertEqual(self._names(), ["Omelette"])
+        self.assertEqual(TimelineEntry.objects.filter(user=self.reader).count(), 1)
+        self.assertFalse(TimelineEntry.objects.filter(user=self.author).exists())
+
+    def test_tagging_fans_out_to_tag_followers(self):
+        feed.follow_tag(self.reader, self.tag)
+        self._recipe(self.other, "Porridge", tags=[self.tag])
+        self._recipe(self.reader, "My own", tags=[self.tag])
+        recipe = self._recipe(self.author, "Omelette")
+        self.assertEqual(self._names(), ["Porridge"])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.recipe_set.add(recipe)
+        self.assertEqual(self._names(), ["Omelette", "Porridge"])
+
+    def test_following_backfills_and_unfollowing_removes(self):
+        self._recipe(self.author, "Omelette", tags=[self.tag])
+        self._recipe(self.author, "Pancakes")
+        self.assertTrue(feed.follow_author(self.reader, self.author))
+        self.assertFalse(feed.follow_author(self.reader, self.author))
+        self.assertEqual(self._names(), ["Pancakes", "Omelette"])
+        self.assertEqual(User.objects.get(pk=self.author.pk).follower_count, 1)
+        feed.follow_tag(self.reader, self.tag)
+        self.assertTrue(feed.unfollow_author(self.reader, self.author))
+        self.assertEqual(self._names(), ["Omelette"])
+        self.assertEqual(User.objects.get(pk=self.author.pk).follower_count, 0)
+        feed.unfollow_tag(self.reader, self.tag)
+        self.assertEqual(self._names(), [])
+        with self.assertRaises(ValueError):
+            feed.follow_author(self.reader, self.reader)
+
+    def test_feed_pages_are_read_with_one_indexed_query(self):
+        feed.follow_author(self.reader, self.author)
+        for i in range(5):
+            self._recipe(self.author, f"Recipe {i}")
+        with CaptureQueriesContext(connection) as queries:
+            first = self._feed(page_size=2)
+            self.assertTrue(all(isinstance(row, RecipeRow) for row in first))
+        self.assertEqual(len(queries), 1)
+        statement = Statement(queries[0]['sql'], ())
+        audit([statement])
+        self.assertFalse([finding for finding in statement.findings if finding[0] == 'scan'])
+        second = self._feed(page_size=2, after=first.next_cursor)
+        third = self._feed(page_size=2, after=second.next_cursor)
+        self.assertEqual(
+            [row.name for page in (first, second, third) for row in page],
+            [f"Recipe {i}" for i in range(4, -1, -1)],
+        )
+        self.assertFalse(third.has_next)
+        back = self._feed(page_size=2, before=second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertEqual(list(self._feed(page_size=2, before='')), list(first))
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_celebrity_recipes_are_pulled_when_read(self):
+        feed.follow_author(self.reader, self.author)
+        feed.follow_author(self.other, self.author)
+        feed.follow_tag(self.reader, self.tag)
+        self.assertTrue(feed.is_celebrity(self.author))
+        self._recipe(self.author, "Omelette")
+        both = self._recipe(self.author, "Tagged omelette", tags=[self.tag])
+        self.assertEqual(list(TimelineEntry.objects.values_list('user_id', 'recipe_id')), [(self.reader.pk, both.pk)])
+        with self.assertNumQueries(1):
+            self.assertEqual(self._names(), ["Tagged omelette", "Omelette"])
+        self.assertEqual(self._names(self.other), ["Tagged omelette", "Omelette"])
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_pulled_recipes_are_read_per_author_from_the_composite_index(self):
+        feed.follow_author(self.reader, self.author)
+        feed.follow_author(self.other, self.author)
+        for i in range(3):
+            self._recipe(self.author, f"Recipe {i}")
+        first = self._feed(page_size=1)
+        with CaptureQueriesContext(connection) as queries:
+            second = self._feed(page_size=1, after=first.next_cursor)
+        self.assertEqual([row.name for row in second], ["Recipe 1"])
+        statement = Statement(queries[0]['sql'], ())
+        audit([statement])
+        plan = '\n'.join(statement.plan)
+        self.assertIn('USING COVERING INDEX recipe_author_created_idx (author_id=? AND date_created<?)', plan)
+        self.assertIn('USING COVERING INDEX timeline_user_created_idx', plan)
+        # Pulled recipes are looked up by id, not by scanning the author's recipes
+        self.assertIn('SEARCH recipes_recipe USING INDEX recipes_recipe_author_id_7274f74b (author_id=? AND rowid=?)', plan)
+        self.assertFalse([finding for finding in statement.findings if finding[0] == 'scan'])
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_author_falling_under_the_limit_is_fanned_out_again(self):
+        feed.follow_author(self.reader, self.author)
+        feed.follow_author(self.other, self.author)
+        self._recipe(self.author, "Omelette")
+        self.assertFalse(TimelineEntry.objects.exists())
+        feed.unfollow_author(self.other, self.author)
+        self.assertFalse(feed.is_celebrity(self.author))
+        self.assertEqual(self._names(), ["Omelette"])
+        feed.follow_author(self.other, self.author)
+        self._recipe(self.author, "Pancakes")
+        self.other.delete()
+        self.assertEqual(self._names(), ["Pancakes", "Omelette"])
+
+    def test_deleting_users_drops_their_follows_and_entries(self):
+        feed.follow_author(self.reader, self.author)
+        feed.follow_author(self.other, self.author)
+        feed.follow_author(self.author, self.reader)
+        self._recipe(self.author, "Omelette")
+        self._recipe(self.reader, "Porridge")
+        with self.captureOnCommitCallbacks(execute=True):
+            list(delete_users(User.objects.filter(pk__in=[self.other.pk, self.reader.pk])))
+        self.assertEqual(User.objects.get(pk=self.author.pk).follower_count, 0)
+        self.assertFalse(AuthorFollow.objects.exists())
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_deleting_a_user_lowers_the_follower_counts(self):
+        feed.follow_author(self.reader, self.author)
+        feed.follow_author(self.other, self.author)
+        self.reader.delete()
+        self.assertEqual(User.objects.get(pk=self.author.pk).follower_count, 1)
+        self.assertEqual(AuthorFollow.objects.count(), 1)
+
+    def test_repair_command_recomputes_follower_counts(self):
+        feed.follow_author(self.reader, self.author)
+        # Writes that bypass `follow_author`
+        AuthorFollow.objects.create(follower=self.other, author=self.author)
+        User.objects.filter(pk=self.reader.pk).update(follower_count=5)
+        with self.assertRaisesMessage(CommandError, '2 of 4 users have a stale follower count'):
+            call_command('repair_recipe_summaries', check=True, stdout=StringIO())
+        stdout = StringIO()
+        call_command('repair_recipe_summaries', batch_size=1, stdout=stdout)
+        self.assertIn('2 of 4 users updated', stdout.getvalue())
+        self.assertEqual(
+            dict(User.objects.values_list('pk', 'follower_count')),
+            {self.reader.pk: 0, self.author.pk: 2, self.other.pk: 0, 4: 0},
+        )
+        call_command('repair_recipe_summaries', check=True, stdout=StringIO())
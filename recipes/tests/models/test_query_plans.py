@@ -0,0 +1,78 @@
+"""Tests of the query plan auditor"""
+from django.core.cache import cache
+from django.test import Client, TestCase
+from recipes.benchmark import seed_dataset
+from recipes.models import Recipe, User
+from recipes.query_plans import Statement, audit, capture_statements, default_clients, propose_index, variant_urls
+from recipes.view_counts import view_counter
+
+
+def _statement(queryset):
+    sql, params = queryset.query.sql_with_params()
+    return Statement(sql, params)
+
+
+class QueryPlanTestCase(TestCase):
+
+    fixtures = ['recipes/tests/fixtures/default_user.json']
+
+    def setUp(self):
+        view_counter.reset()
+        self.addCleanup(view_counter.reset)
+
+    def test_scan_on_filtered_column_is_flagged_with_index(self):
+        statement = _statement(Recipe.objects.filter(difficulty_level='Easy').order_by('preparation_time_mins'))
+        self.assertEqual(audit([statement]), [statement])
+        kind, table, proposal = statement.findings[0]
+        self.assertEqual((kind, table), ('scan', 'recipes_recipe'))
+        self.assertIn("Recipe: models.Index(fields=['difficulty_level', 'preparation_time_mins']", proposal)
+
+    def test_range_filter_follows_equalities(self):
+        sql, _ = Recipe.objects.filter(
+            difficulty_level='Easy', preparation_time_mins__lt=30
+        ).query.sql_with_params()
+        proposal = propose_index(sql, 'recipes_recipe')
+        self.assertIn("fields=['difficulty_level', 'preparation_time_mins']", proposal)
+
+    def test_descending_sort_is_kept(self):
+        sql, _ = Recipe.objects.filter(author_id=1).order_by('-date_modified').query.sql_with_params()
+        self.assertIn("fields=['author', '-date_modified']", propose_index(sql, 'recipes_recipe'))
+
+    def test_no_proposal_for_primary_key_lookups(self):
+        sql, _ = Recipe.objects.filter(pk__in=[1, 2]).order_by('name').query.sql_with_params()
+        self.assertIsNone(propose_index(sql, 'recipes_recipe'))
+
+    def test_no_proposal_when_an_index_exists(self):
+        sql, _ = User.objects.order_by(*User.DIRECTORY_ORDERING).query.sql_with_params()
+        self.assertIsNone(propose_index(sql, 'recipes_user', sort_only=True))
+
+    def test_excluded_columns_are_not_treated_as_filters(self):
+        sql, _ = User.objects.exclude(pk=1).filter(email_hash='').query.sql_with_params()
+        proposal = propose_index(sql, 'recipes_user')
+        self.assertIn("fields=['email_hash', 'last_name', 'first_name']", proposal)
+        self.assertNotIn("'id'", proposal)
+
+    def test_latest_modification_uses_an_index(self):
+        statement = Statement('SELECT MAX("recipes_recipe"."date_modified") AS "newest" FROM "recipes_recipe"', ())
+        audit([statement])
+        self.assertEqual(statement.findings, [])
+        self.assertIn('COVERING INDEX recipe_date_modified_idx', statement.plan[0])
+
+    def test_capture_statements_records_origins(self):
+        user = seed_dataset(users=5, recipes=30)
+        urls = [('list_recipes', '/recipes/'), ('user_list', '/users/')] + variant_urls()
+        # Cold caches push the list page over its query budget
+        with self.assertLogs('recipes.query_budget', 'WARNING'):
+            statements = capture_statements(default_clients(user), urls)
+        origins = set().union(*(statement.origins for statement in statements))
+        self.assertIn('list_recipes (anonymous)', origins)
+        self.assertIn('user_list (authenticated)', origins)
+        self.assertTrue(all(statement.count >= 1 for statement in statements))
+        flagged = audit(statements)
+        self.assertFalse([s for s in flagged for kind, _, _ in s.findings if kind == 'scan'])
+
+    def test_capture_statements_leaves_the_site_caches_alone(self):
+        cache.set('query-plans-test', 'kept')
+        self.addCleanup(cache.delete, 'query-plans-test')
+        capture_statements({'anonymous': Client()}, [('user_list', '/users/')])
+        self.assertEqual(cache.get('query-plans-test'), 'kept')
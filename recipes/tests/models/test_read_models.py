@@ -0,0 +1,68 @@
+"""Tests of the slotted read models used by the list pages"""
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from recipes.benchmark import row_memory, seed_dataset
+from recipes.models import Recipe, User
+from recipes.read_models import RecipeRow, UserRow
+
+
+class ReadModelTestCase(TestCase):
+
+    fixtures = [
+        'recipes/tests/fixtures/default_user.json',
+        'recipes/tests/fixtures/other_users.json',
+        'recipes/tests/fixtures/valid_recipe.json',
+    ]
+
+    def test_rows_hold_only_projected_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            [row] = RecipeRow.fetch(Recipe.objects.filter(pk=1))
+        self.assertNotIn('ingredients', queries[0]['sql'])
+        self.assertEqual((row.pk, row.name, row.author_name), (1, 'Lasagna', '@johndoe'))
+        self.assertFalse(hasattr(row, '__dict__'))
+
+    def test_rows_equal_and_hash_like_their_model_instances(self):
+        [row] = RecipeRow.fetch(Recipe.objects.filter(pk=1))
+        recipe = Recipe.objects.get(pk=1)
+        self.assertEqual(row, recipe)
+        self.assertEqual(hash(row), hash(recipe))
+        self.assertEqual(len({row, recipe}), 1)
+        self.assertIn(recipe, {row})
+        self.assertNotEqual(row, UserRow.fetch(User.objects.filter(pk=1))[0])
+
+    def test_deferred_columns_load_on_first_access(self):
+        [row] = RecipeRow.fetch(Recipe.objects.filter(pk=1))
+        with self.assertNumQueries(1):
+            self.assertEqual(row.ingredients, 'Ingredients')
+            self.assertEqual(row.ingredients, 'Ingredients')
+        with self.assertRaises(AttributeError):
+            row.author
+
+    def test_user_list_renders_rows_without_private_columns(self):
+        self.client.login(username='@johndoe', password='Password123')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('user_list'))
+        users = response.context['users']
+        self.assertTrue(users)
+        self.assertTrue(all(isinstance(user, UserRow) for user in users))
+        self.assertContains(response, users[0].full_name())
+        listing = [query['sql'] for query in queries if 'ORDER BY' in query['sql']]
+        self.assertTrue(listing)
+        self.assertNotIn('password', listing[-1])
+
+    def test_recipe_list_pages_through_rows(self):
+        seed_dataset(users=3, recipes=25)
+        first = self.client.get(reverse('list_recipes'), {'page_size': 10})
+        self.assertTrue(all(isinstance(recipe, RecipeRow) for recipe in first.context['recipes']))
+        second = self.client.get(f"{reverse('list_recipes')}?{first.context['page'].next_query}")
+        self.assertFalse(set(first.context['recipes']) & set(second.context['recipes']))
+        self.assertEqual(len(second.context['recipes']), 10)
+
+    def test_rows_use_less_memory_than_model_instances(self):
+        seed_dataset(users=20, recipes=50)
+        for queryset, row_class in ((Recipe.objects.all(), RecipeRow), (User.objects.all(), UserRow)):
+            memory = row_memory(queryset, row_class)
+            self.assertLess(memory['row_bytes'], memory['model_bytes'])
+            self.assertGreater(memory['saved_percent'], 0)
@@ -3,7 +3,7 @@ from django.core.exceptions import ValidationError
 
 import datetime
 
-from recipes.models import Recipe
+from recipes.models import Recipe, RecipeIngredient
 
 class RecipeTestCase(TestCase):
     
@@ -85,6 +85,12 @@ class RecipeTestCase(TestCase):
         self.recipe.preparation_time_mins = 1441
         self._assert_recipe_is_invalid()
 
+    # Fixture loading tests
+    def test_fixtures_are_loaded_without_deriving_data(self):
+        self.assertFalse(RecipeIngredient.objects.exists())
+        self.recipe.save()
+        self.assertTrue(RecipeIngredient.objects.filter(recipe=self.recipe).exists())
+
     def _assert_recipe_is_valid(self):
         try:
             self.recipe.full_clean()
@@ -0,0 +1,168 @@
+"""Tests of the bulk recipe import"""
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from recipes import search
+from recipes.importer import RecipeImporter
+from recipes.models import FoodTag, ImportCheckpoint, Recipe, RecipeIngredient
+from recipes.tag_index import tag_index
+
+
+class RecipeImportTestCase(TestCase):
+
+    fixtures = [
+        'recipes/tests/fixtures/default_user.json',
+        'recipes/tests/fixtures/valid_foodtag.json',
+    ]
+
+    def setUp(self):
+        cache.clear()
+        tag_index.reset()
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.tag = FoodTag.objects.get(pk=1)
+
+    def _row(self, name, **overrides):
+        row = {
+            'name': name, 'author': '@johndoe', 'ingredients': '2 eggs, 100g flour',
+            'instructions': 'Mix and bake', 'difficulty_level': 'Easy',
+            'preparation_time_mins': 30, 'tags': [self.tag.tag_name],
+        }
+        row.update(overrides)
+        return row
+
+    def _write_jsonl(self, rows):
+        path = Path(self.directory.name) / 'recipes.jsonl'
+        path.write_text(''.join(json.dumps(row) + '\n' for row in rows))
+        return str(path)
+
+    def _import(self, path, **options):
+        stdout, stderr = StringIO(), StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_recipes', path, stdout=stdout, stderr=stderr, **options)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_import_jsonl_inserts_recipes_with_tags(self):
+        path = self._write_jsonl([self._row(f"Cake {i}") for i in range(5)])
+        stdout, _ = self._import(path, batch_size=2)
+        self.assertEqual(Recipe.objects.count(), 5)
+        self.assertEqual(Recipe.tags.through.objects.count(), 5)
+        self.assertIn('Imported 5 recipes', stdout)
+        self.assertIn('rows/s', stdout)
+
+    def test_import_csv(self):
+        path = Path(self.directory.name) / 'recipes.csv'
+        path.write_text(
+            'name,author,ingredients,instructions,difficulty_level,preparation_time_mins,tags\n'
+            f'Pancakes,@johndoe,2 eggs,Fry,Easy,15,{self.tag.tag_name}\n'
+            'Toast,@johndoe,bread,Toast it,Easy,5,\n'
+        )
+        self._import(str(path))
+        self.assertEqual(list(Recipe.objects.order_by('id').values_list('name', flat=True)), ['Pancakes', 'Toast'])
+        self.assertEqual(list(Recipe.objects.get(name='Pancakes').tags.all()), [self.tag])
+
+    def test_import_queries_per_batch_not_per_row(self):
+        importer = RecipeImporter()
+        with self.captureOnCommitCallbacks(execute=True):
+            importer.import_batch([self._row('Warm up')])
+        with self.assertNumQueries(14):
+            importer.import_batch([self._row(f"Cake {i}") for i in range(50)])
+
+    def test_import_updates_derived_data(self):
+        path = self._write_jsonl([self._row('Chocolate cake')])
+        self._import(path)
+        recipe = Recipe.objects.get()
+        self.assertEqual(search.search_recipe_ids('chocolate', 10), [recipe.pk])
+        self.assertTrue(RecipeIngredient.objects.filter(recipe=recipe, name='egg').exists())
+        self.assertEqual(tag_index.recipe_ids([self.tag.pk]), {recipe.pk})
+
+    def test_import_rejects_invalid_rows(self):
+        path = self._write_jsonl([
+            self._row('Good'),
+            self._row('Too long', preparation_time_mins=1441),
+            self._row('Too short', preparation_time_mins=0),
+            self._row('Not a number', preparation_time_mins='soon'),
+            self._row('Nobody', author='@nobody'),
+            self._row('Unknown tag', tags=['Spicy']),
+            self._row(''),
+        ])
+        _, stderr = self._import(path)
+        self.assertEqual(list(Recipe.objects.values_list('name', flat=True)), ['Good'])
+        self.assertIn('Row 2: preparation_time_mins must be between 1 and 1440', stderr)
+        self.assertIn('Row 5: Unknown author @nobody', stderr)
+        self.assertIn('Row 6: Unknown tags Spicy', stderr)
+        self.assertIn('Row 7: Missing name', stderr)
+
+    def test_import_rejects_rows_with_fields_of_the_wrong_type(self):
+        path = self._write_jsonl([
+            self._row('Good'),
+            self._row('Two authors', author=['@johndoe', '@janedoe']),
+            self._row('Tags as text', tags=self.tag.tag_name),
+            self._row('Numeric tag', tags=[1]),
+            self._row(['Not', 'a', 'name']),
+        ])
+        _, stderr = self._import(path, create_tags=True)
+        self.assertEqual(list(Recipe.objects.values_list('name', flat=True)), ['Good'])
+        self.assertEqual(FoodTag.objects.count(), 1)
+        self.assertIn('Row 2: author is not text', stderr)
+        self.assertIn('Row 3: tags is not a list of names', stderr)
+        self.assertIn('Row 4: tags is not a list of names', stderr)
+        self.assertIn('Row 5: name is not text', stderr)
+
+    def test_import_can_create_tags(self):
+        path = self._write_jsonl([self._row('Curry', tags=['Spicy'])])
+        self._import(path, create_tags=True)
+        self.assertEqual(list(Recipe.objects.get().tags.values_list('tag_name', flat=True)), ['Spicy'])
+
+    def test_import_resumes_from_checkpoint(self):
+        path = self._write_jsonl([self._row(f"Cake {i}") for i in range(5)])
+        original = RecipeImporter.import_batch
+        calls = []
+
+        def fail_on_second_batch(importer, rows):
+            calls.append(rows)
+            if len(calls) == 2:
+                raise RuntimeError('Database went away')
+            return original(importer, rows)
+
+        with mock.patch.object(RecipeImporter, 'import_batch', fail_on_second_batch):
+            with self.assertRaises(RuntimeError):
+                self._import(path, batch_size=2)
+        self.assertEqual(Recipe.objects.count(), 2)
+        self.assertEqual(ImportCheckpoint.objects.get(name=path).rows, 2)
+
+        stdout, _ = self._import(path, batch_size=2)
+        self.assertIn('Resuming after row 2', stdout)
+        self.assertEqual(sorted(Recipe.objects.values_list('name', flat=True)), [f"Cake {i}" for i in range(5)])
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_checkpoint_is_written_with_the_batch(self):
+        path = self._write_jsonl([self._row(f"Cake {i}") for i in range(4)])
+        original = ImportCheckpoint.objects.update_or_create
+        calls = []
+
+        def fail_on_second_checkpoint(**kwargs):
+            calls.append(kwargs)
+            if len(calls) == 2:
+                raise RuntimeError('Database went away')
+            return original(**kwargs)
+
+        with mock.patch.object(ImportCheckpoint.objects, 'update_or_create', fail_on_second_checkpoint):
+            with self.assertRaises(RuntimeError):
+                self._import(path, batch_size=2)
+        # The second batch was rolled back with its checkpoint
+        self.assertEqual(Recipe.objects.count(), 2)
+        self.assertEqual(ImportCheckpoint.objects.get(name=path).rows, 2)
+        self._import(path, batch_size=2)
+        self.assertEqual(Recipe.objects.count(), 4)
+
+    def test_import_rejects_json_lines_that_are_not_objects(self):
+        path = self._write_jsonl([self._row('Good'), [1, 2]])
+        with self.assertRaisesMessage(CommandError, 'Line 2: expected a JSON object'):
+            self._import(path)
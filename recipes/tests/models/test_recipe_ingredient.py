@@ -0,0 +1,111 @@
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from recipes.ingredients import normalize_ingredient, normalize_ingredients, rank_recipes_by_pantry, split_ingredients
+from recipes.models import Recipe, RecipeIngredient
+from recipes.query_plans import Statement, audit
+
+class RecipeIngredientTestCase(TestCase):
+
+    fixtures = [
+        'recipes/tests/fixtures/default_user.json',
+        'recipes/tests/fixtures/valid_recipe.json'
+    ]
+
+    def setUp(self):
+        self.recipe = Recipe.objects.get(pk=1)
+
+    # Normalization tests
+    def test_quantities_and_units_are_removed(self):
+        self.assertEqual(normalize_ingredient('200g plain flour'), 'flour')
+        self.assertEqual(normalize_ingredient('2 tbsp olive oil'), 'olive oil')
+        self.assertEqual(normalize_ingredient('½ cup milk'), 'milk')
+
+    def test_descriptors_and_notes_are_removed(self):
+        self.assertEqual(normalize_ingredient('3 large eggs (beaten)'), 'egg')
+        self.assertEqual(normalize_ingredient('1 onion, finely chopped'), 'onion')
+        self.assertEqual(normalize_ingredient('1 tin tomatoes, drained'), 'tomato')
+        self.assertEqual(normalize_ingredient('100g butter (softened, cubed)'), 'butter')
+
+    def test_commas_before_notes_do_not_separate_ingredients(self):
+        self.assertEqual(
+            normalize_ingredients('400g tomatoes, drained and chopped\n1 onion, sliced; salt, to taste'),
+            ['tomato', 'onion', 'salt'],
+        )
+
+    def test_commas_separate_ingredients_on_one_line(self):
+        self.assertEqual(normalize_ingredients('eggs, flour, milk'), ['egg', 'flour', 'milk'])
+        self.assertEqual(
+            split_ingredients('1 onion, finely chopped, 2 carrots, peeled, butter (softened, cubed)'),
+            ['1 onion', '2 carrots', 'butter'],
+        )
+
+    def test_plurals_are_singularized(self):
+        self.assertEqual(normalize_ingredient('Tomatoes'), 'tomato')
+        self.assertEqual(normalize_ingredient('berries'), 'berry')
+        self.assertEqual(normalize_ingredient('peaches'), 'peach')
+        self.assertEqual(normalize_ingredient('asparagus'), 'asparagus')
+
+    def test_blank_lines_are_ignored(self):
+        self.assertIsNone(normalize_ingredient('2 tbsp'))
+        self.assertEqual(normalize_ingredients('eggs\n\nflour;  milk; eggs'), ['egg', 'flour', 'milk'])
+
+    # Index maintenance tests
+    def _names(self):
+        return set(self.recipe.ingredient_entries.values_list('name', flat=True))
+
+    def test_rows_are_created_on_save(self):
+        self.recipe.ingredients = '2 eggs\n100g flour\n300ml milk'
+        self.recipe.save()
+        self.assertEqual(self._names(), {'egg', 'flour', 'milk'})
+        self.assertEqual(set(self.recipe.ingredient_entries.values_list('ingredient_count', flat=True)), {3})
+
+    def test_rows_are_replaced_on_update(self):
+        self.recipe.ingredients = 'eggs\nflour'
+        self.recipe.save()
+        self.recipe.ingredients = 'rice'
+        self.recipe.save()
+        self.assertEqual(self._names(), {'rice'})
+
+    def test_rows_are_kept_when_ingredients_are_not_saved(self):
+        self.recipe.ingredients = 'eggs\nflour'
+        self.recipe.save()
+        self.recipe.name = 'Renamed'
+        self.recipe.save(update_fields=['name'])
+        self.assertEqual(self._names(), {'egg', 'flour'})
+
+    def test_rows_are_deleted_with_recipe(self):
+        self.recipe.save()
+        self.recipe.delete()
+        self.assertFalse(RecipeIngredient.objects.exists())
+
+    def test_backfill_command(self):
+        Recipe.objects.filter(pk=1).update(ingredients='eggs\nsugar')
+        RecipeIngredient.objects.all().delete()
+        call_command('backfill_ingredients', batch_size=1, stdout=StringIO())
+        self.assertEqual(self._names(), {'egg', 'sugar'})
+
+    # Ranking tests
+    def test_pantry_matches_a_comma_separated_recipe(self):
+        self.recipe.ingredients = 'eggs, flour, milk'
+        self.recipe.save()
+        ranked = rank_recipes_by_pantry(split_ingredients('eggs, flour'), 10)
+        self.assertEqual(ranked, [{'recipe_id': self.recipe.pk, 'matched': 2, 'total': 3}])
+
+    def test_ranking_reads_only_the_pantry_rows_from_the_index(self):
+        self.recipe.ingredients = '2 eggs\n100g flour\n300ml milk'
+        self.recipe.save()
+        with CaptureQueriesContext(connection) as queries:
+            ranked = rank_recipes_by_pantry(['eggs', 'flour', 'butter'], 10)
+        self.assertEqual(ranked, [{'recipe_id': self.recipe.pk, 'matched': 2, 'total': 3}])
+        self.assertEqual(len(queries), 1)
+        statement = Statement(queries[0]['sql'], ())
+        audit([statement])
+        self.assertEqual(statement.plan, [
+            'SEARCH recipes_recipeingredient USING COVERING INDEX ingredient_name_recipe_idx (name=?)',
+            'USE TEMP B-TREE FOR GROUP BY',
+            'USE TEMP B-TREE FOR ORDER BY',
+        ])
@@ -0,0 +1,94 @@
+"""Tests of the denormalized recipe summary columns and their repair command"""
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from recipes.forms.user_forms import UserForm
+from recipes.importer import RecipeImporter
+from recipes.models import FoodTag, Recipe, User
+from recipes.tag_index import tag_index
+
+
+class RecipeSummaryTestCase(TestCase):
+
+    fixtures = [
+        'recipes/tests/fixtures/default_user.json',
+        'recipes/tests/fixtures/valid_foodtag.json',
+    ]
+
+    def setUp(self):
+        cache.clear()
+        tag_index.reset()
+        self.user = User.objects.get(username='@johndoe')
+        self.halal = FoodTag.objects.get(pk=1)
+        self.vegan = FoodTag.objects.create(tag_name='Vegan')
+        self.recipe = Recipe.objects.create(
+            name="Lentil soup", author=self.user, ingredients="Lentils, onion",
+            instructions="Simmer", difficulty_level="Easy", preparation_time_mins=40
+        )
+
+    def _stored(self):
+        self.recipe.refresh_from_db()
+        return self.recipe.author_name, self.recipe.tag_name_list()
+
+    def test_author_name_is_stored_on_save(self):
+        self.assertEqual(self._stored(), ('@johndoe', []))
+
+    def test_tag_changes_update_tag_names(self):
+        self.recipe.tags.add(self.vegan, self.halal)
+        self.assertEqual(self._stored()[1], ['Halal', 'Vegan'])
+        self.recipe.tags.remove(self.halal)
+        self.assertEqual(self._stored()[1], ['Vegan'])
+        self.halal.recipe_set.add(self.recipe)
+        self.assertEqual(self._stored()[1], ['Halal', 'Vegan'])
+        self.recipe.tags.clear()
+        self.assertEqual(self._stored()[1], [])
+
+    def test_tag_rename_and_deletion_update_tag_names(self):
+        self.recipe.tags.add(self.vegan, self.halal)
+        self.vegan.tag_name = 'Plant-based'
+        self.vegan.save()
+        self.assertEqual(self._stored()[1], ['Halal', 'Plant-based'])
+        self.halal.delete()
+        self.assertEqual(self._stored()[1], ['Plant-based'])
+
+    def test_username_change_updates_author_name(self):
+        form = UserForm(instance=self.user, data={
+            'first_name': 'John', 'last_name': 'Doe', 'username': '@johnny', 'email': 'johndoe@example.org',
+        })
+        self.assertTrue(form.is_valid())
+        form.save()
+        self.assertEqual(self._stored()[0], '@johnny')
+
+    def test_recipe_list_renders_without_joins(self):
+        self.recipe.tags.add(self.vegan)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('list_recipes'))
+        self.assertContains(response, '@johndoe')
+        self.assertFalse([query for query in queries if 'JOIN' in query['sql']])
+
+    def test_imported_recipes_have_summaries(self):
+        importer = RecipeImporter()
+        importer.import_batch([{
+            'name': 'Falafel', 'author': '@johndoe', 'ingredients': 'Chickpeas', 'instructions': 'Fry',
+            'difficulty_level': 'Medium', 'preparation_time_mins': 30, 'tags': ['Vegan', 'Halal'],
+        }])
+        recipe = Recipe.objects.get(name='Falafel')
+        self.assertEqual((recipe.author_name, recipe.tag_name_list()), ('@johndoe', ['Halal', 'Vegan']))
+
+    def test_repair_command_fixes_drift(self):
+        self.recipe.tags.add(self.vegan)
+        # Writes that bypass the signal handlers
+        User.objects.filter(pk=self.user.pk).update(username='@renamed')
+        FoodTag.objects.filter(pk=self.vegan.pk).update(tag_name='Plant-based')
+        with self.assertRaisesMessage(CommandError, '1 of 1 recipes have stale summaries'):
+            call_command('repair_recipe_summaries', check=True, stdout=StringIO())
+        stdout = StringIO()
+        call_command('repair_recipe_summaries', batch_size=1, stdout=stdout)
+        self.assertIn('1 of 1 recipes updated', stdout.getvalue())
+        self.assertEqual(self._stored(), ('@renamed', ['Plant-based']))
+        call_command('repair_recipe_summaries', check=True, stdout=StringIO())
@@ -0,0 +1,123 @@
+"""Tests of the write-coalescing session engine"""
+from datetime import timedelta
+from io import StringIO
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from recipes.checks import check_shared_cache
+from recipes.sessions import SessionStore, expiry_queue
+
+
+class SessionStoreTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        expiry_queue.flush()
+        self.addCleanup(expiry_queue.flush)
+        self.session = SessionStore()
+        self.session['cart'] = ['lasagna']
+        self.session.save()
+        self.key = self.session.session_key
+
+    def test_session_is_written_to_cache_and_database(self):
+        self.assertTrue(Session.objects.filter(session_key=self.key).exists())
+        with self.assertNumQueries(0):
+            self.assertEqual(SessionStore(self.key)['cart'], ['lasagna'])
+
+    def test_session_is_loaded_from_database_on_cache_miss(self):
+        cache.clear()
+        self.assertEqual(SessionStore(self.key)['cart'], ['lasagna'])
+
+    def test_changed_data_is_written_through(self):
+        session = SessionStore(self.key)
+        session['cart'] = ['lasagna', 'pancakes']
+        session.save()
+        cache.clear()
+        self.assertEqual(SessionStore(self.key)['cart'], ['lasagna', 'pancakes'])
+
+    @override_settings(SESSION_EXPIRY_FLUSH_INTERVAL=3600)
+    def test_unchanged_session_only_queues_expiry(self):
+        expiry_queue.flush()
+        session = SessionStore(self.key)
+        session['cart'] = ['lasagna']
+        with self.assertNumQueries(0):
+            session.save()
+        self.assertEqual(len(expiry_queue), 1)
+
+    @override_settings(SESSION_EXPIRY_FLUSH_INTERVAL=3600, SESSION_EXPIRY_FLUSH_BATCH=3)
+    def test_expiry_refreshes_are_flushed_in_batches(self):
+        expiry_queue.flush()
+        sessions = [SessionStore() for _ in range(2)]
+        for session in sessions:
+            session.create()
+        Session.objects.update(expire_date=timezone.now())
+        with self.assertNumQueries(0):
+            for session in sessions:
+                SessionStore(session.session_key).save()
+        with self.assertNumQueries(1):
+            SessionStore(self.key).save()
+        self.assertEqual(len(expiry_queue), 0)
+        self.assertFalse(Session.objects.filter(expire_date__lt=timezone.now() + timedelta(days=1)).exists())
+
+    def test_deleted_session_is_gone(self):
+        self.session.delete()
+        self.assertFalse(Session.objects.filter(session_key=self.key).exists())
+        self.assertNotIn('cart', SessionStore(self.key))
+
+    def test_sweep_sessions_deletes_expired_in_batches(self):
+        for _ in range(5):
+            SessionStore().create()
+        Session.objects.exclude(session_key=self.key).update(expire_date=timezone.now() - timedelta(days=1))
+        self.assertEqual(list(SessionStore.iter_clear_expired(batch_size=2)), [2, 4, 5])
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), [self.key])
+
+    @override_settings(SESSION_EXPIRY_FLUSH_INTERVAL=60)
+    def test_sweep_keeps_sessions_whose_refresh_may_be_queued(self):
+        recent, old = SessionStore(), SessionStore()
+        recent.create()
+        old.create()
+        Session.objects.filter(session_key=recent.session_key).update(expire_date=timezone.now() - timedelta(seconds=30))
+        Session.objects.filter(session_key=old.session_key).update(expire_date=timezone.now() - timedelta(seconds=90))
+        self.assertEqual(list(SessionStore.iter_clear_expired()), [1])
+        self.assertTrue(Session.objects.filter(session_key=recent.session_key).exists())
+        self.assertFalse(Session.objects.filter(session_key=old.session_key).exists())
+
+    def test_sweep_sessions_command(self):
+        SessionStore().create()
+        Session.objects.exclude(session_key=self.key).update(expire_date=timezone.now() - timedelta(days=1))
+        stdout = StringIO()
+        call_command('sweep_sessions', batch_size=1, stdout=stdout)
+        self.assertIn('1 expired sessions deleted', stdout.getvalue())
+        self.assertEqual(Session.objects.count(), 1)
+
+    def test_per_process_cache_is_refused_when_required(self):
+        with override_settings(REQUIRE_SHARED_CACHE=True):
+            self.assertEqual([error.id for error in check_shared_cache(None)], ['recipes.E001'])
+        with override_settings(REQUIRE_SHARED_CACHE=False):
+            self.assertEqual(check_shared_cache(None), [])
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://'}}
+        with override_settings(REQUIRE_SHARED_CACHE=True, CACHES=shared):
+            self.assertEqual(check_shared_cache(None), [])
+
+
+class ExpiryTimerTestCase(TransactionTestCase):
+
+    def setUp(self):
+        cache.clear()
+        expiry_queue.flush()
+        self.addCleanup(expiry_queue.flush)
+
+    @override_settings(SESSION_EXPIRY_FLUSH_INTERVAL=0.05)
+    def test_queued_expiry_is_written_without_further_requests(self):
+        session = SessionStore()
+        session['cart'] = ['lasagna']
+        session.create()
+        Session.objects.update(expire_date=timezone.now())
+        SessionStore(session.session_key).save()
+        timer = expiry_queue._timer
+        self.assertIsNotNone(timer)
+        timer.join(5)
+        self.assertEqual(len(expiry_queue), 0)
+        self.assertTrue(Session.objects.filter(expire_date__gt=timezone.now() + timedelta(days=1)).exists())
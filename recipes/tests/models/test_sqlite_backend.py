@@ -0,0 +1,148 @@
+"""Tests of the tuned SQLite backend"""
+import os
+import shutil
+import tempfile
+import threading
+import time
+from django.db import connections
+from django.db.utils import load_backend
+from django.test import SimpleTestCase
+
+
+class SQLiteBackendTestCase(SimpleTestCase):
+    """Run against a file database of its own, since WAL needs a real file."""
+
+    # Lifts the ban on connecting, which applies to the backend class
+    databases = {'default'}
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.options = {}
+        with self.connect() as connection, connection.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY, value TEXT)')
+            cursor.executemany('INSERT INTO item (value) VALUES (%s)', [(f'item {i}',) for i in range(200)])
+
+    def connect(self):
+        """Return a new connection to the test database, with `self.options`."""
+        settings = {'ENGINE': 'recipify.sqlite', 'NAME': os.path.join(self.directory, 'test.sqlite3'), 'OPTIONS': self.options}
+        settings = connections.configure_settings({'default': settings})['default']
+        return _Closing(load_backend(settings['ENGINE']).DatabaseWrapper(settings))
+
+    def pragma(self, name):
+        with self.connect() as connection, connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def run_threads(self, target, count):
+        """Run `target(connection)` in `count` threads, each with its own connection."""
+        errors = []
+
+        def run():
+            try:
+                with self.connect() as connection:
+                    target(connection)
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=run) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads, errors
+
+    def test_pragmas_are_set_on_each_connection(self):
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('cache_size'), -64000)
+
+    def test_pragmas_can_be_overridden(self):
+        self.options = {'pragmas': {'busy_timeout': 250}}
+        self.assertEqual(self.pragma('busy_timeout'), 250)
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+
+    def test_transactions_begin_immediate(self):
+        with self.connect() as connection:
+            connection.ensure_connection()
+            self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+    def test_concurrent_writers_retry_instead_of_failing(self):
+        # Without busy_timeout every wait for the lock goes through the retries
+        self.options = {'pragmas': {'busy_timeout': 0}, 'lock_retries': 50, 'lock_retry_delay': 0.001}
+
+        def write(connection):
+            for i in range(20):
+                with _transaction(connection), connection.cursor() as cursor:
+                    cursor.execute('SELECT COUNT(*) FROM item')
+                    cursor.execute('INSERT INTO item (value) VALUES (%s)', [f'write {i}'])
+
+        threads, errors = self.run_threads(write, 4)
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        with self.connect() as connection, connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM item')
+            self.assertEqual(cursor.fetchone()[0], 200 + 4 * 20)
+
+    def test_read_throughput_stays_flat_during_writes(self):
+        def reads_per_second(connection, duration=0.3):
+            count = 0
+            deadline = time.perf_counter() + duration
+            with connection.cursor() as cursor:
+                while time.perf_counter() < deadline:
+                    cursor.execute('SELECT COUNT(*), MAX(value) FROM item')
+                    cursor.fetchone()
+                    count += 1
+            return count / duration
+
+        stop = threading.Event()
+
+        def write(connection):
+            while not stop.is_set():
+                with _transaction(connection), connection.cursor() as cursor:
+                    cursor.execute('INSERT INTO item (value) VALUES (%s)', ['write'])
+                    # Hold the write lock for a while
+                    time.sleep(0.005)
+
+        with self.connect() as reader:
+            idle = reads_per_second(reader)
+            threads, errors = self.run_threads(write, 2)
+            try:
+                busy = reads_per_second(reader)
+            finally:
+                stop.set()
+                for thread in threads:
+                    thread.join()
+        self.assertEqual(errors, [])
+        # Readers are never blocked by the writers' locks in WAL mode
+        self.assertGreater(busy, idle * 0.5)
+
+
+class _Closing:
+    """Close a connection at the end of a `with` block."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        return self.connection
+
+    def __exit__(self, *exc_info):
+        self.connection.close()
+
+
+class _transaction:
+    """Run a block in a transaction, started the way `transaction.atomic()` does."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.set_autocommit(False, force_begin_transaction_with_broken_autocommit=True)
+
+    def __exit__(self, exc_type, *exc_info):
+        if exc_type is None:
+            self.connection.commit()
+        else:
+            self.connection.rollback()
+        self.connection.set_autocommit(True)
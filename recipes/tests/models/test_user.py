@@ -1,5 +1,8 @@
 """Unit tests for the User model."""
+import hashlib
+from io import StringIO
 from django.core.exceptions import ValidationError
+from django.core.management import call_command
 from django.test import TestCase
 from recipes.models import User
 
@@ -143,6 +146,32 @@ class UserModelTestCase(TestCase):
         expected_gravatar_url = self._gravatar_url(size=60)
         self.assertEqual(actual_gravatar_url, expected_gravatar_url)
 
+    def test_save_stores_email_hash(self):
+        self.user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email_hash, UserModelTestCase.GRAVATAR_URL.rsplit('/', 1)[1])
+
+    def test_changing_email_updates_email_hash(self):
+        self.user.email = ' Jane.Smith@Example.org '
+        self.user.save(update_fields=['email'])
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.email_hash, self._hash('jane.smith@example.org'))
+
+    def test_gravatar_uses_stored_email_hash(self):
+        self.user.save()
+        User.objects.filter(pk=self.user.pk).update(email='someone.else@example.org')
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.gravatar(), self._gravatar_url(size=120))
+
+    def test_backfill_email_hashes(self):
+        User.objects.update(email_hash='')
+        call_command('backfill_email_hashes', batch_size=1, stdout=StringIO())
+        for user in User.objects.all():
+            self.assertEqual(user.email_hash, self._hash(user.email))
+
+    def _hash(self, email):
+        return hashlib.md5(email.strip().lower().encode()).hexdigest()
+
     def _gravatar_url(self, size):
         gravatar_url = f"{UserModelTestCase.GRAVATAR_URL}?size={size}&default=mp"
         return gravatar_url
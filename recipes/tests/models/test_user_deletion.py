@@ -0,0 +1,62 @@
+"""Tests of the chunked user deletion and the unseed command"""
+from io import StringIO
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from recipes import search
+from recipes.deletion import delete_users
+from recipes.models import FoodTag, Recipe, RecipeIngredient, User
+from recipes.tag_index import tag_index
+
+
+class UserDeletionTestCase(TestCase):
+
+    fixtures = [
+        'recipes/tests/fixtures/default_user.json',
+        'recipes/tests/fixtures/other_users.json',
+        'recipes/tests/fixtures/valid_foodtag.json',
+    ]
+
+    def setUp(self):
+        cache.clear()
+        tag_index.reset()
+        self.tag = FoodTag.objects.get(pk=1)
+        self.staff = User.objects.get(username='@johndoe')
+        self.staff.is_staff = True
+        self.staff.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            for user in User.objects.all():
+                recipe = Recipe.objects.create(
+                    name=f"Stew by {user.username}", author=user, ingredients="Beef, carrots",
+                    instructions="Simmer", difficulty_level="Easy", preparation_time_mins=90
+                )
+                recipe.tags.add(self.tag)
+        self.staff_recipe = Recipe.objects.get(author=self.staff)
+
+    def test_delete_users_in_chunks(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            progress = list(delete_users(User.objects.filter(is_staff=False), chunk_size=1))
+        self.assertFalse(User.objects.filter(is_staff=False).exists())
+        self.assertEqual(progress, [(n, n) for n in range(1, len(progress) + 1)])
+
+    def test_delete_users_removes_dependent_rows(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            list(delete_users(User.objects.filter(is_staff=False)))
+        self.assertEqual(list(Recipe.objects.all()), [self.staff_recipe])
+        self.assertEqual(set(RecipeIngredient.objects.values_list('recipe_id', flat=True)), {self.staff_recipe.pk})
+        self.assertEqual(set(Recipe.tags.through.objects.values_list('recipe_id', flat=True)), {self.staff_recipe.pk})
+        self.assertEqual(search.search_recipe_ids('stew', 10), [self.staff_recipe.pk])
+        self.assertEqual(tag_index.recipe_ids([self.tag.pk]), {self.staff_recipe.pk})
+
+    def test_delete_users_does_not_load_recipes(self):
+        users = User.objects.filter(is_staff=False)
+        with self.assertNumQueries(22):
+            with self.captureOnCommitCallbacks(execute=False):
+                list(delete_users(users, chunk_size=100))
+
+    def test_unseed_keeps_staff(self):
+        stdout = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('unseed', chunk_size=2, stdout=stdout)
+        self.assertEqual(list(User.objects.all()), [self.staff])
+        self.assertIn('Unseeding complete', stdout.getvalue())
@@ -0,0 +1,46 @@
+"""Tests of the seed command"""
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase
+from recipes.management.commands.seed import Command, create_username
+from recipes.models import User
+
+
+class UserSeedTestCase(TestCase):
+
+    def _seed(self, **options):
+        stdout = StringIO()
+        call_command('seed', stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def test_seed_creates_requested_number_of_users(self):
+        stdout = self._seed(users=50, batch_size=7)
+        self.assertEqual(User.objects.count(), 50)
+        self.assertTrue(User.objects.filter(username='@johndoe').exists())
+        self.assertIn('users/s', stdout)
+
+    def test_seeded_users_share_the_default_password(self):
+        self._seed(users=10)
+        hashes = set(User.objects.values_list('password', flat=True))
+        self.assertEqual(len(hashes), 1)
+        self.assertTrue(User.objects.get(username='@janedoe').check_password(Command.DEFAULT_PASSWORD))
+
+    def test_seed_is_deterministic(self):
+        self._seed(users=30, seed=7)
+        first = list(User.objects.order_by('id').values_list('username', 'email'))
+        User.objects.all().delete()
+        self._seed(users=30, seed=7)
+        self.assertEqual(list(User.objects.order_by('id').values_list('username', 'email')), first)
+
+    def test_seed_tops_up_existing_users(self):
+        self._seed(users=20)
+        self._seed(users=20)
+        self.assertEqual(User.objects.count(), 20)
+        self._seed(users=25, seed=1)
+        self.assertEqual(User.objects.count(), 25)
+
+    def test_create_username_is_valid(self):
+        username = create_username("Mary-Jane", "O'Donnell-Fitzgerald-Smythe", 123456)
+        self.assertRegex(username, r'^@\w{3,}$')
+        self.assertLessEqual(len(username), 30)
+        self.assertTrue(username.endswith('123456'))
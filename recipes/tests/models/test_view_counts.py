@@ -0,0 +1,109 @@
+"""Tests of the buffered recipe view counters"""
+from unittest import mock
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from recipes.models import Recipe, User
+from recipes.view_counts import _flush_at_exit, most_viewed, view_counter
+
+
+@override_settings(RECIPE_VIEW_FLUSH_INTERVAL=3600, RECIPE_VIEW_FLUSH_EVENTS=5)
+class ViewCounterTestCase(TestCase):
+
+    fixtures = [
+        'recipes/tests/fixtures/default_user.json',
+        'recipes/tests/fixtures/valid_recipe.json',
+    ]
+
+    def setUp(self):
+        cache.clear()
+        view_counter.reset()
+        self.addCleanup(view_counter.reset)
+        self.recipe = Recipe.objects.get(pk=1)
+        self.other = Recipe.objects.create(
+            name="Soup", author=User.objects.get(pk=1), ingredients="Water",
+            instructions="Boil", difficulty_level="Easy", preparation_time_mins=10
+        )
+
+    def _view_counts(self):
+        return dict(Recipe.objects.values_list('id', 'view_count'))
+
+    def test_views_are_buffered_without_queries(self):
+        self.client.get(reverse('get_recipe', args=[self.recipe.pk]))
+        with self.assertNumQueries(1):
+            self.client.get(reverse('get_recipe', args=[self.recipe.pk]))
+        self.assertEqual(len(view_counter), 2)
+        self.assertEqual(self._view_counts()[self.recipe.pk], 0)
+
+    def test_flush_writes_aggregated_deltas_in_one_transaction(self):
+        for recipe_id in (self.recipe.pk, self.recipe.pk, self.other.pk, self.recipe.pk):
+            view_counter.add(recipe_id)
+        # One UPDATE per distinct delta, inside a savepoint of the test transaction
+        with self.assertNumQueries(4):
+            self.assertEqual(view_counter.flush(), 4)
+        self.assertEqual(self._view_counts(), {self.recipe.pk: 3, self.other.pk: 1})
+        self.assertEqual(view_counter.flush(), 0)
+
+    def test_flush_runs_after_enough_events(self):
+        for _ in range(5):
+            self.client.get(reverse('get_recipe', args=[self.other.pk]))
+        self.assertEqual(len(view_counter), 0)
+        self.assertEqual(self._view_counts()[self.other.pk], 5)
+
+    @override_settings(RECIPE_VIEW_FLUSH_INTERVAL=0)
+    def test_flush_runs_after_the_interval(self):
+        # Leave the write to the request_finished handler, not the timer thread
+        with mock.patch('recipes.view_counts.start_flush_timer', return_value=None):
+            self.client.get(reverse('get_recipe', args=[self.other.pk]))
+        self.assertEqual(self._view_counts()[self.other.pk], 1)
+
+    def test_failed_flush_keeps_the_views(self):
+        view_counter.add(self.recipe.pk)
+        with mock.patch('recipes.view_counts.filter_by_ids', side_effect=DatabaseError("disk I/O error")):
+            with self.assertLogs('recipes.view_counts', 'ERROR'):
+                _flush_at_exit()
+        self.assertEqual(len(view_counter), 1)
+        view_counter.flush()
+        self.assertEqual(self._view_counts()[self.recipe.pk], 1)
+
+    def test_most_viewed_ranks_by_view_count(self):
+        for recipe_id in (self.other.pk, self.other.pk, self.recipe.pk):
+            view_counter.add(recipe_id)
+        view_counter.flush()
+        self.assertEqual(most_viewed(), [self.other, self.recipe])
+
+    def test_view_counts_do_not_touch_date_modified(self):
+        date_modified = self.recipe.date_modified
+        view_counter.add(self.recipe.pk)
+        view_counter.flush()
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.date_modified, date_modified)
+
+
+class ViewCounterTimerTestCase(TransactionTestCase):
+
+    fixtures = [
+        'recipes/tests/fixtures/default_user.json',
+        'recipes/tests/fixtures/valid_recipe.json',
+    ]
+
+    def setUp(self):
+        cache.clear()
+        view_counter.reset()
+        self.addCleanup(view_counter.reset)
+
+    @override_settings(RECIPE_VIEW_FLUSH_INTERVAL=0.05)
+    def test_buffered_views_are_written_without_further_requests(self):
+        view_counter.add(1)
+        view_counter.add(1)
+        timer = view_counter._timer
+        self.assertIsNotNone(timer)
+        timer.join(5)
+        self.assertEqual(len(view_counter), 0)
+        self.assertEqual(Recipe.objects.get(pk=1).view_count, 2)
+
+    @override_settings(RECIPE_VIEW_FLUSH_INTERVAL=float('inf'))
+    def test_infinite_interval_starts_no_timer(self):
+        view_counter.add(1)
+        self.assertIsNone(view_counter._timer)
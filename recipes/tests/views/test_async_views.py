@@ -0,0 +1,105 @@
+"""Tests of the async recipe views served through the ASGI entry point"""
+import asyncio
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from recipes import views
+from recipes.models import Recipe, User
+from recipes.query_budget import get_query_stats, reset_query_stats
+from recipes.tag_index import tag_index
+from recipes.tests.helpers import AsgiHarness, WsgiHarness, kept_connections
+from recipes.view_counts import view_counter
+
+
+class AsyncViewsTestCase(TestCase):
+
+    fixtures = [
+        'recipes/tests/fixtures/default_user.json',
+        'recipes/tests/fixtures/valid_recipe.json',
+    ]
+
+    def setUp(self):
+        cache.clear()
+        tag_index.reset()
+        view_counter.reset()
+        self.addCleanup(view_counter.reset)
+        reset_query_stats()
+        self.addCleanup(reset_query_stats)
+        self.recipe = Recipe.objects.get(pk=1)
+        self.paths = [reverse('list_recipes'), reverse('get_recipe', args=[self.recipe.pk]), reverse('home')]
+
+    def test_public_views_are_async(self):
+        for view in (views.list_recipes, views.get_recipe, views.home):
+            self.assertTrue(iscoroutinefunction(view), view.__name__)
+
+    async def test_concurrent_clients_through_asgi(self):
+        harness = AsgiHarness()
+        responses, _ = await harness.run_clients(self.paths, clients=20, requests_per_client=3)
+        self.assertEqual(len(responses), 60)
+        self.assertEqual({status for status, _, _ in responses}, {200})
+        recipe_pages = [body for status, headers, body in responses if b'Recipe #1' in body]
+        self.assertEqual(len(recipe_pages), 20)
+        self.assertTrue(all(b'Lasagna' in body for body in recipe_pages))
+        self.assertGreater(harness.peak_in_flight, 1)
+
+    def test_asgi_overlaps_slow_clients_that_a_wsgi_worker_serves_in_turn(self):
+        clients, requests_per_client, write_delay = 10, 2, 0.05
+        wsgi = WsgiHarness(write_delay=write_delay)
+        wsgi_responses, _ = wsgi.run_clients(self.paths, clients, requests_per_client)
+        asgi = AsgiHarness(write_delay=write_delay)
+        asgi_responses, _ = async_to_sync(asgi.run_clients)(self.paths, clients, requests_per_client)
+        self.assertEqual([status for status, _, _ in wsgi_responses], [200] * clients * requests_per_client)
+        self.assertEqual([status for status, _, _ in asgi_responses], [200] * clients * requests_per_client)
+        self.assertEqual(wsgi.peak_in_flight, 1)
+        self.assertGreaterEqual(asgi.peak_in_flight, clients)
+
+    async def test_asgi_serves_other_clients_while_one_is_stalled(self):
+        harness = AsgiHarness()
+        release = asyncio.Event()
+        with kept_connections():
+            stalled = asyncio.create_task(harness.get(self.paths[0], stall_until=release))
+            async with asyncio.timeout(harness.timeout):
+                while not harness.stalled:
+                    await asyncio.sleep(0.01)
+            responses = await asyncio.gather(*(harness.get(path) for path in self.paths * 5))
+            self.assertEqual([status for status, _, _ in responses], [200] * len(self.paths) * 5)
+            self.assertFalse(stalled.done())
+            self.assertEqual(harness.in_flight, 1)
+            release.set()
+            status, _, body = await stalled
+        self.assertEqual(status, 200)
+        self.assertIn(b'Lasagna', body)
+
+    async def test_queries_are_counted_through_asgi(self):
+        with kept_connections():
+            status, _, _ = await AsgiHarness().get(reverse('list_recipes'))
+        self.assertEqual(status, 200)
+        stats = get_query_stats()
+        self.assertGreater(stats['list_recipes']['queries'], 0)
+        self.assertGreater(stats['list_recipes (view)']['queries'], 0)
+
+    async def test_query_budget_is_checked_through_asgi(self):
+        with self.settings(QUERY_BUDGETS={'list_recipes': 0}, QUERY_BUDGET_RAISE=False):
+            with kept_connections(), self.assertLogs('recipes.query_budget', 'WARNING') as logs:
+                status, _, _ = await AsgiHarness().get(reverse('list_recipes'))
+        self.assertEqual(status, 200)
+        self.assertIn("View 'list_recipes' exceeded its query budget", logs.output[0])
+
+    async def test_conditional_get_through_asgi(self):
+        harness = AsgiHarness()
+        path = reverse('get_recipe', args=[self.recipe.pk])
+        status, headers, _ = await harness.get(path)
+        self.assertEqual(status, 200)
+        status, _, body = await harness.get(path, headers=[('If-None-Match', headers['etag'])])
+        self.assertEqual(status, 304)
+        self.assertEqual(body, b'')
+
+    async def test_missing_recipe_through_asgi(self):
+        status, _, _ = await AsgiHarness().get(reverse('get_recipe', args=[999]))
+        self.assertEqual(status, 404)
+
+    async def test_home_redirects_logged_in_users_through_asgi(self):
+        await self.async_client.aforce_login(await User.objects.aget(username='@johndoe'))
+        response = await self.async_client.get(reverse('home'))
+        self.assertEqual(response.status_code, 302)
@@ -1,9 +1,76 @@
 from django.core.exceptions import ImproperlyConfigured
-from django.test import TestCase
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from recipes.models import User
+from recipes.query_budget import QueryBudgetExceeded, get_query_stats, reset_query_stats
 from recipes.views import LoginProhibitedMixin
+from recipes.views.decorators import query_budget
 
 class LoginProhibitedMixinTestCase(TestCase):
 	def test_login_prohibited_throws_exception_when_not_configured(self):
 		mixin = LoginProhibitedMixin()
 		with self.assertRaises(ImproperlyConfigured):
-			mixin.get_redirect_when_logged_in_url()
\ No newline at end of file
+			mixin.get_redirect_when_logged_in_url()
+
+class QueryBudgetDecoratorTestCase(TestCase):
+
+	fixtures = ['recipes/tests/fixtures/default_user.json']
+
+	def setUp(self):
+		self.factory = RequestFactory()
+		reset_query_stats()
+
+	def _view_running(self, queries, max_queries):
+		@query_budget(max_queries)
+		def view(request):
+			for _ in range(queries):
+				list(User.objects.all())
+			return HttpResponse()
+		return view
+
+	def test_view_within_budget_is_silent(self):
+		view = self._view_running(2, 2)
+		with self.assertNoLogs('recipes.query_budget', level='WARNING'):
+			view(self.factory.get('/'))
+
+	@override_settings(QUERY_BUDGET_RAISE=False)
+	def test_view_over_budget_logs_warning(self):
+		view = self._view_running(3, 2)
+		with self.assertLogs('recipes.query_budget', level='WARNING') as logs:
+			view(self.factory.get('/'))
+		self.assertIn('3 queries (budget 2)', logs.output[0])
+
+	@override_settings(QUERY_BUDGET_RAISE=True)
+	def test_view_over_budget_raises_in_strict_mode(self):
+		view = self._view_running(3, 2)
+		with self.assertRaises(QueryBudgetExceeded):
+			view(self.factory.get('/'))
+
+	def test_decorator_records_stats(self):
+		view = self._view_running(2, 5)
+		view(self.factory.get('/'))
+		self.assertEqual(get_query_stats()['view (view)']['queries'], 2)
+
+	def test_decorator_exposes_budget(self):
+		self.assertEqual(self._view_running(0, 4).query_budget, (4, None))
+
+
+class QueryBudgetMiddlewareTestCase(TestCase):
+
+	fixtures = ['recipes/tests/fixtures/default_user.json', 'recipes/tests/fixtures/valid_recipe.json']
+
+	def setUp(self):
+		reset_query_stats()
+
+	def test_middleware_records_queries_per_url_name(self):
+		self.client.get(reverse('list_recipes'))
+		self.client.get(reverse('list_recipes'))
+		stats = get_query_stats()['list_recipes']
+		self.assertEqual(stats['requests'], 2)
+		self.assertEqual(stats['queries'], 2)
+
+	@override_settings(QUERY_BUDGET_RAISE=True, QUERY_BUDGETS={'list_recipes': 0})
+	def test_middleware_enforces_settings_budget(self):
+		with self.assertRaises(QueryBudgetExceeded):
+			self.client.get(reverse('list_recipes'))
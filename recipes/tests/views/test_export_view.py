@@ -0,0 +1,73 @@
+"""Tests of the NDJSON recipe export"""
+import gzip
+from io import StringIO
+import json
+import tempfile
+from pathlib import Path
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from recipes.export import iter_ndjson
+from recipes.models import FoodTag, Recipe, User
+from recipes.tests.helpers import reverse_with_next
+
+
+class ExportViewTestCase(TestCase):
+
+    fixtures = [
+        'recipes/tests/fixtures/default_user.json',
+        'recipes/tests/fixtures/valid_recipe.json',
+        'recipes/tests/fixtures/valid_foodtag.json',
+    ]
+
+    def setUp(self):
+        self.url = reverse('export_recipes')
+        self.user = User.objects.get(username='@johndoe')
+        Recipe.objects.get(pk=1).tags.add(FoodTag.objects.get(pk=1))
+        for i in range(4):
+            Recipe.objects.create(
+                name=f"Recipe {i}", author=self.user, ingredients="Eggs",
+                instructions="Cook", difficulty_level="Easy", preparation_time_mins=10
+            )
+
+    def _records(self, content):
+        return [json.loads(line) for line in content.decode().splitlines()]
+
+    def test_export_url(self):
+        self.assertEqual(self.url, '/recipes/export/')
+
+    def test_export_redirects_when_not_logged_in(self):
+        response = self.client.get(self.url)
+        self.assertRedirects(response, reverse_with_next('log_in', self.url), status_code=302, target_status_code=200)
+
+    def test_export_streams_every_recipe_as_ndjson(self):
+        self.client.login(username=self.user.username, password='Password123')
+        response = self.client.get(self.url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        records = self._records(b''.join(response.streaming_content))
+        self.assertEqual([record['id'] for record in records], list(Recipe.objects.order_by('id').values_list('id', flat=True)))
+        self.assertEqual(records[0]['name'], 'Lasagna')
+        self.assertEqual(records[0]['author'], '@johndoe')
+        self.assertEqual(records[0]['tags'], ['Halal'])
+        self.assertEqual(records[1]['tags'], [])
+
+    def test_export_can_be_gzipped(self):
+        self.client.login(username=self.user.username, password='Password123')
+        response = self.client.get(self.url, {'gzip': '1'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('recipes.ndjson.gz', response['Content-Disposition'])
+        records = self._records(gzip.decompress(b''.join(response.streaming_content)))
+        self.assertEqual(len(records), 5)
+
+    def test_export_reads_in_batches(self):
+        chunks = list(iter_ndjson(batch_size=2))
+        self.assertEqual(len(chunks), 3)
+        self.assertEqual(sum(chunk.count(b'\n') for chunk in chunks), 5)
+
+    def test_export_recipes_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'recipes.ndjson.gz'
+            call_command('export_recipes', output=str(path), gzip=True, batch_size=2, stdout=StringIO())
+            records = self._records(gzip.decompress(path.read_bytes()))
+        self.assertEqual(len(records), 5)
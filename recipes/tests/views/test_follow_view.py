@@ -0,0 +1,90 @@
+"""Tests of the follow views and the dashboard feed"""
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from recipes import feed
+from recipes.models import AuthorFollow, FoodTag, Recipe, TagFollow, User
+from recipes.tag_index import tag_index
+
+
+class FollowViewTestCase(TestCase):
+
+    fixtures = [
+        'recipes/tests/fixtures/default_user.json',
+        'recipes/tests/fixtures/other_users.json',
+        'recipes/tests/fixtures/valid_foodtag.json',
+    ]
+
+    def setUp(self):
+        cache.clear()
+        tag_index.reset()
+        self.user = User.objects.get(username='@johndoe')
+        self.author = User.objects.get(pk=2)
+        self.tag = FoodTag.objects.get(pk=1)
+        self.follow_user_url = reverse('follow_user', kwargs={'pk': self.author.pk})
+        self.follow_tag_url = reverse('follow_tag')
+        self.client.login(username=self.user.username, password='Password123')
+
+    def _recipe(self, name, tags=()):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(
+                name=name, author=self.author, ingredients="Eggs", instructions="Cook",
+                difficulty_level="Easy", preparation_time_mins=10
+            )
+            recipe.tags.add(*tags)
+        return recipe
+
+    def test_follow_urls(self):
+        self.assertEqual(self.follow_user_url, f'/users/{self.author.pk}/follow/')
+        self.assertEqual(self.follow_tag_url, '/tags/follow/')
+
+    def test_follow_and_unfollow_user(self):
+        profile_url = reverse('user_profile', kwargs={'pk': self.author.pk})
+        self.assertContains(self.client.get(profile_url), 'value="follow"')
+        response = self.client.post(self.follow_user_url, {'action': 'follow'})
+        self.assertRedirects(response, profile_url)
+        self.assertTrue(AuthorFollow.objects.filter(follower=self.user, author=self.author).exists())
+        self.assertContains(self.client.get(profile_url), 'value="unfollow"')
+        self.client.post(self.follow_user_url, {'action': 'unfollow'})
+        self.assertFalse(AuthorFollow.objects.exists())
+
+    def test_cannot_follow_self(self):
+        url = reverse('follow_user', kwargs={'pk': self.user.pk})
+        response = self.client.post(url, {'action': 'follow'}, follow=True)
+        self.assertContains(response, "You cannot follow yourself.")
+        self.assertFalse(AuthorFollow.objects.exists())
+
+    def test_follow_requires_post_and_login(self):
+        self.assertEqual(self.client.get(self.follow_user_url).status_code, 405)
+        self.client.logout()
+        response = self.client.post(self.follow_user_url, {'action': 'follow'})
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(AuthorFollow.objects.exists())
+
+    def test_follow_and_unfollow_tag(self):
+        response = self.client.post(self.follow_tag_url, {'tag_name': 'halal', 'action': 'follow'})
+        self.assertRedirects(response, reverse('dashboard'))
+        self.assertTrue(TagFollow.objects.filter(follower=self.user, tag=self.tag).exists())
+        self.client.post(self.follow_tag_url, {'tag_name': 'Halal', 'action': 'unfollow'})
+        self.assertFalse(TagFollow.objects.exists())
+        response = self.client.post(self.follow_tag_url, {'tag_name': 'Kosher'}, follow=True)
+        self.assertContains(response, "There is no tag named")
+
+    def test_dashboard_shows_the_feed(self):
+        feed.follow_tag(self.user, self.tag)
+        self._recipe("Halal stew", tags=[self.tag])
+        self._recipe("Omelette")
+        response = self.client.get(reverse('dashboard'))
+        self.assertTemplateUsed(response, 'dashboard.html')
+        self.assertEqual([recipe.name for recipe in response.context['recipes']], ["Halal stew"])
+        self.assertEqual(list(response.context['followed_tags']), [self.tag])
+        feed.follow_author(self.user, self.author)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('dashboard'), {'page_size': 1})
+        self.assertContains(response, "Omelette")
+        response = self.client.get(f"{reverse('dashboard')}?{response.context['page'].next_query}")
+        self.assertEqual([recipe.name for recipe in response.context['recipes']], ["Halal stew"])
+
+    def test_dashboard_rejects_malformed_cursor(self):
+        response = self.client.get(reverse('dashboard'), {'after': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,57 @@
+"""Tests of the cook-with-what-I-have view"""
+from django.test import TestCase
+from django.urls import reverse
+from recipes.models import Recipe, User
+
+
+class PantryViewTestCase(TestCase):
+
+    fixtures = ['recipes/tests/fixtures/default_user.json']
+
+    def setUp(self):
+        self.url = reverse('cook_with_pantry')
+        author = User.objects.get(pk=1)
+
+        def create(name, ingredients):
+            return Recipe.objects.create(
+                name=name, author=author, ingredients=ingredients,
+                instructions="Cook", difficulty_level="Easy", preparation_time_mins=10
+            )
+
+        self.pancakes = create("Pancakes", "2 eggs\n100g flour\n300ml milk")
+        self.omelette = create("Omelette", "3 eggs\n50g cheese")
+        self.cake = create("Cake", "eggs; flour; sugar; butter")
+        self.curry = create("Curry", "chickpeas\nspinach")
+
+    def _results(self, pantry):
+        response = self.client.get(self.url, {'ingredients': pantry})
+        self.assertEqual(response.status_code, 200)
+        return [(result['recipe'].id, result['matched'], result['total']) for result in response.context['results']]
+
+    def test_pantry_url(self):
+        self.assertEqual(self.url, '/recipes/pantry/')
+
+    def test_empty_pantry_has_no_results(self):
+        response = self.client.get(self.url)
+        self.assertTemplateUsed(response, 'pantry.html')
+        self.assertEqual(response.context['results'], [])
+
+    def test_recipes_are_ranked_by_coverage(self):
+        self.assertEqual(self._results('Eggs, flour, milk'), [
+            (self.pancakes.id, 3, 3),
+            (self.cake.id, 2, 4),
+            (self.omelette.id, 1, 2),
+        ])
+
+    def test_recipes_without_pantry_ingredients_are_excluded(self):
+        ids = [recipe_id for recipe_id, _, _ in self._results('cheese')]
+        self.assertEqual(ids, [self.omelette.id])
+
+    def test_results_are_rendered(self):
+        response = self.client.get(self.url, {'ingredients': 'eggs'})
+        self.assertContains(response, 'Omelette')
+        self.assertContains(response, '1 of 2')
+
+    def test_query_count_is_constant(self):
+        with self.assertNumQueries(2):
+            self.client.get(self.url, {'ingredients': 'eggs, flour, milk, cheese'})
@@ -1,5 +1,17 @@
-from django.test import TestCase
+import re
+import time
+from datetime import timedelta
+from unittest import mock
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from recipes import fragment_cache
+from recipes.models import FoodTag, Recipe, User
+from recipes.tag_index import VERSION_KEY, tag_index
+from recipes.view_counts import view_counter
 
 class RecipesViewTest(TestCase):
     """Test suite for the recipes views."""
@@ -10,6 +22,10 @@ class RecipesViewTest(TestCase):
     ]
 
     def setUp(self):
+        cache.clear()
+        tag_index.reset()
+        view_counter.reset()
+        self.addCleanup(view_counter.reset)
         self.url_list_recipes = reverse('list_recipes')
         self.url_get_recipe_valid = reverse('get_recipe', args=[1])
 
@@ -30,6 +46,396 @@ class RecipesViewTest(TestCase):
         self.assertIn('recipe', response.context)
         self.assertEqual(response.context['recipe'].id, 1)
 
+    def test_list_recipes_query_count_is_constant(self):
+        author = User.objects.get(pk=1)
+        for i in range(5):
+            Recipe.objects.create(
+                name=f"Recipe {i}", author=author, ingredients="Eggs",
+                instructions="Cook", difficulty_level="Easy", preparation_time_mins=10
+            )
+        self.client.get(self.url_list_recipes)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url_list_recipes)
+        self.assertContains(response, author.username, count=6)
+
+    def test_get_recipe_query_count_is_constant(self):
+        # The author and tags come from the recipe row's summary columns
+        with self.assertNumQueries(2):
+            self.client.get(self.url_get_recipe_valid)
+
+    def test_get_recipe_serves_cached_body_without_recipe_queries(self):
+        first = self.client.get(self.url_get_recipe_valid)
+        # Only the date_modified lookup used for conditional GET remains
+        with self.assertNumQueries(1):
+            second = self.client.get(self.url_get_recipe_valid)
+        self.assertEqual(first.content, second.content)
+        self.assertContains(second, 'Lasagna')
+        self.assertEqual(fragment_cache.cache_stats(), {'hits': 1, 'misses': 1})
+
+    def test_cached_body_is_invalidated_when_recipe_changes(self):
+        self.client.get(self.url_get_recipe_valid)
+        recipe = Recipe.objects.get(pk=1)
+        recipe.name = 'Moussaka'
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        response = self.client.get(self.url_get_recipe_valid)
+        self.assertContains(response, 'Moussaka')
+        self.assertNotContains(response, 'Lasagna')
+
+    def test_cached_body_is_invalidated_when_tags_change(self):
+        self.client.get(self.url_get_recipe_valid)
+        tag = FoodTag.objects.create(tag_name='Comfort')
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.get(pk=1).tags.add(tag)
+        self.assertContains(self.client.get(self.url_get_recipe_valid), 'Comfort')
+        tag.tag_name = 'Cosy'
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.save()
+        self.assertContains(self.client.get(self.url_get_recipe_valid), 'Cosy')
+
+    def test_cached_body_is_invalidated_when_author_is_renamed(self):
+        self.client.get(self.url_get_recipe_valid)
+        author = User.objects.get(pk=1)
+        author.username = '@johnny'
+        with self.captureOnCommitCallbacks(execute=True):
+            author.save()
+        self.assertContains(self.client.get(self.url_get_recipe_valid), '@johnny')
+
+    def test_cached_body_survives_unrelated_user_updates(self):
+        self.client.get(self.url_get_recipe_valid)
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.get(pk=1).save(update_fields=['last_login'])
+        with self.assertNumQueries(1):
+            self.client.get(self.url_get_recipe_valid)
+
+    def test_deleted_recipe_is_not_served_from_cache(self):
+        self.client.get(self.url_get_recipe_valid)
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.get(pk=1).delete()
+        self.assertEqual(self.client.get(self.url_get_recipe_valid).status_code, 404)
+
     def test_get_recipe_view_invalid_id(self):
         response = self.client.get(reverse('get_recipe', args=[999]))
-        self.assertEqual(response.status_code, 404)
\ No newline at end of file
+        self.assertEqual(response.status_code, 404)
+
+    def test_missing_recipe_leaves_no_version_stamp(self):
+        self.client.get(reverse('get_recipe', args=[999]))
+        self.assertIsNone(cache.get(fragment_cache._version_key(999)))
+        self.client.get(self.url_get_recipe_valid)
+        self.assertIsNotNone(cache.get(fragment_cache._version_key(1)))
+
+    @override_settings(RECIPE_BODY_CACHE_TIMEOUT=60)
+    def test_version_stamps_expire(self):
+        self.client.get(self.url_get_recipe_valid)
+        key = fragment_cache._version_key(1)
+        self.assertIsNotNone(cache.get(key))
+        with mock.patch('time.time', return_value=time.time() + 61):
+            self.assertIsNone(cache.get(key))
+
+
+@override_settings(DEFAULT_PAGE_SIZE=3)
+class RecipesPaginationTest(TestCase):
+    """Test suite for the keyset pagination of the recipes list."""
+
+    fixtures = [
+        'recipes/tests/fixtures/default_user.json',
+        'recipes/tests/fixtures/valid_recipe.json'
+    ]
+
+    def setUp(self):
+        self.url = reverse('list_recipes')
+        author = User.objects.get(pk=1)
+        start = timezone.now()
+        for i in range(7):
+            recipe = Recipe.objects.create(
+                name=f"Recipe {i}", author=author, ingredients="Eggs",
+                instructions="Cook", difficulty_level="Easy", preparation_time_mins=10
+            )
+            # Two recipes share a timestamp so the id tie-breaker is exercised
+            Recipe.objects.filter(pk=recipe.pk).update(date_created=start - timedelta(minutes=i // 2 * 2))
+        self.expected = list(Recipe.objects.order_by('-date_created', '-id').values_list('id', flat=True))
+
+    def _ids(self, response):
+        return [recipe.id for recipe in response.context['recipes']]
+
+    def test_first_page_is_newest_recipes(self):
+        response = self.client.get(self.url)
+        page = response.context['page']
+        self.assertEqual(self._ids(response), self.expected[:3])
+        self.assertTrue(page.has_next)
+        self.assertFalse(page.has_previous)
+
+    def test_empty_cursors_show_the_first_page(self):
+        for params in ({'before': ''}, {'after': ''}, {'after': '', 'before': ''}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(self._ids(response), self.expected[:3])
+            self.assertFalse(response.context['page'].has_previous)
+
+    def test_walk_forward_and_back_through_all_pages(self):
+        response = self.client.get(self.url)
+        seen = list(self._ids(response))
+        pages = [self._ids(response)]
+        while response.context['page'].has_next:
+            response = self.client.get(f"{self.url}?{response.context['page'].next_query}")
+            pages.append(self._ids(response))
+            seen += self._ids(response)
+        self.assertEqual(seen, self.expected)
+        self.assertFalse(response.context['page'].has_next)
+
+        for expected_page in reversed(pages[:-1]):
+            response = self.client.get(f"{self.url}?{response.context['page'].previous_query}")
+            self.assertEqual(self._ids(response), expected_page)
+        self.assertFalse(response.context['page'].has_previous)
+
+    def test_page_size_query_parameter(self):
+        response = self.client.get(self.url, {'page_size': 5})
+        self.assertEqual(self._ids(response), self.expected[:5])
+
+    @override_settings(MAX_PAGE_SIZE=4)
+    def test_page_size_is_capped(self):
+        response = self.client.get(self.url, {'page_size': 50})
+        self.assertEqual(len(response.context['recipes']), 4)
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(self.url, {'after': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_list_does_not_count_whole_table(self):
+        response = self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(f"{self.url}?{response.context['page'].next_query}")
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'].upper())
+
+    def test_next_link_is_rendered(self):
+        response = self.client.get(self.url)
+        self.assertContains(response, f"?{response.context['page'].next_query}")
+
+
+class RecipesTagFilterTest(TestCase):
+    """Test suite for tag filtering and facet counts on the recipes list."""
+
+    fixtures = [
+        'recipes/tests/fixtures/default_user.json',
+        'recipes/tests/fixtures/valid_recipe.json'
+    ]
+
+    def setUp(self):
+        tag_index.reset()
+        self.url = reverse('list_recipes')
+        author = User.objects.get(pk=1)
+        self.vegan = FoodTag.objects.create(tag_name='Vegan')
+        self.gluten_free = FoodTag.objects.create(tag_name='Gluten-free')
+        self.halal = FoodTag.objects.create(tag_name='Halal')
+        self.salad, self.bread, self.stew = [
+            Recipe.objects.create(
+                name=name, author=author, ingredients="Things",
+                instructions="Cook", difficulty_level="Easy", preparation_time_mins=10
+            )
+            for name in ("Salad", "Bread", "Stew")
+        ]
+        self.salad.tags.add(self.vegan, self.gluten_free)
+        self.bread.tags.add(self.vegan)
+        self.stew.tags.add(self.gluten_free, self.halal)
+
+    def _ids(self, params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return {recipe.id for recipe in response.context['recipes']}
+
+    def _counts(self, params):
+        response = self.client.get(self.url, params)
+        return {facet['name']: facet['count'] for facet in response.context['facets']}
+
+    def test_filter_by_single_tag(self):
+        self.assertEqual(self._ids({'tag': self.vegan.id}), {self.salad.id, self.bread.id})
+
+    def test_filter_requires_all_tags_by_default(self):
+        self.assertEqual(self._ids({'tag': [self.vegan.id, self.gluten_free.id]}), {self.salad.id})
+
+    def test_filter_matching_any_tag(self):
+        params = {'tag': [self.vegan.id, self.halal.id], 'match': 'any'}
+        self.assertEqual(self._ids(params), {self.salad.id, self.bread.id, self.stew.id})
+
+    def test_filter_with_no_matches_is_empty(self):
+        self.assertEqual(self._ids({'tag': [self.vegan.id, self.halal.id]}), set())
+        self.assertEqual(self._ids({'tag': 9999}), set())
+
+    def test_invalid_tag_ids_are_ignored(self):
+        self.assertEqual(len(self._ids({'tag': 'abc'})), 4)
+
+    def test_facet_counts_without_filter(self):
+        self.assertEqual(self._counts({}), {'Vegan': 2, 'Gluten-free': 2, 'Halal': 1})
+
+    def test_facet_counts_follow_current_result_set(self):
+        self.assertEqual(self._counts({'tag': self.vegan.id}), {'Vegan': 2, 'Gluten-free': 1})
+
+    def test_facets_do_not_query_the_tags_table(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            self.client.get(self.url, {'tag': self.vegan.id})
+
+    def test_index_is_updated_on_commit(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.bread.tags.add(self.halal)
+        with self.assertNumQueries(1):
+            ids = self._ids({'tag': self.halal.id})
+        self.assertEqual(ids, {self.bread.id, self.stew.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.halal.recipe_set.clear()
+        self.assertEqual(self._ids({'tag': self.halal.id}), set())
+
+    def test_index_forgets_deleted_recipes_and_tags(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.salad.delete()
+            self.halal.delete()
+        self.assertEqual(self._counts({}), {'Vegan': 1, 'Gluten-free': 1})
+
+    def test_deleted_recipes_do_not_make_other_processes_reload(self):
+        self.client.get(self.url)
+        version = cache.get(VERSION_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.salad.delete()
+        self.assertIsNotNone(version)
+        self.assertEqual(cache.get(VERSION_KEY), version)
+        self.assertEqual(self._ids({'tag': self.vegan.id}), {self.bread.id})
+
+    def test_index_reloads_when_version_changes_elsewhere(self):
+        self.client.get(self.url)
+        Recipe.tags.through.objects.create(recipe=self.bread, foodtag=self.halal)
+        self.assertEqual(self._ids({'tag': self.halal.id}), {self.stew.id})
+        # Simulate another process publishing a change
+        cache.incr(VERSION_KEY)
+        self.assertEqual(self._ids({'tag': self.halal.id}), {self.bread.id, self.stew.id})
+
+    @override_settings(DEFAULT_PAGE_SIZE=2)
+    def test_filtered_pages_send_only_their_ids_to_the_database(self):
+        author = User.objects.get(pk=1)
+        start = timezone.now()
+        for i in range(6):
+            recipe = Recipe.objects.create(
+                name=f"Vegan {i}", author=author, ingredients="Things",
+                instructions="Cook", difficulty_level="Easy", preparation_time_mins=10
+            )
+            # Creation order differs from id order for half of them
+            Recipe.objects.filter(pk=recipe.pk).update(date_created=start + timedelta(minutes=(i * 7) % 6))
+            recipe.tags.add(self.vegan)
+        expected = list(
+            Recipe.objects.filter(tags=self.vegan).order_by(*Recipe.LIST_ORDERING).values_list('id', flat=True)
+        )
+        pages, params = [], {'tag': self.vegan.id}
+        while True:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(self.url, params)
+            [sql] = [query['sql'] for query in queries if 'json_each' in query['sql']]
+            self.assertLessEqual(len(re.search(r"json_each\('\[([^\]]*)\]'\)", sql).group(1).split(',')), 3)
+            page = response.context['page']
+            pages.append([recipe.id for recipe in page])
+            if not page.has_next:
+                break
+            params['after'] = page.next_cursor
+        self.assertEqual([recipe_id for ids in pages for recipe_id in ids], expected)
+        params.pop('after')
+        params['before'] = page.previous_cursor
+        self.assertEqual([recipe.id for recipe in self.client.get(self.url, params).context['recipes']], pages[-2])
+
+    def test_facet_links_toggle_tags(self):
+        response = self.client.get(self.url, {'tag': self.vegan.id})
+        facets = {facet['name']: facet for facet in response.context['facets']}
+        self.assertTrue(facets['Vegan']['selected'])
+        self.assertEqual(facets['Vegan']['query'], '')
+        self.assertEqual(facets['Gluten-free']['query'], f'tag={self.vegan.id}&tag={self.gluten_free.id}')
+
+
+class RecipesConditionalGetTest(TestCase):
+    """Test suite for ETag / Last-Modified handling of the recipe pages."""
+
+    fixtures = [
+        'recipes/tests/fixtures/default_user.json',
+        'recipes/tests/fixtures/valid_recipe.json'
+    ]
+
+    def setUp(self):
+        cache.clear()
+        tag_index.reset()
+        view_counter.reset()
+        self.addCleanup(view_counter.reset)
+        self.url_list_recipes = reverse('list_recipes')
+        self.url_get_recipe = reverse('get_recipe', args=[1])
+
+    def _revalidate(self, url, response, **params):
+        return self.client.get(url, params, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_recipe_page_has_validators(self):
+        response = self.client.get(self.url_get_recipe)
+        self.assertIn('ETag', response)
+        self.assertEqual(response['Last-Modified'], 'Sat, 01 Jun 2024 12:00:00 GMT')
+        self.assertIn('Cookie', response['Vary'])
+
+    def test_unchanged_recipe_returns_304_without_rendering(self):
+        response = self.client.get(self.url_get_recipe)
+        with self.assertNumQueries(1):
+            second = self._revalidate(self.url_get_recipe, response)
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b'')
+
+    def test_if_modified_since_returns_304(self):
+        response = self.client.get(self.url_get_recipe, HTTP_IF_MODIFIED_SINCE='Sat, 01 Jun 2024 12:00:00 GMT')
+        self.assertEqual(response.status_code, 304)
+
+    def test_changed_recipe_returns_200(self):
+        response = self.client.get(self.url_get_recipe)
+        recipe = Recipe.objects.get(pk=1)
+        recipe.name = 'Moussaka'
+        recipe.save()
+        second = self._revalidate(self.url_get_recipe, response)
+        self.assertEqual(second.status_code, 200)
+
+    def test_tag_change_touches_date_modified(self):
+        before = Recipe.objects.get(pk=1).date_modified
+        Recipe.objects.get(pk=1).tags.add(FoodTag.objects.create(tag_name='Vegan'))
+        self.assertGreater(Recipe.objects.get(pk=1).date_modified, before)
+
+    def test_author_rename_touches_date_modified(self):
+        before = Recipe.objects.get(pk=1).date_modified
+        author = User.objects.get(pk=1)
+        author.username = '@johnny'
+        author.save()
+        self.assertGreater(Recipe.objects.get(pk=1).date_modified, before)
+
+    def test_logging_in_changes_recipe_etag(self):
+        response = self.client.get(self.url_get_recipe)
+        self.client.login(username='@johndoe', password='Password123')
+        self.assertEqual(self._revalidate(self.url_get_recipe, response).status_code, 200)
+
+    def test_missing_recipe_still_returns_404(self):
+        response = self.client.get(reverse('get_recipe', args=[999]), HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 404)
+
+    def test_unchanged_list_returns_304_without_queries(self):
+        response = self.client.get(self.url_list_recipes)
+        with self.assertNumQueries(0):
+            second = self._revalidate(self.url_list_recipes, response)
+        self.assertEqual(second.status_code, 304)
+
+    def test_list_etag_depends_on_query_string(self):
+        response = self.client.get(self.url_list_recipes)
+        second = self._revalidate(self.url_list_recipes, response, page_size=5)
+        self.assertEqual(second.status_code, 200)
+
+    def test_list_changes_after_recipe_is_created(self):
+        response = self.client.get(self.url_list_recipes)
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.create(
+                name="Soup", author=User.objects.get(pk=1), ingredients="Water",
+                instructions="Boil", difficulty_level="Easy", preparation_time_mins=5
+            )
+        self.assertEqual(self._revalidate(self.url_list_recipes, response).status_code, 200)
+
+    def test_list_changes_after_recipe_is_deleted(self):
+        response = self.client.get(self.url_list_recipes)
+        with self.captureOnCommitCallbacks(execute=True):
+            Recipe.objects.get(pk=1).delete()
+        self.assertEqual(self._revalidate(self.url_list_recipes, response).status_code, 200)
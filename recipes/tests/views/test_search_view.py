@@ -0,0 +1,120 @@
+"""Tests of the full-text recipe search view and its index"""
+from io import StringIO
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from recipes import search
+from recipes.models import FoodTag, Recipe, User
+
+
+class SearchViewTestCase(TestCase):
+
+    fixtures = [
+        'recipes/tests/fixtures/default_user.json',
+        'recipes/tests/fixtures/valid_recipe.json',
+        'recipes/tests/fixtures/valid_foodtag.json',
+    ]
+
+    def setUp(self):
+        self.url = reverse('search_recipes')
+        self.author = User.objects.get(pk=1)
+        self.pancakes = self._create_recipe("Pancakes", "Flour, eggs, milk", "Whisk and fry")
+        self.omelette = self._create_recipe("Cheese omelette", "Eggs, cheese", "Beat the eggs and fry")
+        self.curry = self._create_recipe("Chickpea curry", "Chickpeas, spices", "Simmer everything")
+
+    def _create_recipe(self, name, ingredients, instructions):
+        return Recipe.objects.create(
+            name=name, author=self.author, ingredients=ingredients,
+            instructions=instructions, difficulty_level="Easy", preparation_time_mins=20
+        )
+
+    def _search(self, query, **params):
+        response = self.client.get(self.url, {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [recipe.id for recipe in response.context['recipes']]
+
+    def test_search_url(self):
+        self.assertEqual(self.url, '/recipes/search/')
+
+    def test_search_renders_template(self):
+        response = self.client.get(self.url, {'q': 'pancakes'})
+        self.assertTemplateUsed(response, 'search.html')
+        self.assertContains(response, 'Pancakes')
+
+    def test_empty_query_returns_no_results(self):
+        self.assertEqual(self._search(''), [])
+
+    def test_search_matches_ingredients_and_instructions(self):
+        self.assertCountEqual(self._search('eggs'), [self.pancakes.id, self.omelette.id])
+        self.assertEqual(self._search('simmer'), [self.curry.id])
+
+    def test_search_uses_prefixes_and_stemming(self):
+        self.assertEqual(self._search('chick'), [self.curry.id])
+        self.assertCountEqual(self._search('frying'), [self.pancakes.id, self.omelette.id])
+
+    def test_name_matches_rank_above_instruction_matches(self):
+        self._create_recipe("Plain rice", "Rice", "Serve with an omelette on the side")
+        self.assertEqual(self._search('omelette')[0], self.omelette.id)
+
+    def test_fts_syntax_in_query_is_not_interpreted(self):
+        self.assertEqual(self._search('curry" OR "eggs'), [])
+        self.assertEqual(self._search('NEAR(('), [])
+
+    def test_index_follows_recipe_updates(self):
+        self.curry.name = "Lentil dal"
+        self.curry.save()
+        self.assertEqual(self._search('curry'), [])
+        self.assertEqual(self._search('lentil'), [self.curry.id])
+
+    def test_index_follows_recipe_deletion(self):
+        self.curry.delete()
+        self.assertEqual(self._search('chickpea'), [])
+
+    def test_index_follows_tag_changes(self):
+        tag = FoodTag.objects.get(pk=1)
+        self.curry.tags.add(tag)
+        self.assertEqual(self._search('halal'), [self.curry.id])
+        tag.tag_name = 'Kosher'
+        tag.save()
+        self.assertEqual(self._search('halal'), [])
+        self.assertEqual(self._search('kosher'), [self.curry.id])
+        tag.recipe_set.clear()
+        self.assertEqual(self._search('kosher'), [])
+
+    def test_index_follows_tag_deletion(self):
+        tag = FoodTag.objects.get(pk=1)
+        self.pancakes.tags.add(tag)
+        tag.delete()
+        self.assertEqual(self._search('halal'), [])
+
+    @override_settings(DEFAULT_PAGE_SIZE=1)
+    def test_results_are_paginated(self):
+        response = self.client.get(self.url, {'q': 'eggs'})
+        first = [recipe.id for recipe in response.context['recipes']]
+        page = response.context['page']
+        self.assertTrue(page.has_next)
+        self.assertFalse(page.has_previous)
+        response = self.client.get(f"{self.url}?{page.next_query}")
+        second = [recipe.id for recipe in response.context['recipes']]
+        self.assertCountEqual(first + second, [self.pancakes.id, self.omelette.id])
+        self.assertFalse(response.context['page'].has_next)
+        response = self.client.get(f"{self.url}?{response.context['page'].previous_query}")
+        self.assertEqual([recipe.id for recipe in response.context['recipes']], first)
+
+    def test_empty_cursors_show_the_first_page(self):
+        first_page = self._search('eggs')
+        for params in ({'before': ''}, {'after': ''}, {'after': '', 'before': ''}):
+            self.assertEqual(self._search('eggs', **params), first_page)
+
+    def test_invalid_cursor_returns_404(self):
+        response = self.client.get(self.url, {'q': 'eggs', 'after': '!!'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_rebuild_search_index_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {search.FTS_TABLE}')
+        self.assertEqual(self._search('eggs'), [])
+        call_command('rebuild_search_index', batch_size=2, stdout=StringIO())
+        self.assertCountEqual(self._search('eggs'), [self.pancakes.id, self.omelette.id])
+        self.assertEqual(self._search('lasagna'), [1])
@@ -0,0 +1,102 @@
+"""Tests of the Server-Timing middleware"""
+from django.template.loader import render_to_string
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from recipes import profiling
+from recipes.models import User
+from recipes.tests.helpers import AsgiHarness, kept_connections
+
+
+def _metrics(response):
+    """Map each Server-Timing metric name to its parameters."""
+    return _parse_metrics(response['Server-Timing'])
+
+
+def _parse_metrics(header):
+    """Map each metric name of a Server-Timing header value to its parameters."""
+    metrics = {}
+    for metric in header.split(', '):
+        name, *params = metric.split(';')
+        metrics[name] = dict(param.split('=', 1) for param in params)
+    return metrics
+
+
+class ServerTimingTestCase(TestCase):
+
+    fixtures = ['recipes/tests/fixtures/default_user.json', 'recipes/tests/fixtures/other_users.json']
+
+    def setUp(self):
+        self.user = User.objects.get(username='@johndoe')
+
+    def _log_in_as_staff(self):
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.client.login(username=self.user.username, password='Password123')
+
+    def test_response_has_phase_timings(self):
+        self._log_in_as_staff()
+        metrics = _metrics(self.client.get(reverse('user_list')))
+        self.assertEqual(set(metrics), {'total', 'view', 'db', 'template'})
+        self.assertGreater(float(metrics['template']['dur']), 0)
+        self.assertEqual(metrics['db']['desc'], '"2 queries"')
+        phases = sum(float(metrics[phase]['dur']) for phase in ('view', 'db', 'template'))
+        self.assertAlmostEqual(phases, float(metrics['total']['dur']), delta=0.2)
+
+    def test_async_views_are_profiled(self):
+        self._log_in_as_staff()
+        metrics = _metrics(self.client.get(reverse('list_recipes')))
+        self.assertEqual(set(metrics), {'total', 'view', 'db', 'template'})
+        self.assertGreater(float(metrics['template']['dur']), 0)
+
+    @override_settings(SERVER_TIMING_PUBLIC=True)
+    async def test_queries_are_profiled_through_asgi(self):
+        with kept_connections():
+            status, headers, _ = await AsgiHarness().get(reverse('list_recipes'))
+        self.assertEqual(status, 200)
+        metrics = _parse_metrics(headers['server-timing'])
+        self.assertGreater(int(metrics['db']['desc'].strip('"').split()[0]), 0)
+
+    def test_staff_get_per_query_breakdown(self):
+        self._log_in_as_staff()
+        metrics = _metrics(self.client.get(reverse('user_list'), {profiling.PROFILE_PARAMETER: '1'}))
+        self.assertIn('q1', metrics)
+        self.assertIn('SELECT', metrics['q1']['desc'])
+
+    def test_other_visitors_get_no_header(self):
+        self.assertNotIn('Server-Timing', self.client.get(reverse('list_recipes')))
+        self.client.login(username=self.user.username, password='Password123')
+        response = self.client.get(reverse('user_list'), {profiling.PROFILE_PARAMETER: '1'})
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(SERVER_TIMING_PUBLIC=True)
+    def test_header_can_be_sent_to_everyone(self):
+        self.assertIn('Server-Timing', self.client.get(reverse('list_recipes')))
+        self.client.login(username=self.user.username, password='Password123')
+        metrics = _metrics(self.client.get(reverse('user_list'), {profiling.PROFILE_PARAMETER: '1'}))
+        self.assertEqual(set(metrics), {'total', 'view', 'db', 'template'})
+
+    @override_settings(DEBUG=True)
+    def test_header_is_sent_to_everyone_in_debug(self):
+        self.assertIn('Server-Timing', self.client.get(reverse('log_in')))
+
+    def test_request_is_logged(self):
+        with self.assertLogs('recipes.profiling', 'INFO') as logs:
+            self.client.get(reverse('log_in'))
+        self.assertIn('GET log_in 200', logs.output[0])
+        self.assertEqual(logs.records[0].server_timing['url_name'], 'log_in')
+        self.assertIn('template_ms', logs.records[0].server_timing)
+
+    @override_settings(SERVER_TIMING=False)
+    def test_middleware_can_be_disabled(self):
+        response = self.client.get(reverse('log_in'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_templates_render_outside_requests(self):
+        self.assertIsNone(profiling._current.get())
+        self.assertIn('Log out', render_to_string('partials/menu.html'))
+
+    def test_template_time_excludes_queries(self):
+        with profiling.profile_request() as profile:
+            render_to_string('user_list.html', {'users': User.objects.all()})
+        self.assertEqual(profile.query_count, 1)
+        self.assertGreater(profile.db, 0)
+        self.assertLess(profile.template, profile.total - profile.db + 1e-6)
@@ -0,0 +1,76 @@
+"""Tests of the tag autocomplete view and its trie"""
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from recipes.models import FoodTag, Recipe, User
+from recipes.tag_trie import MAX_SUGGESTIONS, tag_trie
+
+
+class TagAutocompleteViewTestCase(TestCase):
+
+    fixtures = ['recipes/tests/fixtures/default_user.json']
+
+    def setUp(self):
+        cache.clear()
+        tag_trie.reset()
+        self.url = reverse('autocomplete_tags')
+        author = User.objects.get(pk=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tags = {name: FoodTag.objects.create(tag_name=name) for name in (
+                'Vegan', 'Vegetarian', 'Gluten-free', 'Dairy-free', 'Halal',
+            )}
+            for i, names in enumerate((['Vegetarian', 'Dairy-free'], ['Vegetarian'], ['Gluten-free'])):
+                recipe = Recipe.objects.create(
+                    name=f"Recipe {i}", author=author, ingredients="Eggs",
+                    instructions="Cook", difficulty_level="Easy", preparation_time_mins=10
+                )
+                recipe.tags.add(*(self.tags[name] for name in names))
+
+    def _names(self, query, **params):
+        response = self.client.get(self.url, {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return [result['name'] for result in response.json()['results']]
+
+    def test_autocomplete_url(self):
+        self.assertEqual(self.url, '/tags/autocomplete/')
+
+    def test_prefix_matches_are_ranked_by_usage(self):
+        response = self.client.get(self.url, {'q': 'VEG'})
+        self.assertEqual(response.json()['results'], [
+            {'id': self.tags['Vegetarian'].pk, 'name': 'Vegetarian', 'count': 2},
+            {'id': self.tags['Vegan'].pk, 'name': 'Vegan', 'count': 0},
+        ])
+
+    def test_every_word_of_a_name_is_matched(self):
+        self.assertEqual(self._names('free'), ['Dairy-free', 'Gluten-free'])
+        self.assertEqual(self._names('gluten-f'), ['Gluten-free'])
+        self.assertEqual(self._names('x'), [])
+
+    def test_empty_query_lists_most_used_tags(self):
+        self.assertEqual(self._names('', limit=3), ['Vegetarian', 'Dairy-free', 'Gluten-free'])
+        self.assertEqual(len(self._names('', limit=1000)), len(self.tags))
+        self.assertLessEqual(len(self._names('', limit='many')), MAX_SUGGESTIONS)
+
+    def test_lookups_do_not_query_the_database(self):
+        self._names('veg')
+        with self.assertNumQueries(0):
+            self._names('dai')
+
+    def test_tag_changes_rebuild_the_trie(self):
+        self._names('veg')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tags['Vegan'].tag_name = 'Plant-based'
+            self.tags['Vegan'].save()
+            FoodTag.objects.create(tag_name='Vegetable')
+        self.assertEqual(self._names('veg'), ['Vegetarian', 'Vegetable'])
+        self.assertEqual(self._names('plant'), ['Plant-based'])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tags['Halal'].recipe_set.add(*Recipe.objects.all())
+        self.assertEqual(self._names('', limit=1), ['Halal'])
+
+    def test_stamp_from_another_process_triggers_rebuild(self):
+        self._names('veg')
+        FoodTag.objects.filter(pk=self.tags['Halal'].pk).update(tag_name='Vegan (halal)')
+        self.assertNotIn('Vegan (halal)', self._names('veg'))
+        cache.incr('recipes:tag_trie:version')
+        self.assertIn('Vegan (halal)', self._names('veg'))
@@ -45,3 +45,48 @@ class UserListViewTestCase(TestCase):
         self.assertContains(response, "Petra Pickles")
 
         self.assertNotContains(response, "John Doe")
+
+    def test_user_list_query_count_is_constant(self):
+        self.client.login(username = self.user.username, password = "Password123")
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+        User.objects.create_user('@extrauser', email='extra@example.org', first_name='Extra', last_name='User')
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+    def test_user_list_is_paginated(self):
+        self.client.login(username = self.user.username, password = "Password123")
+        response = self.client.get(self.url, {'page_size': 2})
+        page = response.context['page']
+        self.assertEqual([user.username for user in response.context['users']], ['@janedoe', '@peterpickles'])
+        self.assertTrue(page.has_next)
+        self.assertFalse(page.has_previous)
+
+        response = self.client.get(f"{self.url}?{page.next_query}")
+        page = response.context['page']
+        self.assertEqual([user.username for user in response.context['users']], ['@petrapickles'])
+        self.assertFalse(page.has_next)
+        self.assertTrue(page.has_previous)
+
+        response = self.client.get(f"{self.url}?{page.previous_query}")
+        self.assertEqual([user.username for user in response.context['users']], ['@janedoe', '@peterpickles'])
+
+    def test_user_list_rejects_invalid_cursor(self):
+        self.client.login(username = self.user.username, password = "Password123")
+        response = self.client.get(self.url, {'after': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_user_list_prefix_search(self):
+        self.client.login(username = self.user.username, password = "Password123")
+        searches = {
+            'pet': ['@peterpickles', '@petrapickles'],
+            'PICK': ['@peterpickles', '@petrapickles'],
+            'petr': ['@petrapickles'],
+            '@jane': ['@janedoe'],
+            'doe': ['@janedoe'],
+            'zz': [],
+        }
+        for query, usernames in searches.items():
+            response = self.client.get(self.url, {'q': query})
+            self.assertEqual([user.username for user in response.context['users']], usernames, query)
+        self.assertContains(response, 'value="zz"')
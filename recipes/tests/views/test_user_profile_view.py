@@ -44,3 +44,8 @@ class UserProfileViewTestCase(TestCase):
         bad_url = reverse('user_profile', kwargs={'pk':300})
         response = self.client.get(bad_url)
         self.assertEqual(response.status_code, 404)
+
+    def test_user_profile_query_count_is_constant(self):
+        self.client.login(username = self.useer_client.username, password = 'Password123')
+        with self.assertNumQueries(3):
+            self.client.get(self.url)
@@ -0,0 +1,218 @@
+"""
+Token-bucket throttling of password checks.
+
+Every password check (`LogInForm.get_user`, `PasswordForm.clean`) costs a
+full PBKDF2 computation, so a burst of guesses can keep every worker busy.
+`login_throttle` limits attempts per client IP and per username with token
+buckets, rejecting an attempt before any hashing happens. The IP bucket is
+checked first, so attempts from a throttled client are rejected without
+draining the bucket of the username they target.
+
+A successful check gives back only the username's token, so only failed
+attempts count towards the username limits. Every attempt counts towards
+the client's limit, so a client cannot keep its IP bucket full by mixing
+in logins to an account it controls.
+
+Bucket state lives in the default Django cache, which must be shared by
+every process (see the `recipes.E001` check): with a cache private to each
+worker, every worker would enforce the limits on its own. Each process
+also remembers which buckets it has seen empty and until when; further
+attempts against those are rejected without touching the cache. The
+read-modify-write of a bucket is not atomic across processes, so under
+heavy concurrency a few extra attempts may slip through.
+
+Allowed and throttled attempts are counted in the cache for monitoring;
+read them with `throttle_stats()`.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from django.conf import settings
+from django.core.cache import cache
+from recipes.helpers import increment_cache_counter
+
+ALLOWED_KEY = 'recipes:throttle:allowed'
+THROTTLED_KEY = 'recipes:throttle:throttled'
+
+# Bound on the in-process record of empty buckets
+MAX_LOCAL_ENTRIES = 10000
+
+
+class Throttled(Exception):
+    """Raised when an attempt exceeds a throttling limit."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Too many attempts; retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    A family of token buckets, one per identifier (e.g. an IP address).
+
+    Each bucket holds up to `capacity` tokens and regains them at a steady
+    rate of `capacity` per `period` seconds. All public methods are
+    thread-safe.
+
+    Args:
+        name (str): Distinguishes the family in cache keys.
+        capacity (int): Maximum number of tokens (the burst size).
+        period (float): Seconds needed to refill an empty bucket.
+    """
+
+    def __init__(self, name, capacity, period):
+        self.name = name
+        self.capacity = capacity
+        self.period = period
+        self.rate = capacity / period
+        self._lock = threading.Lock()
+        self._empty_until = {}
+
+    def _key(self, identifier):
+        digest = hashlib.sha1(str(identifier).encode()).hexdigest()
+        return f'recipes:throttle:{self.name}:{digest}'
+
+    def _tokens(self, key, now):
+        """Return the current number of tokens of a bucket, refill included."""
+
+        tokens, updated = cache.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated) * self.rate)
+
+    def _remember_empty(self, key, until, now):
+        """Record that a bucket is empty until `until`. Must hold the lock."""
+
+        if len(self._empty_until) >= MAX_LOCAL_ENTRIES:
+            self._empty_until = {k: t for k, t in self._empty_until.items() if t > now}
+            if len(self._empty_until) >= MAX_LOCAL_ENTRIES:
+                self._empty_until.clear()
+        self._empty_until[key] = until
+
+    def consume(self, identifier, now=None):
+        """
+        Take one token from the bucket of `identifier`.
+
+        Raises:
+            Throttled: If the bucket is empty.
+        """
+
+        now = time.time() if now is None else now
+        key = self._key(identifier)
+        with self._lock:
+            empty_until = self._empty_until.get(key)
+            if empty_until is not None:
+                if now < empty_until:
+                    raise Throttled(empty_until - now)
+                del self._empty_until[key]
+            tokens = self._tokens(key, now)
+            if tokens < 1:
+                until = now + (1 - tokens) / self.rate
+                self._remember_empty(key, until, now)
+                raise Throttled(until - now)
+            cache.set(key, (tokens - 1, now), timeout=math.ceil(self.period))
+
+    def refund(self, identifier, now=None):
+        """Give one token back to the bucket of `identifier`."""
+
+        now = time.time() if now is None else now
+        key = self._key(identifier)
+        with self._lock:
+            self._empty_until.pop(key, None)
+            tokens = min(self.capacity, self._tokens(key, now) + 1)
+            if tokens >= self.capacity:
+                cache.delete(key)
+            else:
+                cache.set(key, (tokens, now), timeout=math.ceil(self.period))
+
+    def reset(self):
+        """Forget the buckets this process has seen empty."""
+
+        with self._lock:
+            self._empty_until.clear()
+
+
+class LoginThrottle:
+    """
+    Per-IP and per-username limits on password checks.
+
+    The limits are read from `settings.LOGIN_THROTTLE_RATES`, a mapping of
+    `'ip'` and `'username'` to `(capacity, period_in_seconds)`.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._buckets = None
+
+    def _get_buckets(self):
+        with self._lock:
+            if self._buckets is None:
+                self._buckets = {
+                    scope: TokenBucket(f'login:{scope}', capacity, period)
+                    for scope, (capacity, period) in settings.LOGIN_THROTTLE_RATES.items()
+                }
+            return self._buckets
+
+    def _identifiers(self, request, username):
+        """Return the identifier of each scope, the client IP first."""
+
+        identifiers = {}
+        if request is not None:
+            identifiers['ip'] = request.META.get('REMOTE_ADDR', '')
+        identifiers['username'] = (username or '').lower()
+        return identifiers
+
+    def check(self, request, username):
+        """
+        Spend one attempt for the client of `request` and for `username`.
+
+        The client's limit is checked first, and the username's token is
+        only taken once the client is allowed.
+
+        Args:
+            request (HttpRequest or None): The current request; without one
+                only the username limit applies.
+            username (str): The username the password is checked against.
+
+        Raises:
+            Throttled: If either limit is exhausted; no password should be
+                checked then.
+        """
+
+        buckets = self._get_buckets()
+        try:
+            for scope, identifier in self._identifiers(request, username).items():
+                if scope in buckets:
+                    buckets[scope].consume(identifier)
+        except Throttled:
+            increment_cache_counter(THROTTLED_KEY)
+            raise
+        increment_cache_counter(ALLOWED_KEY)
+
+    def succeeded(self, request, username):
+        """
+        Give back the username's attempt spent on a successful check.
+
+        The client's attempt is kept, so that successful logins still
+        count towards the per-IP limit.
+        """
+
+        buckets = self._get_buckets()
+        if 'username' in buckets:
+            buckets['username'].refund(self._identifiers(request, username)['username'])
+
+    def reset(self):
+        """Reload the limits from the settings and forget local state."""
+
+        with self._lock:
+            self._buckets = None
+
+
+login_throttle = LoginThrottle()
+
+
+def throttle_stats():
+    """Return the shared counters of allowed and throttled password checks."""
+
+    counters = cache.get_many([ALLOWED_KEY, THROTTLED_KEY])
+    return {'allowed': counters.get(ALLOWED_KEY, 0), 'throttled': counters.get(THROTTLED_KEY, 0)}
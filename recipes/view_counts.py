@@ -0,0 +1,167 @@
+"""
+Buffered page view counting for recipes.
+
+Writing `view_count = view_count + 1` on every page view would make each
+view wait for SQLite's write lock. Instead, `get_recipe` adds views up in
+process memory with `view_counter.add()`, which never queries, and the
+summed deltas are written to `Recipe.view_count` in one transaction every
+`RECIPE_VIEW_FLUSH_INTERVAL` seconds, or once `RECIPE_VIEW_FLUSH_EVENTS`
+views are buffered. Recipes with the same delta share one UPDATE, so a
+flush runs a handful of statements however many recipes were viewed.
+
+Flushes are started from the `request_finished` signal (see
+`recipes.signals`), which is sent once the response has been handed to
+the server, so no visitor waits for them and they are outside the query
+budgets of the views. The first view buffered after a flush also starts a
+timer that flushes `RECIPE_VIEW_FLUSH_INTERVAL` seconds later, so the
+views are written even if no further request comes in.
+
+Buffered views are also flushed when the process exits (`atexit`, which
+runs on a normal shutdown, e.g. a worker stopped with SIGTERM), and put
+back in the buffer if a flush fails, so they are only lost if the process
+is killed outright. Until flushed, they are missing from
+`Recipe.view_count` and from `most_viewed()`.
+"""
+
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from recipes.helpers import filter_by_ids, start_flush_timer
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+
+class ViewCounter:
+    """
+    Recipe views not yet written to the database, by recipe id.
+
+    All public methods are thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._events = 0
+        self._last_flush = time.monotonic()
+        self._timer = None
+
+    def _start_timer(self):
+        """Start the flush timer unless one is running. Must hold the lock."""
+
+        if self._timer is None:
+            self._timer = start_flush_timer(settings.RECIPE_VIEW_FLUSH_INTERVAL, self.flush_quietly)
+
+    def _stop_timer(self):
+        """Cancel the flush timer, if any. Must hold the lock."""
+
+        timer, self._timer = self._timer, None
+        if timer is not None:
+            timer.cancel()
+
+    def reset(self):
+        """Drop the buffered views without writing them."""
+
+        with self._lock:
+            self._pending = Counter()
+            self._events = 0
+            self._last_flush = time.monotonic()
+            self._stop_timer()
+
+    def add(self, recipe_id):
+        """
+        Count one view of a recipe.
+
+        The first view buffered after a flush starts a timer that flushes
+        the buffer `RECIPE_VIEW_FLUSH_INTERVAL` seconds later.
+        """
+
+        with self._lock:
+            if not self._pending:
+                self._start_timer()
+            self._pending[recipe_id] += 1
+            self._events += 1
+
+    def due(self):
+        """Return whether enough views or time have gone by to flush."""
+
+        with self._lock:
+            return bool(self._pending) and (
+                self._events >= settings.RECIPE_VIEW_FLUSH_EVENTS
+                or time.monotonic() - self._last_flush >= settings.RECIPE_VIEW_FLUSH_INTERVAL
+            )
+
+    def flush(self):
+        """
+        Add the buffered views to `Recipe.view_count` in one transaction.
+
+        If the write fails, the views are put back in the buffer, the
+        timer is started again to retry, and the error is raised.
+
+        Returns:
+            int: The number of views written.
+        """
+
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._events = 0
+            self._last_flush = time.monotonic()
+            self._stop_timer()
+        if not pending:
+            return 0
+        by_delta = {}
+        for recipe_id, delta in pending.items():
+            by_delta.setdefault(delta, []).append(recipe_id)
+        try:
+            with transaction.atomic():
+                for delta, recipe_ids in by_delta.items():
+                    filter_by_ids(Recipe.objects.all(), recipe_ids).update(view_count=F('view_count') + delta)
+        except Exception:
+            with self._lock:
+                self._pending.update(pending)
+                self._events += sum(pending.values())
+                self._start_timer()
+            raise
+        return sum(pending.values())
+
+    def flush_if_due(self):
+        """Flush the buffer if it is due, logging instead of raising errors."""
+
+        if self.due():
+            self.flush_quietly()
+
+    def flush_quietly(self):
+        """Flush the buffer, logging instead of raising errors."""
+
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Could not write %d buffered recipe views; will retry", len(self))
+
+    def __len__(self):
+        """Return the number of buffered views."""
+
+        with self._lock:
+            return sum(self._pending.values())
+
+
+view_counter = ViewCounter()
+
+
+def most_viewed(limit=10):
+    """Return the `limit` most viewed recipes, most viewed first."""
+
+    return list(Recipe.objects.order_by(*Recipe.MOST_VIEWED_ORDERING)[:limit])
+
+
+@atexit.register
+def _flush_at_exit():
+    try:
+        view_counter.flush()
+    except Exception:
+        logger.exception("Could not write %d buffered recipe views at exit", len(view_counter))
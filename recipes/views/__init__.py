@@ -8,3 +8,8 @@ from .sign_up_view import *
 from .user_profile_view import *
 from .user_list_view import *
 from .recipes_view import *
+from .search_view import *
+from .pantry_view import *
+from .export_view import *
+from .tag_autocomplete_view import *
+from .follow_view import *
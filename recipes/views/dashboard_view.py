@@ -1,5 +1,7 @@
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
+from recipes.feed import feed_page
+from recipes.models import FoodTag
 
 
 @login_required
@@ -7,11 +9,20 @@ def dashboard(request):
     """
     Display the current user's dashboard.
 
-    This view renders the dashboard page for the authenticated user.
-    It ensures that only logged-in users can access the page. If a user
-    is not authenticated, they are automatically redirected to the login
-    page.
+    This view renders the dashboard page for the authenticated user, with
+    a page of their feed: the newest recipes by the authors and with the
+    tags they follow, read from their materialized timeline (see
+    `recipes.feed`), and the tags they follow. It ensures that only
+    logged-in users can access the page. If a user is not authenticated,
+    they are automatically redirected to the login page.
     """
 
     current_user = request.user
-    return render(request, 'dashboard.html', {'user': current_user})
+    page = feed_page(request, current_user)
+    followed_tags = FoodTag.objects.filter(follower_links__follower=current_user).order_by('tag_name')
+    return render(request, 'dashboard.html', {
+        'user': current_user,
+        'recipes': page.object_list,
+        'page': page,
+        'followed_tags': followed_tags,
+    })
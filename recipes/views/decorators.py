@@ -1,6 +1,9 @@
+from functools import wraps
+from asgiref.sync import iscoroutinefunction
 from django.conf import settings
 from django.core.exceptions import ImproperlyConfigured
 from django.shortcuts import redirect
+from recipes.query_budget import QueryCounter, check_budget, record_queries
 
 
 def login_prohibited(view_function):
@@ -10,7 +13,8 @@ def login_prohibited(view_function):
     This decorator is typically used for pages such as login or registration,
     where it doesn't make sense for an authenticated user to remain.
     If the user is already authenticated, they are redirected to the URL
-    defined in `settings.REDIRECT_URL_WHEN_LOGGED_IN`.
+    defined in `settings.REDIRECT_URL_WHEN_LOGGED_IN`. Async views are
+    supported; the user is then loaded with `request.auser()`.
 
     Args:
         view_function (Callable): The Django view function being decorated.
@@ -22,7 +26,16 @@ def login_prohibited(view_function):
     Raises:
         ImproperlyConfigured: If `settings.REDIRECT_URL_WHEN_LOGGED_IN` is not defined.
     """
-    
+
+    if iscoroutinefunction(view_function):
+        @wraps(view_function)
+        async def async_view_function(request):
+            request.user = await request.auser()
+            if request.user.is_authenticated:
+                return redirect(settings.REDIRECT_URL_WHEN_LOGGED_IN)
+            return await view_function(request)
+        return async_view_function
+
     def modified_view_function(request):
         if request.user.is_authenticated:
             return redirect(settings.REDIRECT_URL_WHEN_LOGGED_IN)
@@ -31,6 +44,55 @@ def login_prohibited(view_function):
     return modified_view_function
 
 
+def query_budget(max_queries, max_time_ms=None):
+    """
+    Decorator declaring the SQL budget of a view.
+
+    The queries run by the view and by the rendering of its template are
+    counted and timed. Lazily rendered responses (e.g. `TemplateResponse`
+    from generic class-based views) are rendered inside the counted block
+    so that template queries are included. Overruns are reported through
+    `recipes.query_budget.check_budget()`. For class-based views, apply it
+    to `dispatch` with `method_decorator`. Async views are supported; their
+    responses must be rendered eagerly (e.g. with `render()`), since lazy
+    template rendering cannot query the database from async code.
+
+    Args:
+        max_queries (int): Maximum number of SQL statements allowed.
+        max_time_ms (float, optional): Maximum total SQL time allowed.
+
+    Returns:
+        Callable: A decorator for Django view functions.
+    """
+
+    def decorator(view_function):
+        def check(request, counter):
+            match = getattr(request, 'resolver_match', None)
+            name = match.url_name if match is not None and match.url_name else view_function.__name__
+            record_queries(f'{name} (view)', counter)
+            check_budget(name, counter, max_queries, max_time_ms)
+
+        if iscoroutinefunction(view_function):
+            @wraps(view_function)
+            async def modified_view_function(request, *args, **kwargs):
+                with QueryCounter() as counter:
+                    response = await view_function(request, *args, **kwargs)
+                check(request, counter)
+                return response
+        else:
+            @wraps(view_function)
+            def modified_view_function(request, *args, **kwargs):
+                with QueryCounter() as counter:
+                    response = view_function(request, *args, **kwargs)
+                    if hasattr(response, 'render') and not response.is_rendered:
+                        response.render()
+                check(request, counter)
+                return response
+        modified_view_function.query_budget = (max_queries, max_time_ms)
+        return modified_view_function
+    return decorator
+
+
 class LoginProhibitedMixin:
     """
     Mixin that prevents logged-in users from accessing certain class-based views.
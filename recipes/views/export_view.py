@@ -0,0 +1,27 @@
+from django.contrib.auth.decorators import login_required
+from django.http import StreamingHttpResponse
+from recipes.export import gzip_chunks, iter_ndjson
+
+
+@login_required
+def export_recipes(request):
+    """
+    Stream the whole recipe catalog as NDJSON.
+
+    Every recipe, with its author's username and tag names, is written as
+    one JSON object per line. Rows are fetched in batches while the
+    response is being sent, so memory use does not depend on the size of
+    the catalog. With `?gzip=1` the stream is gzip-compressed on the fly.
+    Only logged-in users can export.
+    """
+
+    chunks = iter_ndjson()
+    filename = 'recipes.ndjson'
+    content_type = 'application/x-ndjson'
+    if request.GET.get('gzip') == '1':
+        chunks = gzip_chunks(chunks)
+        filename += '.gz'
+        content_type = 'application/gzip'
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
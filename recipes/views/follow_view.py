@@ -0,0 +1,49 @@
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import get_object_or_404, redirect
+from django.views.decorators.http import require_POST
+from recipes import feed
+from recipes.models import FoodTag, User
+
+
+@login_required
+@require_POST
+def follow_user(request, pk):
+    """
+    Follow or unfollow another user's recipes.
+
+    The `action` form field is either `follow` or `unfollow`. Following
+    adds the user's newest recipes to the current user's feed. Redirects
+    back to the user's profile.
+    """
+
+    author = get_object_or_404(User, pk=pk)
+    if request.POST.get('action') == 'unfollow':
+        feed.unfollow_author(request.user, author)
+    elif author.pk == request.user.pk:
+        messages.add_message(request, messages.ERROR, "You cannot follow yourself.")
+    else:
+        feed.follow_author(request.user, author)
+    return redirect('user_profile', pk=author.pk)
+
+
+@login_required
+@require_POST
+def follow_tag(request):
+    """
+    Follow or unfollow the recipes carrying a tag.
+
+    The tag is named by the `tag_name` form field (as suggested by the tag
+    autocompletion) and the `action` field is either `follow` or
+    `unfollow`. Redirects back to the dashboard.
+    """
+
+    tag_name = request.POST.get('tag_name', '').strip()
+    tag = FoodTag.objects.filter(tag_name__iexact=tag_name).first() if tag_name else None
+    if tag is None:
+        messages.add_message(request, messages.ERROR, f"There is no tag named \"{tag_name}\".")
+    elif request.POST.get('action') == 'unfollow':
+        feed.unfollow_tag(request.user, tag)
+    else:
+        feed.follow_tag(request.user, tag)
+    return redirect('dashboard')
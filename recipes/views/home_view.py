@@ -3,7 +3,11 @@ from recipes.views.decorators import login_prohibited
 
 
 @login_prohibited
-def home(request):
-    """Display the application's start/home screen."""
+async def home(request):
+    """
+    Display the application's start/home screen.
+
+    The view is async, so under ASGI it is served without a thread hop.
+    """
 
     return render(request, 'home.html')
\ No newline at end of file
@@ -1,6 +1,7 @@
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import login
+from django.core.exceptions import NON_FIELD_ERRORS
 from django.shortcuts import redirect, render
 from django.views import View
 from recipes.forms import LogInForm
@@ -34,21 +35,25 @@ class LogInView(LoginProhibitedMixin, View):
         This method attempts to authenticate the user based on submitted
         credentials. If successful, the user is logged in and redirected.
         Otherwise, an error message is displayed and the form is re-rendered.
+        Throttled attempts are answered with status 429.
         """
 
-        form = LogInForm(request.POST)
+        form = LogInForm(request.POST, request=request)
         self.next = request.POST.get('next') or settings.REDIRECT_URL_WHEN_LOGGED_IN
         user = form.get_user()
         if user is not None:
             login(request, user)
             return redirect(self.next)
+        if form.has_error(NON_FIELD_ERRORS, code='throttled'):
+            messages.add_message(request, messages.ERROR, "Too many log in attempts. Please try again later.")
+            return self.render(status=429)
         messages.add_message(request, messages.ERROR, "The credentials provided were invalid!")
         return self.render()
 
-    def render(self):
+    def render(self, status=200):
         """
         Render log in template with blank log in form.
         """
 
         form = LogInForm()
-        return render(self.request, 'log_in.html', {'form': form, 'next': self.next})
\ No newline at end of file
+        return render(self.request, 'log_in.html', {'form': form, 'next': self.next}, status=status)
\ No newline at end of file
@@ -0,0 +1,31 @@
+from django.shortcuts import render
+from recipes.helpers import get_page_size
+from recipes.ingredients import rank_recipes_by_pantry, split_ingredients
+from recipes.models.recipe import Recipe
+from recipes.read_models import RecipeRow
+from recipes.views.decorators import query_budget
+
+
+@query_budget(4)
+def cook_with_pantry(request):
+    """
+    Display the recipes best covered by the ingredients a user has.
+
+    The `ingredients` query parameter is a pantry list, split into
+    ingredients the way recipe ingredient lists are (see
+    `recipes.ingredients.split_ingredients()`). Recipes are ranked by the
+    share of their ingredients found in the pantry, using the normalized
+    ingredient index, and the top `page_size` recipes are shown. It does not require authentication.
+    """
+
+    pantry_text = request.GET.get('ingredients', '')
+    pantry = split_ingredients(pantry_text)
+    ranked = rank_recipes_by_pantry(pantry, get_page_size(request))
+    recipe_ids = [entry['recipe_id'] for entry in ranked]
+    recipes_by_id = {row.id: row for row in RecipeRow.fetch(Recipe.objects.filter(pk__in=recipe_ids))}
+    results = [
+        {'recipe': recipes_by_id[entry['recipe_id']], 'matched': entry['matched'], 'total': entry['total']}
+        for entry in ranked if entry['recipe_id'] in recipes_by_id
+    ]
+    context = {'results': results, 'pantry': pantry_text}
+    return render(request, 'pantry.html', context)
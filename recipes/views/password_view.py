@@ -24,11 +24,12 @@ class PasswordView(LoginRequiredMixin, FormView):
 
         Specifically, the current authenticated user is passed to the form,
         which allows the `PasswordForm` to validate the old password and
-        update the correct user instance.
+        update the correct user instance, along with the request used to
+        throttle password checks.
         """
 
         kwargs = super().get_form_kwargs(**kwargs)
-        kwargs.update({'user': self.request.user})
+        kwargs.update({'user': self.request.user, 'request': self.request})
         return kwargs
 
     def form_valid(self, form):
@@ -1,31 +1,181 @@
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
 from django.http import Http404
 from django.contrib.auth.decorators import login_required
+from recipes import conditional, fragment_cache
+from recipes.helpers import apaginate_by_cursor, filter_by_ids, select_page_ids
 from recipes.models.recipe import Recipe
+from recipes.read_models import RecipeRow
+from recipes.tag_index import tag_index
+from recipes.view_counts import view_counter
+from recipes.views.decorators import query_budget
 
-def list_recipes(request):
+@query_budget(5)
+@vary_on_cookie
+@conditional.preload(conditional.aload_recipe_list)
+@condition(etag_func=conditional.recipe_list_etag, last_modified_func=conditional.recipe_list_last_modified)
+async def list_recipes(request):
     """
     Display all recipes page.
 
-    This view renders the page of all recipes. It does not require
+    This view renders one page of recipes, newest first. It does not require
     authentication, allowing both logged-in and anonymous users to
     access all recipes.
+
+    Pages are selected with the `after`/`before` cursors in the query string
+    (keyset pagination over `(date_created, id)`), so deep pages cost the
+    same as the first one. The page size can be set with `page_size`.
+
+    Recipes can be filtered by one or more `tag` ids, requiring all of them
+    (`match=all`, the default) or any of them (`match=any`). Matching
+    recipes and the facet counts shown for every tag come from the
+    in-process `tag_index`, so neither needs a join over the tags table;
+    the page is picked from the index's sort keys, so only the ids of the
+    page's recipes are sent to the database.
+    The query budget allows for the one-off load of that index. Rows show
+    the author's username from the recipes' own summary columns (see
+    `recipes.summaries`), so the page is read from the recipe table alone,
+    as slotted `RecipeRow`s holding only the columns the template shows.
+
+    Unchanged lists are answered with 304 from a cached list-wide stamp
+    (see `recipes.conditional`) before any query or rendering.
+
+    The view is async: under ASGI it waits for the database without
+    holding a worker thread. The tag index may need to (re)load from the
+    database, so it is consulted in a single synchronous step.
     """
-    context = {'recipes': Recipe.objects.all()}
+    selected_tags = _selected_tag_ids(request)
+    match_all = request.GET.get('match') != 'any'
+    page_ids, facets = await sync_to_async(_filter_by_tags)(request, selected_tags, match_all)
+    recipes = Recipe.objects.all()
+    if page_ids is not None:
+        recipes = filter_by_ids(recipes, page_ids)
+    page = await apaginate_by_cursor(request, recipes, Recipe.LIST_ORDERING, row_class=RecipeRow)
+    context = {
+        'recipes': page.object_list,
+        'page': page,
+        'facets': facets,
+        'match_all': match_all,
+        'match_queries': _match_queries(request),
+    }
     return render(request, 'recipes.html', context)
 
 
-def get_recipe(request, recipe_id):
+def _filter_by_tags(request, selected_tags, match_all):
+    """
+    Look up the requested page of recipes matching the selected tags and
+    the tag facets.
+
+    Returns:
+        tuple[list[int] or None, list[dict]]: The ids of the matching
+        recipes the page can show (None when no tag is selected) and the
+        facets (see `_tag_facets`).
+
+    Raises:
+        Http404: If the page cursor is malformed.
+    """
+
+    matching_ids = tag_index.recipe_ids(selected_tags, match_all) if selected_tags else None
+    facets = _tag_facets(request, selected_tags, tag_index.facet_counts(matching_ids))
+    if matching_ids is None:
+        return None, facets
+    sort_keys = tag_index.sort_keys(matching_ids)
+    return select_page_ids(request, Recipe.objects.all(), Recipe.LIST_ORDERING, sort_keys), facets
+
+
+def _selected_tag_ids(request):
+    """Return the valid tag ids selected with the `tag` query parameter."""
+
+    tag_ids = []
+    for value in request.GET.getlist('tag'):
+        try:
+            tag_id = int(value)
+        except ValueError:
+            continue
+        if tag_id not in tag_ids:
+            tag_ids.append(tag_id)
+    return tag_ids
+
+
+def _match_queries(request):
+    """Return the query strings switching between AND and OR tag matching."""
+
+    queries = {}
+    for mode in ('all', 'any'):
+        params = request.GET.copy()
+        for key in ('after', 'before'):
+            params.pop(key, None)
+        params['match'] = mode
+        queries[mode] = params.urlencode()
+    return queries
+
+
+def _tag_facets(request, selected_tags, counts):
+    """
+    Describe the tag facets shown next to the recipe list.
+
+    Every tag that is selected or matches at least one recipe of the
+    current result set is listed with its count and the query string that
+    toggles it, most common first.
+    """
+
+    facets = []
+    for tag_id, tag_name in tag_index.tag_names().items():
+        selected = tag_id in selected_tags
+        count = counts.get(tag_id, 0)
+        if not selected and count == 0:
+            continue
+        params = request.GET.copy()
+        for key in ('after', 'before'):
+            params.pop(key, None)
+        toggled = [tag for tag in selected_tags if tag != tag_id] if selected else selected_tags + [tag_id]
+        params.setlist('tag', [str(tag) for tag in toggled])
+        facets.append({
+            'id': tag_id,
+            'name': tag_name,
+            'count': count,
+            'selected': selected,
+            'query': params.urlencode(),
+        })
+    facets.sort(key=lambda facet: (-facet['count'], facet['name']))
+    return facets
+
+
+@query_budget(5)
+@vary_on_cookie
+@conditional.preload(conditional.aload_recipe)
+@condition(etag_func=conditional.recipe_etag, last_modified_func=conditional.recipe_last_modified)
+async def get_recipe(request, recipe_id):
     """
     Display a single recipe page.
 
     This view renders the page for a specific recipe identified by
     its ID. It does not require authentication, allowing both logged-in
     and anonymous users to access the recipe details.
+
+    The recipe-specific body of the page is served from
+    `recipes.fragment_cache`, so the recipe is only queried and rendered
+    when its cached body is missing or has been invalidated. Clients
+    holding a current copy get a 304 after a single lookup of the recipe's
+    `date_modified` (see `recipes.conditional`).
+
+    Every page served is counted in `Recipe.view_count`, through the
+    in-memory buffer of `recipes.view_counts` (304 answers are not).
     """
-    try:
-        context = {'recipe': Recipe.objects.get(id=recipe_id)}
-    except Recipe.DoesNotExist:
-        raise Http404("Recipe does not exist")
-    else:
-        return render(request, 'recipe.html', context)
\ No newline at end of file
+
+    context = {'recipe_id': recipe_id}
+
+    async def render_body():
+        try:
+            recipe = await Recipe.objects.aget(id=recipe_id)
+        except Recipe.DoesNotExist:
+            raise Http404("Recipe does not exist")
+        context['recipe'] = recipe
+        return render_to_string('partials/recipe_body.html', {'recipe': recipe})
+
+    context['recipe_body'] = await fragment_cache.aget_recipe_body(recipe_id, render_body)
+    view_counter.add(recipe_id)
+    return render(request, 'recipe.html', context)
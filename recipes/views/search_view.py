@@ -0,0 +1,49 @@
+from django.db import models
+from django.http import Http404
+from django.shortcuts import render
+from recipes import search
+from recipes.helpers import CursorPage, decode_cursor, encode_cursor, get_cursor, get_page_size
+from recipes.models.recipe import Recipe
+from recipes.read_models import RecipeRow
+from recipes.views.decorators import query_budget
+
+# Search results are ranked, so their cursors encode a result offset
+_OFFSET_FIELD = models.IntegerField()
+
+
+@query_budget(4)
+def search_recipes(request):
+    """
+    Display recipes matching a full-text search, best match first.
+
+    The `q` query parameter is matched against recipe names, ingredients,
+    instructions and tag names through the FTS5 index, and results are
+    ranked with BM25. Pages are linked with opaque `after`/`before`
+    cursors, as on the recipe list, and only one page of recipes is loaded.
+    Like the recipe list, it does not require authentication.
+    """
+
+    query = request.GET.get('q', '').strip()
+    page_size = get_page_size(request)
+    cursor, backwards = get_cursor(request)
+    try:
+        offset = decode_cursor(cursor, [_OFFSET_FIELD])[0] if cursor is not None else 0
+    except ValueError:
+        raise Http404("Invalid page cursor")
+    offset = max(offset - page_size if backwards else offset, 0)
+
+    ids = search.search_recipe_ids(query, page_size + 1, offset)
+    has_next = len(ids) > page_size
+    ids = ids[:page_size]
+    recipes_by_id = {row.id: row for row in RecipeRow.fetch(Recipe.objects.filter(pk__in=ids))}
+    recipes = [recipes_by_id[pk] for pk in ids if pk in recipes_by_id]
+
+    page = CursorPage(
+        recipes,
+        encode_cursor([offset + page_size]) if has_next else None,
+        encode_cursor([offset]) if offset > 0 else None,
+        page_size,
+        request.GET,
+    )
+    context = {'recipes': recipes, 'page': page, 'query': query}
+    return render(request, 'search.html', context)
@@ -0,0 +1,26 @@
+from django.http import JsonResponse
+from recipes.tag_trie import MAX_SUGGESTIONS, tag_trie
+from recipes.views.decorators import query_budget
+
+DEFAULT_SUGGESTIONS = 10
+
+
+@query_budget(1)
+def autocomplete_tags(request):
+    """
+    Suggest tags for what the user is typing, as JSON.
+
+    The `q` query parameter is matched against the start of every word of
+    the tag names, ignoring case, and the most used matching tags are
+    returned as `{"results": [{"id", "name", "count"}, ...]}`. `limit` sets
+    the number of suggestions (at most `MAX_SUGGESTIONS`). Lookups are
+    answered from the in-process `tag_trie`; the query budget allows for
+    its one-off (re)build. It does not require authentication.
+    """
+
+    try:
+        limit = int(request.GET.get('limit', DEFAULT_SUGGESTIONS))
+    except ValueError:
+        limit = DEFAULT_SUGGESTIONS
+    limit = min(max(limit, 1), MAX_SUGGESTIONS)
+    return JsonResponse({'results': tag_trie.suggest(request.GET.get('q', ''), limit)})
@@ -1,15 +1,78 @@
+import string
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils.decorators import method_decorator
 from django.views.generic import ListView
+from recipes.helpers import paginate_by_cursor
 from recipes.models import User
+from recipes.read_models import UserRow
+from recipes.views.decorators import query_budget
 
+# SQLite's lower() only folds ASCII letters; fold search terms the same way
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+@method_decorator(query_budget(3), name='dispatch')
 class UserListView(LoginRequiredMixin, ListView):
     """
     Displays a list of all users, excluding the currently logged-in user.
+
+    Users are listed one page at a time by last name, first name and id,
+    using keyset pagination (`after`/`before` cursors) over the matching
+    composite index. The optional `q` parameter keeps the users whose
+    username, first name or last name starts with it (ignoring case); each
+    of those prefixes is a range over an index on the lowercased column,
+    so the search never scans the whole table. Users are listed as
+    slotted `UserRow`s, without the columns the page does not show.
     """
     model = User
     template_name = 'user_list.html'
     context_object_name = 'users'
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        return queryset.exclude(pk = self.request.user.pk)
\ No newline at end of file
+        queryset = super().get_queryset().exclude(pk = self.request.user.pk)
+        query = self.request.GET.get('q', '').strip()
+        if query:
+            queryset = _prefix_search(queryset, query)
+        self.page = paginate_by_cursor(self.request, queryset, User.DIRECTORY_ORDERING, row_class=UserRow)
+        return self.page.object_list
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['page'] = self.page
+        context['query'] = self.request.GET.get('q', '')
+        return context
+
+
+def _prefix_range(prefix):
+    """Return the `[start, end)` range of strings that start with `prefix`."""
+
+    last = ord(prefix[-1])
+    if last == 0x10FFFF:
+        return prefix, None
+    return prefix, prefix[:-1] + chr(last + 1)
+
+
+def _prefix_search(queryset, query):
+    """Keep the users whose username, first name or last name starts with `query`."""
+
+    prefix = query.translate(_ASCII_LOWER)
+    username_prefix = prefix if prefix.startswith('@') else '@' + prefix
+    queryset = queryset.alias(
+        username_lower=Lower('username'),
+        first_name_lower=Lower('first_name'),
+        last_name_lower=Lower('last_name'),
+    )
+    condition = Q()
+    for name, value in (
+        ('username_lower', username_prefix),
+        ('first_name_lower', prefix),
+        ('last_name_lower', prefix),
+    ):
+        start, end = _prefix_range(value)
+        term = Q(**{f'{name}__gte': start})
+        if end is not None:
+            term &= Q(**{f'{name}__lt': end})
+        condition |= term
+    return queryset.filter(condition)
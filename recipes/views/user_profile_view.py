@@ -1,12 +1,25 @@
-from recipes.models import User
+from recipes.models import AuthorFollow, User
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.utils.decorators import method_decorator
 from django.views.generic import DetailView
+from recipes.views.decorators import query_budget
 
+@method_decorator(query_budget(3), name='dispatch')
 class UserProfileView(LoginRequiredMixin, DetailView):
     """
     Displays the profile page for a single User object.
     Requires login and retrieves the target user based on PK from the URL.
+    The page offers to follow or unfollow the user (see `follow_user`).
     """
     model = User
     template_name = 'user_profile.html'
-    context_object_name = 'user'
\ No newline at end of file
+    context_object_name = 'user'
+
+    def get_context_data(self, **kwargs):
+        """Add whether the current user follows the displayed user."""
+
+        context = super().get_context_data(**kwargs)
+        context['is_following'] = AuthorFollow.objects.filter(
+            follower=self.request.user, author=self.object
+        ).exists()
+        return context
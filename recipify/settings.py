@@ -43,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'recipes.middleware.ServerTimingMiddleware',
+    'recipes.middleware.QueryBudgetMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -56,7 +58,7 @@ ROOT_URLCONF = 'recipify.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'recipes.profiling.ProfilingDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -75,14 +77,61 @@ WSGI_APPLICATION = 'recipify.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# recipify.sqlite is Django's SQLite backend with WAL mode, BEGIN IMMEDIATE
+# transactions and retries on lock contention (see recipify/sqlite/base.py)
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'recipify.sqlite',
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Sessions and the recipe list's Last-Modified stamp live in the default
+# cache, so it must be shared by every worker process (Redis, Memcached).
+# The local-memory cache is only fit for a single development server; with
+# REQUIRE_SHARED_CACHE, the recipes.E001 check refuses to start with it.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+REQUIRE_SHARED_CACHE = not DEBUG
+
+# Sessions live in the cache; unchanged sessions only queue expiry refreshes,
+# which are written to the database in batches (see recipes.sessions)
+SESSION_ENGINE = 'recipes.sessions'
+SESSION_EXPIRY_FLUSH_INTERVAL = 60
+SESSION_EXPIRY_FLUSH_BATCH = 500
+
+# Recipe page views are counted in process memory and written in one
+# batched transaction every RECIPE_VIEW_FLUSH_INTERVAL seconds or once
+# RECIPE_VIEW_FLUSH_EVENTS views are buffered (see recipes.view_counts)
+RECIPE_VIEW_FLUSH_INTERVAL = 10
+RECIPE_VIEW_FLUSH_EVENTS = 200
+
+# Feeds are fanned out on write: a new recipe is copied into the timeline of
+# each follower of its author and tags. Authors with more followers than
+# FEED_FANOUT_LIMIT are pulled into their followers' feeds when read instead
+# (see recipes.feed). Following copies the newest FEED_BACKFILL recipes.
+FEED_FANOUT_LIMIT = 1000
+FEED_FANOUT_BATCH_SIZE = 500
+FEED_BACKFILL = 50
+
+# Password check throttling: (burst capacity, seconds to refill) per scope
+LOGIN_THROTTLE_RATES = {
+    'ip': (30, 60),
+    'username': (10, 60),
+}
+
+# Lifetime of a cached recipe page body and of its version stamp; entries are
+# also invalidated on change
+RECIPE_BODY_CACHE_TIMEOUT = 60 * 60 * 24
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -137,7 +186,36 @@ LOGIN_URL = 'log_in'
 # URL where @login_prohibited redirects to
 REDIRECT_URL_WHEN_LOGGED_IN = 'dashboard'
 
+# Keyset pagination: default and maximum number of rows per page
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# SQL budgets per URL name, checked by QueryBudgetMiddleware for the whole
+# request. A value is a maximum query count or (max_queries, max_time_ms).
+# Views may also declare their own budget with @query_budget.
+QUERY_BUDGETS = {
+    'home': 2,
+    'list_recipes': 5,
+    'get_recipe': 5,
+    'search_recipes': 4,
+    'cook_with_pantry': 4,
+    'dashboard': 3,
+    'user_list': 3,
+    'user_profile': 3,
+}
+
+# Raise QueryBudgetExceeded on overruns instead of logging a warning
+QUERY_BUDGET_RAISE = DEBUG
+
 # Convert Django ERROR messages to Bootstrap DANGER messages
 MESSAGE_TAGS = {
     messages.ERROR: 'danger',
 }
+
+# Log the view, db and template time of every request, and send it in a
+# Server-Timing header to staff users (see recipes.profiling)
+SERVER_TIMING = True
+
+# Send the Server-Timing header to every visitor, not just staff (it is
+# always sent when DEBUG is on)
+SERVER_TIMING_PUBLIC = False
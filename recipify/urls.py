@@ -24,7 +24,12 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('', views.home, name='home'),
     path('recipes/', views.list_recipes, name='list_recipes'),
+    path('recipes/search/', views.search_recipes, name='search_recipes'),
+    path('recipes/pantry/', views.cook_with_pantry, name='cook_with_pantry'),
+    path('recipes/export/', views.export_recipes, name='export_recipes'),
     path('recipe/<int:recipe_id>/', views.get_recipe, name='get_recipe'),
+    path('tags/autocomplete/', views.autocomplete_tags, name='autocomplete_tags'),
+    path('tags/follow/', views.follow_tag, name='follow_tag'),
     path('dashboard/', views.dashboard, name='dashboard'),
     path('log_in/', views.LogInView.as_view(), name='log_in'),
     path('log_out/', views.log_out, name='log_out'),
@@ -32,6 +37,7 @@ urlpatterns = [
     path('profile/', views.ProfileUpdateView.as_view(), name='profile'),
     path('sign_up/', views.SignUpView.as_view(), name='sign_up'),
     path('users/<int:pk>/', views.UserProfileView.as_view(), name  = 'user_profile'),
+    path('users/<int:pk>/follow/', views.follow_user, name='follow_user'),
     path('users/', views.UserListView.as_view(), name = 'user_list'),
 ]
 urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)